@@ -0,0 +1,6 @@
+"""
+Say It Better - Shared helpers for the Vercel serverless functions
+
+The leading underscore keeps Vercel from deploying this package as a
+function of its own; handlers in api/ import it as ``_lib``.
+"""
@@ -0,0 +1,341 @@
+"""
+Say It Better - Streaming request body reader
+
+Reads request bodies in fixed-size chunks, enforcing a per-route byte limit
+while streaming (so an oversized or lying Content-Length is rejected as soon
+as the limit is crossed), and understands chunked transfer encoding, which
+BaseHTTPRequestHandler does not decode on its own.
+
+Large bodies are parsed incrementally: chunks are fed straight into
+IncrementalJSONParser and dropped, so a 10MB upload is held roughly once as
+parsed objects rather than as raw bytes + decoded text + parsed objects.
+Small bodies take the plain json.loads path, which is faster for them.
+"""
+
+import codecs
+import json
+import re
+
+from .serialization import loads
+
+CHUNK_SIZE = 64 * 1024
+# Below this size a single json.loads beats the pure-Python streaming parser
+STREAMING_THRESHOLD = 256 * 1024
+
+
+class BodyError(Exception):
+    """A request body problem that maps directly onto an HTTP error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _too_large(handler, max_bytes):
+    # The rest of the body is left unread, so the connection cannot be reused
+    handler.close_connection = True
+    if max_bytes >= 1024 * 1024:
+        limit = f"{max_bytes // (1024 * 1024)}MB"
+    else:
+        limit = f"{max_bytes // 1024}KB"
+    return BodyError(413, f"Payload too large (max {limit})")
+
+
+def iter_body(handler, max_bytes: int, chunk_size: int = CHUNK_SIZE):
+    """Yield the request body in chunks, raising BodyError past max_bytes."""
+    transfer_encoding = handler.headers.get('Transfer-Encoding', '').lower()
+    rfile = handler.rfile
+    received = 0
+
+    if 'chunked' in transfer_encoding:
+        while True:
+            size_line = rfile.readline(1024)
+            try:
+                remaining = int(size_line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise BodyError(400, 'Malformed chunked request body')
+            if remaining == 0:
+                # Consume optional trailers up to the terminating blank line
+                while rfile.readline(1024) not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            received += remaining
+            if received > max_bytes:
+                raise _too_large(handler, max_bytes)
+            while remaining:
+                chunk = rfile.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise BodyError(400, 'Incomplete request body')
+                remaining -= len(chunk)
+                yield chunk
+            rfile.readline(1024)  # CRLF after each chunk
+
+    try:
+        remaining = int(handler.headers.get('Content-Length', 0))
+    except ValueError:
+        raise BodyError(400, 'Invalid Content-Length header')
+    if remaining > max_bytes:
+        raise _too_large(handler, max_bytes)
+    while remaining:
+        chunk = rfile.read(min(chunk_size, remaining))
+        if not chunk:
+            raise BodyError(400, 'Incomplete request body')
+        received += len(chunk)
+        if received > max_bytes:
+            raise _too_large(handler, max_bytes)
+        remaining -= len(chunk)
+        yield chunk
+
+
+def read_json_body(handler, max_bytes: int, digest=None):
+    """
+    Read and parse a JSON request body within max_bytes. A hashlib object
+    passed as digest is updated with the raw body as it streams by.
+
+    Raises BodyError for empty/oversized/truncated bodies and
+    json.JSONDecodeError for invalid JSON.
+    """
+    declared = handler.headers.get('Content-Length')
+    chunked = 'chunked' in handler.headers.get('Transfer-Encoding', '').lower()
+
+    if not chunked and declared is not None and declared.isdigit() \
+            and int(declared) <= STREAMING_THRESHOLD:
+        body = b''.join(iter_body(handler, max_bytes))
+        if digest is not None:
+            digest.update(body)
+        if not body:
+            raise BodyError(400, 'Empty request body')
+        return loads(body)
+
+    parser = IncrementalJSONParser()
+    received = 0
+    for chunk in iter_body(handler, max_bytes):
+        received += len(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        parser.feed(chunk)
+    if not received:
+        raise BodyError(400, 'Empty request body')
+    return parser.close()
+
+
+# --- Incremental JSON parser -------------------------------------------------
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_CHARS = re.compile(r'[-+0-9.eE]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?')
+_STRING_RUN = re.compile(r'[^"\\\x00-\x1f]*')
+_HEX4 = re.compile(r'[0-9a-fA-F]{4}')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_LITERALS = {'t': ('true', True), 'f': ('false', False), 'n': ('null', None)}
+
+# Parser states
+_VALUE = 0          # expecting a value
+_ARRAY_FIRST = 1    # after '[': a value or ']'
+_OBJECT_FIRST = 2   # after '{': a key or '}'
+_KEY = 3            # after ',' in an object: a key
+_COLON = 4          # after a key: ':'
+_AFTER_VALUE = 5    # after a value: ',' or a closing bracket
+_STRING = 6         # inside a string
+
+_MISSING = object()
+
+
+class IncrementalJSONParser:
+    """
+    Push parser for a single JSON document fed as byte chunks.
+
+    Only the unconsumed tail of the current chunk is buffered; long strings
+    (such as base64 ciphertext) are collected as slices and joined once when
+    their closing quote arrives.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._offset = 0  # characters consumed before the current buffer
+        self._state = _VALUE
+        self._stack = []  # [container, pending_key] frames
+        self._string_parts = None
+        self._string_is_key = False
+        self._result = _MISSING
+
+    def feed(self, data: bytes) -> None:
+        self._append(self._decoder.decode(data))
+        self._run(final=False)
+
+    def close(self):
+        """Finish parsing and return the document."""
+        self._append(self._decoder.decode(b'', final=True))
+        self._run(final=True)
+        if self._stack or self._state == _STRING:
+            self._fail('Unterminated JSON document')
+        if self._result is _MISSING:
+            self._fail('Expecting value')
+        return self._result
+
+    def _append(self, text):
+        self._offset += self._pos
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+
+    def _fail(self, message):
+        raise json.JSONDecodeError(message, '', self._offset + self._pos)
+
+    def _run(self, final):
+        buf = self._buf
+        while True:
+            if self._state == _STRING:
+                if not self._scan_string(final):
+                    return
+                continue
+
+            self._pos = _WHITESPACE.match(buf, self._pos).end()
+            if self._pos >= len(buf):
+                return
+            if self._result is not _MISSING:
+                self._fail('Extra data')
+            char = buf[self._pos]
+            state = self._state
+
+            if state == _VALUE or state == _ARRAY_FIRST:
+                if state == _ARRAY_FIRST and char == ']':
+                    self._pos += 1
+                    self._close_container()
+                elif not self._start_value(char, final):
+                    return
+            elif state == _OBJECT_FIRST or state == _KEY:
+                if state == _OBJECT_FIRST and char == '}':
+                    self._pos += 1
+                    self._close_container()
+                elif char == '"':
+                    self._pos += 1
+                    self._begin_string(is_key=True)
+                else:
+                    self._fail('Expecting property name enclosed in double quotes')
+            elif state == _COLON:
+                if char != ':':
+                    self._fail("Expecting ':' delimiter")
+                self._pos += 1
+                self._state = _VALUE
+            else:  # _AFTER_VALUE inside a container
+                container = self._stack[-1][0]
+                is_object = isinstance(container, dict)
+                self._pos += 1
+                if char == ',':
+                    self._state = _KEY if is_object else _VALUE
+                elif char == ('}' if is_object else ']'):
+                    self._close_container()
+                else:
+                    self._pos -= 1
+                    self._fail("Expecting ',' delimiter")
+
+    def _start_value(self, char, final):
+        """Begin parsing a value at the cursor; False means more input is needed."""
+        buf = self._buf
+        if char == '{':
+            self._pos += 1
+            self._stack.append([{}, None])
+            self._state = _OBJECT_FIRST
+        elif char == '[':
+            self._pos += 1
+            self._stack.append([[], None])
+            self._state = _ARRAY_FIRST
+        elif char == '"':
+            self._pos += 1
+            self._begin_string(is_key=False)
+        elif char in _LITERALS:
+            word, value = _LITERALS[char]
+            available = buf[self._pos:self._pos + len(word)]
+            if available != word:
+                if not final and word.startswith(available):
+                    return False
+                self._fail('Expecting value')
+            self._pos += len(word)
+            self._emit(value)
+        else:
+            if not final and _NUMBER_CHARS.match(buf, self._pos).end() == len(buf):
+                return False  # the number may continue in the next chunk
+            match = _NUMBER.match(buf, self._pos)
+            if not match:
+                self._fail('Expecting value')
+            integer, fraction, exponent = match.group(0), match.group(1), match.group(2)
+            self._pos = match.end()
+            self._emit(float(integer) if fraction or exponent else int(integer))
+        return True
+
+    def _begin_string(self, is_key):
+        self._state = _STRING
+        self._string_parts = []
+        self._string_is_key = is_key
+
+    def _scan_string(self, final):
+        """Consume string content; True once the closing quote was reached."""
+        buf, pos, parts = self._buf, self._pos, self._string_parts
+        end_of_buf = len(buf)
+        while True:
+            run_end = _STRING_RUN.match(buf, pos).end()
+            if run_end > pos:
+                parts.append(buf[pos:run_end])
+                pos = run_end
+            if pos >= end_of_buf:
+                self._pos = pos
+                return False
+            char = buf[pos]
+            if char == '"':
+                self._pos = pos + 1
+                value = ''.join(parts)
+                self._string_parts = None
+                if self._string_is_key:
+                    self._stack[-1][1] = value
+                    self._state = _COLON
+                else:
+                    self._emit(value)
+                return True
+            if char != '\\':
+                self._pos = pos
+                self._fail('Invalid control character')
+            if pos + 1 >= end_of_buf:
+                self._pos = pos
+                return False
+            escape = buf[pos + 1]
+            if escape != 'u':
+                if escape not in _ESCAPES:
+                    self._pos = pos
+                    self._fail('Invalid \\escape')
+                parts.append(_ESCAPES[escape])
+                pos += 2
+                continue
+            # \uXXXX, possibly the first half of a surrogate pair
+            if pos + 6 > end_of_buf or (pos + 12 > end_of_buf and not final):
+                self._pos = pos
+                return False
+            if not _HEX4.fullmatch(buf, pos + 2, pos + 6):
+                self._pos = pos
+                self._fail('Invalid \\uXXXX escape')
+            code = int(buf[pos + 2:pos + 6], 16)
+            pos += 6
+            if 0xd800 <= code <= 0xdbff and buf.startswith('\\u', pos) \
+                    and _HEX4.fullmatch(buf, pos + 2, pos + 6):
+                low = int(buf[pos + 2:pos + 6], 16)
+                if 0xdc00 <= low <= 0xdfff:
+                    code = 0x10000 + ((code - 0xd800) << 10) + (low - 0xdc00)
+                    pos += 6
+            parts.append(chr(code))
+
+    def _emit(self, value):
+        if not self._stack:
+            self._result = value
+            self._state = _AFTER_VALUE
+            return
+        frame = self._stack[-1]
+        if isinstance(frame[0], dict):
+            frame[0][frame[1]] = value
+        else:
+            frame[0].append(value)
+        self._state = _AFTER_VALUE
+
+    def _close_container(self):
+        self._emit(self._stack.pop()[0])
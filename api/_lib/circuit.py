@@ -0,0 +1,88 @@
+"""
+Say It Better - Circuit breaker for upstream dependencies
+
+After ``failure_threshold`` consecutive failures the breaker opens and calls
+fail fast for ``reset_timeout`` seconds, instead of every serverless
+invocation blocking on a dead dependency. A single probe is then let
+through (half-open); success closes the breaker again.
+"""
+
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._last_error = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be attempted right now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: let exactly one probe through (a probe whose outcome
+            # was never recorded stops blocking after another reset_timeout)
+            now = time.monotonic()
+            if self._probe_in_flight and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_in_flight = True
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self._last_error = None
+
+    def record_failure(self, error=None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error else None
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"Circuit '{self.name}' opened after {self._failures} failure(s): {error}")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serializable view of the breaker for health checks."""
+        state = self.state
+        with self._lock:
+            info = {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'last_error': self._last_error,
+            }
+            if state != CLOSED:
+                info['retry_in_seconds'] = round(
+                    max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1
+                )
+        return info
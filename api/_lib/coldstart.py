@@ -0,0 +1,44 @@
+"""
+Say It Better - Cold start accounting
+
+Each handler records how long its module took to import. The first request
+served by a fresh instance prints a one-line startup report to the function
+log, so cold start latency can be tracked against a budget over time.
+"""
+
+import json
+import os
+import time
+
+# Taken when the first handler imports this module - i.e. at cold start
+PROCESS_STARTED = time.perf_counter()
+
+_import_times_ms = {}
+_first_request_at = None
+
+
+def record_import(module_name: str, started: float) -> None:
+    """Record the import duration of a handler module."""
+    _import_times_ms[module_name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def startup_report() -> dict:
+    """Return the cold start timings collected so far."""
+    report = {
+        "imports_ms": dict(_import_times_ms),
+        "import_total_ms": round(sum(_import_times_ms.values()), 2),
+        "budget_ms": float(os.environ.get("COLD_START_BUDGET_MS", "250")),
+    }
+    if _first_request_at is not None:
+        report["first_request_ms"] = round((_first_request_at - PROCESS_STARTED) * 1000, 2)
+    report["within_budget"] = report["import_total_ms"] <= report["budget_ms"]
+    return report
+
+
+def report_first_request() -> None:
+    """Print the startup report once, on the first request of this instance."""
+    global _first_request_at
+    if _first_request_at is not None:
+        return
+    _first_request_at = time.perf_counter()
+    print(f"startup_report {json.dumps(startup_report())}")
@@ -0,0 +1,57 @@
+"""
+Say It Better - Shared serverless configuration
+
+Environment variables are read and parsed once per cold start and reused by
+every request a warm instance serves, instead of on every request.
+"""
+
+import os
+from functools import lru_cache
+
+
+def get_clean_env(name: str, default: str = "") -> str:
+    value = os.environ.get(name, default)
+    if value is None:
+        return default
+    return value.strip().strip('"').strip("'")
+
+
+# CORS - parsed once instead of re-splitting ALLOWED_ORIGINS per request
+_allowed_origins_raw = get_clean_env("ALLOWED_ORIGINS", "*")
+ALLOW_ANY_ORIGIN = _allowed_origins_raw == "*"
+ALLOWED_ORIGINS = frozenset(o.strip() for o in _allowed_origins_raw.split(",") if o.strip())
+
+
+# Request headers the serverless functions accept cross-origin, including the
+# deadline headers read by _lib.deadline.request_deadline()
+ALLOW_HEADERS = "Content-Type, Authorization, X-Request-Deadline, X-Request-Timeout"
+
+
+@lru_cache(maxsize=256)
+def resolve_allowed_origin(origin: str):
+    """Return the Access-Control-Allow-Origin value for an Origin, or None."""
+    if ALLOW_ANY_ORIGIN or origin in ALLOWED_ORIGINS:
+        return origin if origin else "*"
+    # Friendly fallback for Vercel previews (optional, creates security/convenience tradeoff)
+    if origin and (".vercel.app" in origin or "localhost" in origin):
+        return origin
+    return None
+
+
+def cors_headers(handler, methods: str = "POST, OPTIONS",
+                 allow_headers: str = ALLOW_HEADERS) -> list:
+    """CORS headers verified against ALLOWED_ORIGINS, as (name, value) pairs."""
+    headers = []
+    allowed = resolve_allowed_origin(handler.headers.get("Origin", ""))
+    if allowed:
+        headers.append(("Access-Control-Allow-Origin", allowed))
+    headers.append(("Access-Control-Allow-Methods", methods))
+    headers.append(("Access-Control-Allow-Headers", allow_headers))
+    return headers
+
+
+def send_cors_headers(handler, methods: str = "POST, OPTIONS",
+                      allow_headers: str = ALLOW_HEADERS) -> None:
+    """Send CORS headers verified against ALLOWED_ORIGINS."""
+    for name, value in cors_headers(handler, methods, allow_headers):
+        handler.send_header(name, value)
@@ -0,0 +1,170 @@
+"""
+Say It Better - Request deadlines and cancellable upstream calls
+
+request_deadline() reads the request's time budget from X-Request-Timeout
+(seconds from now) or X-Request-Deadline (an absolute Unix timestamp in
+seconds; values above 1e12 are read as milliseconds), or falls back to a
+default budget. X-Request-Timeout is preferred, as it does not depend on the
+client's clock. An X-Request-Deadline already in the past is taken for clock
+skew and ignored, and every budget is clamped to
+[MIN_REQUEST_DEADLINE_SECONDS, MAX_REQUEST_DEADLINE_SECONDS]. fetch_upstream() sizes the upstream timeout from
+the time left, and while waiting polls the client connection: if the client
+has gone away, the upstream socket is shut down instead of waiting out a
+completion nobody will read.
+"""
+
+import http.client
+import io
+import math
+import os
+import select
+import socket
+import threading
+import time
+import urllib.error
+from urllib.parse import urlparse
+
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get("DEFAULT_REQUEST_DEADLINE_SECONDS") or 60)
+MAX_DEADLINE_SECONDS = float(os.environ.get("MAX_REQUEST_DEADLINE_SECONDS") or 120)
+# A client-supplied budget never leaves less time than this
+MIN_DEADLINE_SECONDS = float(os.environ.get("MIN_REQUEST_DEADLINE_SECONDS") or 2)
+_POLL_INTERVAL = 0.2
+
+_stats = {"client_disconnects": 0, "cancelled_upstream_calls": 0, "deadline_exceeded": 0}
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before the upstream call finished."""
+
+
+class ClientDisconnected(Exception):
+    """The client closed its connection while we waited on upstream."""
+
+
+def resolve_deadline(timeout=None, deadline=None, now: float = None,
+                     default: float = DEFAULT_DEADLINE_SECONDS) -> float:
+    """
+    The absolute deadline (Unix timestamp) for X-Request-Timeout and
+    X-Request-Deadline header values, either of which may be None.
+    """
+    now = time.time() if now is None else now
+    budget = default
+    for value, absolute in ((timeout, False), (deadline, True)):
+        if not value:
+            continue
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        if not math.isfinite(number):
+            continue
+        if absolute:
+            if number > 1e12:
+                number /= 1000.0
+            number -= now
+            if number <= 0:
+                # Already past by our clock: the client's clock is off
+                continue
+        budget = number
+        break
+    return now + min(max(budget, MIN_DEADLINE_SECONDS), MAX_DEADLINE_SECONDS)
+
+
+def request_deadline(handler, default: float = DEFAULT_DEADLINE_SECONDS) -> float:
+    """Return the request's absolute deadline as a Unix timestamp."""
+    return resolve_deadline(handler.headers.get("X-Request-Timeout"),
+                            handler.headers.get("X-Request-Deadline"), default=default)
+
+
+def client_disconnected(handler) -> bool:
+    """True if the client's socket has been closed (best effort, non-blocking)."""
+    sock = getattr(handler, "connection", None)
+    if not isinstance(sock, socket.socket):
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+
+def deadline_stats() -> dict:
+    return dict(_stats)
+
+
+def fetch_upstream(request, deadline: float, handler=None, default_timeout: float = 60) -> bytes:
+    """
+    Perform a urllib Request and return the response body.
+
+    Raises urllib.error.HTTPError for non-2xx responses (like urlopen),
+    DeadlineExceeded when the deadline passes, and ClientDisconnected when
+    the client goes away first - in both cases the upstream connection is
+    shut down.
+    """
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        _stats["deadline_exceeded"] += 1
+        raise DeadlineExceeded()
+    timeout = min(default_timeout, remaining)
+
+    url = urlparse(request.full_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    conn = connection_class(url.netloc, timeout=timeout)
+    path = url.path + (f"?{url.query}" if url.query else "")
+    outcome = {}
+
+    def run():
+        try:
+            conn.request(request.get_method(), path, body=request.data,
+                         headers=dict(request.header_items()))
+            response = conn.getresponse()
+            outcome["response"] = response
+            outcome["body"] = response.read()
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(_POLL_INTERVAL)
+            if not worker.is_alive():
+                break
+            if handler is not None and client_disconnected(handler):
+                _stats["client_disconnects"] += 1
+                _stats["cancelled_upstream_calls"] += 1
+                print(f"Client disconnected; cancelled upstream call to {url.netloc}")
+                raise ClientDisconnected()
+            if time.time() >= deadline:
+                _stats["deadline_exceeded"] += 1
+                _stats["cancelled_upstream_calls"] += 1
+                raise DeadlineExceeded()
+    except (ClientDisconnected, DeadlineExceeded):
+        _abort(conn)
+        raise
+
+    conn.close()
+    if "error" in outcome:
+        if isinstance(outcome["error"], socket.timeout):
+            _stats["deadline_exceeded"] += 1
+            _stats["cancelled_upstream_calls"] += 1
+            raise DeadlineExceeded() from outcome["error"]
+        raise outcome["error"]
+    response = outcome["response"]
+    if not 200 <= response.status < 300:
+        raise urllib.error.HTTPError(request.full_url, response.status, response.reason,
+                                     response.headers, io.BytesIO(outcome["body"]))
+    return outcome["body"]
+
+
+def _abort(conn):
+    """Shut the upstream socket down so the worker thread's recv returns."""
+    sock = conn.sock
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    conn.close()
@@ -0,0 +1,96 @@
+"""
+Say It Better - Compact /embeddings response formats
+
+JSON float arrays stay the default. Clients can opt into a compact format:
+
+- {"encoding_format": "base64"} in the request body: each vector becomes a
+  base64 string of little-endian floats, inside the usual JSON envelope.
+- Accept: application/octet-stream: one raw little-endian matrix, row-major,
+  described by the X-Embedding-Shape ("rows,dims") and X-Embedding-Dtype
+  headers.
+- Accept: application/x-ndjson: one {"index", "embedding"} JSON object per
+  line, written as each vector is encoded.
+
+Binary formats take a "dtype" of "float32" (default) or "float16".
+"""
+
+import array
+import base64
+import struct
+import sys
+
+from .serialization import dumps
+
+JSON = "json"
+BASE64 = "base64"
+BINARY = "binary"
+NDJSON = "ndjson"
+
+OCTET_STREAM = "application/octet-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+DTYPES = ("float32", "float16")
+# Lets browsers read the shape of binary responses across origins
+EXPOSED_HEADERS = ("X-Embedding-Shape", "X-Embedding-Dtype")
+
+
+class FormatError(ValueError):
+    """The requested response format or dtype is not supported."""
+
+
+def negotiate(accept: str = None, encoding_format: str = None, dtype: str = None) -> tuple:
+    """Pick (format, dtype) from the Accept header and request options."""
+    dtype = (dtype or "float32").lower()
+    if dtype not in DTYPES:
+        raise FormatError(f"Unsupported dtype '{dtype}' (use float32 or float16)")
+    encoding_format = (encoding_format or "float").lower()
+    if encoding_format not in ("float", "base64"):
+        raise FormatError(f"Unsupported encoding_format '{encoding_format}' (use float or base64)")
+
+    accept = (accept or "").lower()
+    if OCTET_STREAM in accept:
+        return BINARY, dtype
+    if NDJSON_MEDIA_TYPE in accept:
+        return NDJSON, dtype
+    if encoding_format == "base64":
+        return BASE64, dtype
+    return JSON, dtype
+
+
+def pack(vector, dtype: str = "float32") -> bytes:
+    """Encode one vector as little-endian float32/float16 bytes."""
+    if dtype == "float16":
+        return struct.pack(f"<{len(vector)}e", *vector)
+    values = array.array("f", vector)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def shape(vectors) -> tuple:
+    return (len(vectors), len(vectors[0]) if vectors else 0)
+
+
+def shape_headers(vectors, dtype: str) -> dict:
+    rows, dims = shape(vectors)
+    return {"X-Embedding-Shape": f"{rows},{dims}", "X-Embedding-Dtype": dtype}
+
+
+def pack_matrix(vectors, dtype: str = "float32") -> bytes:
+    """Row-major little-endian matrix for application/octet-stream."""
+    return b"".join(pack(vector, dtype) for vector in vectors)
+
+
+def base64_payload(vectors, dtype: str = "float32") -> dict:
+    """The JSON envelope for encoding_format=base64."""
+    return {
+        "embeddings": [base64.b64encode(pack(vector, dtype)).decode("ascii") for vector in vectors],
+        "encoding_format": BASE64,
+        "dtype": dtype,
+        "shape": list(shape(vectors)),
+    }
+
+
+def iter_ndjson(vectors):
+    """Yield one encoded JSON line per vector."""
+    for index, vector in enumerate(vectors):
+        yield dumps({"index": index, "embedding": vector}) + b"\n"
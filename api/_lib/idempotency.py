@@ -0,0 +1,183 @@
+"""
+Say It Better - Idempotency-Key result cache
+
+Clients on flaky networks retry uploads whose response they never saw. A
+request carrying an Idempotency-Key header is processed once; its response
+is kept for a short while and replayed to any retry with the same key,
+without redoing the storage work.
+
+- A retry that arrives while the first request is still running gets 429
+  with Retry-After (not 409, which the cloud API uses for version conflicts).
+- Reusing a key for a different request (a different fingerprint, such as
+  a hash of another body) gets 422.
+- 5xx responses are not cached, so those retries run again.
+
+By default results live in a bounded MemoryStore, so the cache is per
+process: a retry that reaches another serverless instance is processed
+again. Passing a SharedResults store (api/cloud.py uses Redis) makes claims
+and results visible to every instance; while the shared store fails, the
+cache falls back to the local one. Shared fingerprints and responses must
+be JSON-serializable, and come back from JSON (tuples as lists).
+
+Stdlib only, so both the serverless functions and the backend can import it.
+"""
+
+import os
+import threading
+
+from .memstore import MemoryStore
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv('IDEMPOTENCY_TTL_SECONDS') or 60 * 60)
+IDEMPOTENCY_MAX_BYTES = int(os.getenv('IDEMPOTENCY_MAX_BYTES') or 1024 * 1024)
+# How long a shared claim blocks retries if its instance dies mid-request
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv('IDEMPOTENCY_LEASE_SECONDS') or 120)
+MAX_KEY_LENGTH = 255
+# Seconds a retry of an in-progress request is told to wait
+IN_PROGRESS_RETRY_AFTER = 2
+
+# Response header marking a replayed result
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+class IdempotencyError(Exception):
+    """A key problem that maps directly onto an HTTP error status."""
+
+    def __init__(self, status: int, message: str, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = tuple(headers)
+
+
+def _in_progress():
+    return IdempotencyError(429, 'A request with this Idempotency-Key is still in progress',
+                            (('Retry-After', str(IN_PROGRESS_RETRY_AFTER)),))
+
+
+class SharedResults:
+    """
+    A store shared by all instances, holding JSON-serializable values.
+    Methods may raise; the cache then falls back to its local store.
+    """
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def add(self, key: str, value, ttl: float) -> bool:
+        """Store value only if key is absent; True if it was stored."""
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class IdempotencyCache:
+    def __init__(self, name: str, ttl: float = IDEMPOTENCY_TTL_SECONDS,
+                 max_bytes: int = IDEMPOTENCY_MAX_BYTES, shared: SharedResults = None):
+        self.name = name
+        self.ttl = ttl
+        self.shared = shared
+        # key -> (fingerprint, response)
+        self._results = MemoryStore(max_bytes, default_ttl=ttl, name=f"{name}_idempotency")
+        # key -> (fingerprint, shared store or None) of requests still being processed
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {'started': 0, 'replays': 0, 'in_progress': 0, 'mismatches': 0, 'uncached': 0,
+                       'shared_errors': 0}
+
+    def begin(self, key: str, fingerprint=None):
+        """
+        Claim a key. Returns the cached response for a replay, or None when
+        the caller should process the request and then call finish() (or
+        abandon() if it fails without a response worth keeping).
+        """
+        if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+            raise IdempotencyError(400, f'Idempotency-Key must be 1-{MAX_KEY_LENGTH} printable characters')
+        if self.shared is not None:
+            try:
+                return self._begin_shared(key, fingerprint)
+            except IdempotencyError:
+                raise
+            except Exception as e:
+                self._shared_failed('claim', e)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                if cached[0] != fingerprint:
+                    self._stats['mismatches'] += 1
+                    raise IdempotencyError(422, 'Idempotency-Key was already used for a different request')
+                self._stats['replays'] += 1
+                return cached[1]
+            if key in self._in_flight:
+                self._stats['in_progress'] += 1
+                raise _in_progress()
+            self._in_flight[key] = (fingerprint, None)
+            self._stats['started'] += 1
+            return None
+
+    def _begin_shared(self, key, fingerprint):
+        store_key = f"{self.name}:{key}"
+        for _ in range(2):
+            if self.shared.add(store_key, {'fingerprint': fingerprint, 'pending': True},
+                               IDEMPOTENCY_LEASE_SECONDS):
+                with self._lock:
+                    self._in_flight[key] = (fingerprint, self.shared)
+                    self._stats['started'] += 1
+                return None
+            cached = self.shared.get(store_key)
+            if cached is None:
+                # Expired between the two calls; claim it again
+                continue
+            with self._lock:
+                if cached.get('fingerprint') != fingerprint:
+                    self._stats['mismatches'] += 1
+                    raise IdempotencyError(422, 'Idempotency-Key was already used for a different request')
+                if cached.get('pending'):
+                    self._stats['in_progress'] += 1
+                    raise _in_progress()
+                self._stats['replays'] += 1
+            return cached['response']
+        raise _in_progress()
+
+    def finish(self, key: str, status: int, response) -> None:
+        """Release a claimed key, caching the response unless it was a 5xx."""
+        with self._lock:
+            if key not in self._in_flight:
+                return
+            fingerprint, shared = self._in_flight.pop(key)
+            if status >= 500:
+                self._stats['uncached'] += 1
+            elif shared is None:
+                self._results.set(key, (fingerprint, response))
+        if shared is not None:
+            try:
+                if status >= 500:
+                    shared.delete(f"{self.name}:{key}")
+                else:
+                    shared.set(f"{self.name}:{key}", {'fingerprint': fingerprint, 'response': response}, self.ttl)
+            except Exception as e:
+                self._shared_failed('store', e)
+
+    def abandon(self, key: str) -> None:
+        """Release a claimed key without caching anything."""
+        with self._lock:
+            _, shared = self._in_flight.pop(key, (None, None))
+        if shared is not None:
+            try:
+                shared.delete(f"{self.name}:{key}")
+            except Exception as e:
+                self._shared_failed('release', e)
+
+    def _shared_failed(self, action, error):
+        with self._lock:
+            self._stats['shared_errors'] += 1
+        print(f"Idempotency {self.name}: shared store {action} failed: {error}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._in_flight)
+            stats = dict(self._stats)
+        return {**stats, 'in_flight': in_flight, 'store': self._results.stats()}
@@ -0,0 +1,142 @@
+"""
+Say It Better - Lexical fast path for theme recurrence
+
+Theme labels are short and often repeat verbatim ("Work Stress" /
+"work stress"). Before anything is embedded, both lists are normalized and
+deduplicated; exact normalized matches score 1.0, and near-identical labels
+(character trigram overlap at or above LEXICAL_DECISIVE) are scored
+lexically. Only the current themes left over need the embedding service.
+
+Low lexical overlap is never treated as decisive: "Fatigue" and "Tiredness"
+share no trigrams but are semantically close, so those still go to
+embeddings.
+
+A trigram Dice coefficient is not on the same scale as an embedding cosine,
+so every similarity_scores entry says how it was matched ("match": "exact",
+"lexical" or "embedding"). "score" is only ever a cosine (1.0 for an exact
+match); lexical hits carry null there and their Dice coefficient in
+"lexical_score", and count as recurring by construction.
+"""
+
+import re
+import threading
+
+# Trigram Dice similarity at or above this is accepted without embeddings
+LEXICAL_DECISIVE = 0.85
+
+EXACT = "exact"
+LEXICAL = "lexical"
+EMBEDDING = "embedding"
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_stats = {
+    "requests": 0,
+    "exact_matches": 0,
+    "lexical_matches": 0,
+    "texts_skipped": 0,
+    "embedding_calls_avoided": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def normalize_theme(theme: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace."""
+    return " ".join(_PUNCTUATION.sub(" ", str(theme).casefold()).split())
+
+
+def char_ngrams(text: str, n: int = 3) -> set:
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def ngram_similarity(a: set, b: set) -> float:
+    """Dice coefficient of two n-gram sets."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _unique(themes):
+    """Map normalized key -> first original label, preserving order."""
+    unique = {}
+    for theme in themes:
+        unique.setdefault(normalize_theme(theme), theme)
+    return unique
+
+
+class LexicalPrepass:
+    """
+    Result of the lexical pre-pass.
+
+    resolved: normalized current key -> its similarity_scores entry
+    pending_current: current labels (one per key) that still need embeddings
+    unique_past: deduplicated past labels to embed alongside them
+    """
+
+    def __init__(self, current_themes, past_themes, decisive: float = LEXICAL_DECISIVE):
+        current = _unique(current_themes)
+        past = _unique(past_themes)
+        past_grams = {key: char_ngrams(key) for key in past}
+
+        self.resolved = {}
+        self.pending_current = []
+        exact = lexical = 0
+        for key, label in current.items():
+            if key in past:
+                self.resolved[key] = {"most_similar": past[key], "score": 1.0, "match": EXACT}
+                exact += 1
+                continue
+            grams = char_ngrams(key)
+            best_key, best = None, 0.0
+            for past_key, past_key_grams in past_grams.items():
+                score = ngram_similarity(grams, past_key_grams)
+                if score > best:
+                    best_key, best = past_key, score
+            if best >= decisive:
+                self.resolved[key] = {"most_similar": past[best_key], "score": None,
+                                      "match": LEXICAL, "lexical_score": round(best, 3)}
+                lexical += 1
+            else:
+                self.pending_current.append(label)
+
+        self.unique_past = list(past.values()) if self.pending_current else []
+        naive_texts = len(current_themes) + len(past_themes)
+        embedded_texts = len(self.pending_current) + len(self.unique_past)
+        self.texts_skipped = naive_texts - embedded_texts
+        self.needs_embeddings = bool(self.pending_current)
+
+        with _stats_lock:
+            _stats["requests"] += 1
+            _stats["exact_matches"] += exact
+            _stats["lexical_matches"] += lexical
+            _stats["texts_skipped"] += self.texts_skipped
+            if not self.needs_embeddings:
+                _stats["embedding_calls_avoided"] += 1
+
+    def add_embedding_scores(self, similarity_scores: dict) -> None:
+        """Merge scores computed from embeddings for the pending themes."""
+        for label in self.pending_current:
+            entry = similarity_scores[label]
+            self.resolved[normalize_theme(label)] = {
+                "most_similar": entry["most_similar"], "score": entry["score"], "match": EMBEDDING}
+
+    def results(self, current_themes, threshold: float) -> tuple:
+        """
+        Build (recurring_themes, similarity_scores) for the original,
+        un-deduplicated current themes, in the /analyze-themes shape.
+        """
+        recurring_themes = []
+        similarity_scores = {}
+        for theme in current_themes:
+            entry = self.resolved[normalize_theme(theme)]
+            similarity_scores[theme] = dict(entry)
+            if entry["match"] != EMBEDDING or entry["score"] > threshold:
+                recurring_themes.append(theme)
+        return recurring_themes, similarity_scores
+
+
+def lexical_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
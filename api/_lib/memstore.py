@@ -0,0 +1,142 @@
+"""
+Say It Better - Bounded in-memory store
+
+A byte-accounted LRU cache with a hard memory cap and per-entry TTLs, used
+wherever we keep data in process memory (the cloud fallback store in
+api/cloud.py and share links in the FastAPI backend).
+
+- Sizes are estimated once on insert and tracked in a running total, so the
+  cap is enforced without rescanning the store.
+- Least recently used entries are evicted until a new entry fits; an entry
+  larger than the whole cap is rejected.
+- Expiry uses a min-heap of deadlines, so purging only touches entries that
+  are actually due instead of scanning every key.
+
+Stdlib only, so both the serverless functions and the backend can import it.
+"""
+
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryStoreFull(Exception):
+    """Raised when a single entry is larger than the store's memory cap."""
+
+
+def estimate_size(value) -> int:
+    """Approximate the memory held by a JSON-like value, in bytes."""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemoryStore:
+    def __init__(self, max_bytes: int, default_ttl: float = None, name: str = 'memory'):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # key -> (value, size, expires_at)
+        self._entries = OrderedDict()
+        # (expires_at, seq, key); stale heap items are skipped lazily
+        self._deadlines = []
+        self._seq = itertools.count()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'rejected': 0}
+
+    def set(self, key, value, ttl: float = None, size: int = None) -> None:
+        """Store a value, evicting least recently used entries to make room."""
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise MemoryStoreFull(
+                f"Entry of {size} bytes exceeds the {self.name} store cap of {self.max_bytes} bytes"
+            )
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+
+        with self._lock:
+            self._purge_expired()
+            self._remove(key)
+            while self._bytes + size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            if expires_at is not None:
+                heapq.heappush(self._deadlines, (expires_at, next(self._seq), key))
+                if len(self._deadlines) > 2 * len(self._entries) + 64:
+                    self._compact_deadlines()
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._remove(key)
+            return default if entry is None else entry[0]
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            self._purge_expired()
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge_expired()
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        """Return occupancy and eviction metrics."""
+        with self._lock:
+            self._purge_expired()
+            return {
+                'name': self.name,
+                'items': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'utilization': round(self._bytes / self.max_bytes, 4) if self.max_bytes else 0.0,
+                **self._stats,
+            }
+
+    # Internal helpers - callers must hold the lock
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        return entry
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self._deadlines)
+            entry = self._entries.get(key)
+            # Skip heap items left behind by overwrites or deletes
+            if entry is not None and entry[2] == expires_at:
+                self._remove(key)
+                self._stats['expirations'] += 1
+
+    def _compact_deadlines(self) -> None:
+        self._deadlines = [
+            (entry[2], next(self._seq), key)
+            for key, entry in self._entries.items() if entry[2] is not None
+        ]
+        heapq.heapify(self._deadlines)
@@ -0,0 +1,74 @@
+"""
+Say It Better - JSON serialization
+
+One encoder for every response: orjson when it is installed, then msgspec,
+then the stdlib json module. All three produce compact UTF-8 JSON, so the
+output only differs in speed. JSON_BACKEND=json forces the stdlib path.
+"""
+
+import json
+import os
+
+_requested = (os.environ.get("JSON_BACKEND") or "").lower()
+
+BACKEND = "json"
+if _requested in ("", "orjson"):
+    try:
+        import orjson
+        BACKEND = "orjson"
+    except ImportError:
+        pass
+if BACKEND == "json" and _requested in ("", "msgspec"):
+    try:
+        import msgspec
+        _msgspec_encoder = msgspec.json.Encoder()
+        _msgspec_decoder = msgspec.json.Decoder()
+        BACKEND = "msgspec"
+    except ImportError:
+        pass
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if BACKEND == "orjson" else 0
+
+# Default CORS for the public endpoints
+ANY_ORIGIN = (("Access-Control-Allow-Origin", "*"),)
+
+
+def dumps(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes."""
+    if BACKEND == "orjson":
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    if BACKEND == "msgspec":
+        return _msgspec_encoder.encode(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """
+    Parse JSON from str or a bytes-like object (bytes, bytearray, memoryview);
+    raises json.JSONDecodeError on bad input.
+    """
+    if BACKEND == "orjson":
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        try:
+            return _msgspec_decoder.decode(data.encode("utf-8") if isinstance(data, str) else data)
+        except msgspec.DecodeError as e:
+            raise json.JSONDecodeError(str(e), "", 0) from None
+    if isinstance(data, memoryview):
+        # json.loads only takes str, bytes and bytearray
+        data = bytes(data)
+    return json.loads(data)
+
+
+def send_json_response(handler, status_code: int, data, headers=ANY_ORIGIN) -> None:
+    """Write a complete JSON response from a BaseHTTPRequestHandler."""
+    body = dumps(data)
+    handler.send_response(status_code)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(body)))
+    for key, value in headers:
+        handler.send_header(key, value)
+    handler.end_headers()
+    handler.wfile.write(body)
+
@@ -0,0 +1,535 @@
+"""
+Say It Better - Cloud sync storage backends
+
+api/cloud.py stores one record per user: a small metadata dict (version,
+checksum, counts, timestamps) and the encryptedData JSON blob. Backends
+implement the same interface, so self-hosted deployments can keep data on
+local disk instead of Redis:
+
+- MemoryStorage: bounded in-process store (development, Redis fallback).
+- SQLiteStorage: one SQLite file in WAL mode; blobs live in their own
+  table, and a TTL index makes expiry purges cheap.
+- AppendLogStorage: an append-only record log read through mmap, with an
+  in-memory index and inline compaction once enough of the file
+  is dead. Single-writer: one process per log file.
+
+Every save bumps a per-user revision (stored in the metadata), and a save
+can be made conditional on the revision the client last saw, which gives
+compare-and-swap uploads without a read-modify-write round trip.
+
+Reads return a UserRecord whose blob is produced in chunks (zero-copy
+memoryview slices for the append log, incremental blob reads for SQLite),
+and send_user_record() streams it straight into the HTTP response, so a
+GET never materializes the blob as a Python string. A record's chunks must
+be consumed: the SQLite read transaction ends when they are exhausted.
+"""
+
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+from .memstore import MemoryStore
+from .serialization import dumps, loads
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UserRecord:
+    """Stored metadata plus the serialized encryptedData, readable in chunks."""
+
+    __slots__ = ("meta", "size", "chunks")
+
+    def __init__(self, meta: dict, size: int, chunks):
+        self.meta = meta
+        self.size = size
+        self.chunks = chunks
+
+    def blob_bytes(self) -> bytes:
+        return b"".join(bytes(chunk) for chunk in self.chunks)
+
+
+class RevisionConflict(Exception):
+    """
+    A conditional save expected a different revision. `current` is the
+    stored metadata (including its revision), or None if there is no record.
+    """
+
+    def __init__(self, current):
+        super().__init__("Revision conflict")
+        self.current = current
+
+    @property
+    def current_revision(self) -> int:
+        return self.current.get("revision", 0) if self.current else 0
+
+
+class StorageUnavailable(Exception):
+    """
+    The authoritative store cannot be reached and the write cannot safely
+    go anywhere else; retry after `retry_after` seconds.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Storage unavailable")
+        self.retry_after = retry_after
+
+
+def encode_meta(data: dict, revision: int = None) -> bytes:
+    """The metadata JSON for a stored_data dict (everything but encryptedData)."""
+    meta = {k: v for k, v in data.items() if k != "encryptedData"}
+    if revision is not None:
+        meta["revision"] = revision
+    return dumps(meta)
+
+
+def split_record(data: dict) -> tuple:
+    """Split a stored_data dict into (meta JSON bytes, blob JSON bytes)."""
+    return encode_meta(data), dumps(data["encryptedData"])
+
+
+# expected_revision for If-Match: * - any stored record, but one must exist
+ANY_REVISION = "*"
+
+
+def check_revision(expected, current_meta) -> int:
+    """
+    Compare a conditional save's expected revision with the stored one and
+    return the revision the save should write; raises RevisionConflict.
+    """
+    current = current_meta.get("revision", 0) if current_meta else 0
+    if expected == ANY_REVISION:
+        if current_meta is None:
+            raise RevisionConflict(None)
+    elif expected is not None and expected != current:
+        raise RevisionConflict(current_meta)
+    return current + 1
+
+
+def send_user_record(handler, record: UserRecord, headers=()) -> None:
+    """
+    Write a 200 JSON response of the record's metadata with encryptedData,
+    streaming the blob instead of re-encoding it.
+    """
+    prefix = dumps(record.meta)[:-1]
+    prefix += (b',"encryptedData":' if len(prefix) > 1 else b'"encryptedData":')
+    handler.send_response(200)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(prefix) + record.size + 1))
+    for key, value in headers:
+        handler.send_header(key, value)
+    handler.end_headers()
+    handler.wfile.write(prefix)
+    for chunk in record.chunks:
+        handler.wfile.write(chunk)
+    handler.wfile.write(b"}")
+
+
+class StorageBackend:
+    """Interface for per-user encrypted record storage."""
+
+    name = "base"
+    durable = False
+
+    def get(self, user_id: str):
+        """Return the user's UserRecord, or None."""
+        raise NotImplementedError
+
+    def save(self, user_id: str, data: dict, expected_revision: int = None) -> int:
+        """
+        Store the record and return its new revision. With expected_revision
+        the write only happens if the stored revision (0 = no record) still
+        matches, atomically; otherwise RevisionConflict is raised.
+        ANY_REVISION matches any existing record.
+        """
+        raise NotImplementedError
+
+    def delete(self, user_id: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStorage(StorageBackend):
+    name = "memory"
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self._store = MemoryStore(max_bytes, default_ttl=ttl, name="cloud")
+        # Serializes check-and-set for conditional saves
+        self._write_lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._store.get(user_id)
+        if entry is None:
+            return None
+        meta, blob = entry
+        return UserRecord(loads(meta), len(blob), (blob,))
+
+    def save(self, user_id, data, expected_revision=None):
+        blob = dumps(data["encryptedData"])
+        with self._write_lock:
+            entry = self._store.get(user_id)
+            revision = check_revision(expected_revision, loads(entry[0]) if entry else None)
+            self._store.set(user_id, (encode_meta(data, revision), blob))
+        return revision
+
+    def delete(self, user_id):
+        self._store.pop(user_id, None)
+
+    def stats(self):
+        return {"backend": self.name, **self._store.stats()}
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    SQLite in WAL mode: readers never block the writer. Metadata and blobs
+    are separate tables so listing/expiry never pages in ciphertext.
+    """
+
+    name = "sqlite"
+    durable = True
+    _PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+        conn = self._conn()
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id TEXT PRIMARY KEY,
+                    meta TEXT NOT NULL,
+                    blob_size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS blobs (
+                    user_id TEXT PRIMARY KEY,
+                    data BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS users_expires_at ON users (expires_at);
+            """)
+
+    @staticmethod
+    def _begin(conn, statement):
+        if conn.in_transaction:
+            conn.execute("COMMIT")  # a previous record was never consumed
+        conn.execute(statement)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id):
+        conn = self._conn()
+        # The read transaction pins a consistent snapshot until the blob has
+        # been streamed; it is committed when the chunks are exhausted
+        self._begin(conn, "BEGIN")
+        row = conn.execute(
+            "SELECT u.meta, u.blob_size, b.rowid FROM users u JOIN blobs b USING (user_id)"
+            " WHERE u.user_id = ? AND u.expires_at > ?",
+            (user_id, time.time()),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        meta, size, rowid = row
+        return UserRecord(loads(meta), size, self._read_blob(conn, rowid))
+
+    def _read_blob(self, conn, rowid):
+        try:
+            if not hasattr(conn, "blobopen"):  # Python < 3.11
+                yield conn.execute("SELECT data FROM blobs WHERE rowid = ?", (rowid,)).fetchone()[0]
+                return
+            with conn.blobopen("blobs", "data", rowid, readonly=True) as blob:
+                while True:
+                    chunk = blob.read(CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        finally:
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+
+    def save(self, user_id, data, expected_revision=None):
+        blob = dumps(data["encryptedData"])
+        now = time.time()
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock up front, so the revision
+        # check and the write below are atomic
+        self._begin(conn, "BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT meta FROM users WHERE user_id = ? AND expires_at > ?", (user_id, now)
+            ).fetchone()
+            revision = check_revision(expected_revision, loads(row[0]) if row else None)
+            conn.execute(
+                "INSERT INTO users (user_id, meta, blob_size, expires_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (user_id) DO UPDATE SET meta = excluded.meta,"
+                " blob_size = excluded.blob_size, expires_at = excluded.expires_at",
+                (user_id, encode_meta(data, revision).decode("utf-8"), len(blob), now + self.ttl),
+            )
+            # Updating in place keeps the blob's rowid stable for open readers
+            conn.execute(
+                "INSERT INTO blobs (user_id, data) VALUES (?, ?)"
+                " ON CONFLICT (user_id) DO UPDATE SET data = excluded.data",
+                (user_id, blob),
+            )
+            if now - self._last_purge > self._PURGE_INTERVAL:
+                self._purge_expired(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return revision
+
+    def _purge_expired(self, conn, now):
+        self._last_purge = now
+        conn.execute(
+            "DELETE FROM blobs WHERE user_id IN (SELECT user_id FROM users WHERE expires_at <= ?)",
+            (now,),
+        )
+        conn.execute("DELETE FROM users WHERE expires_at <= ?", (now,))
+
+    def delete(self, user_id):
+        conn = self._conn()
+        self._begin(conn, "BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM blobs WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        conn = self._conn()
+        users, blob_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(blob_size), 0) FROM users WHERE expires_at > ?",
+            (time.time(),),
+        ).fetchone()
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "users": users,
+            "blob_bytes": blob_bytes,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Append-only log record header: magic, op, key length, meta length,
+# blob length, expires_at, crc32 of key+meta+blob
+_HEADER = struct.Struct("<4sBHIId I")
+_MAGIC = b"SIB1"
+_PUT = 1
+_DELETE = 2
+
+
+class AppendLogStorage(StorageBackend):
+    """
+    Records are only ever appended; the newest record for a user wins and a
+    delete appends a tombstone. The index maps user_id to the offsets of
+    its metadata and blob inside the file, so a GET is a memoryview slice
+    of the mmap with no copy. When dead bytes (overwritten, deleted or
+    expired records) exceed compact_ratio of the file, live records are
+    rewritten to a new file that atomically replaces the old one.
+    """
+
+    name = "applog"
+    durable = True
+    _EXPIRY_SCAN_INTERVAL = 60.0
+
+    def __init__(self, path: str, ttl: float, fsync: bool = True,
+                 compact_ratio: float = 0.5, compact_min_bytes: int = 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.fsync = fsync
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._lock = threading.Lock()
+        # user_id -> (meta_offset, meta_len, blob_offset, blob_len, expires_at, record_len)
+        self._index = {}
+        self._dead_bytes = 0
+        self._last_expiry_scan = 0.0
+        self._map = None
+        self._compactions = 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        self._size = self._load()
+
+    # --- file scanning ---
+
+    def _load(self) -> int:
+        """Rebuild the index; a torn or corrupt tail is truncated away."""
+        size = os.fstat(self._fd).st_size
+        if not size:
+            return 0
+        view = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        try:
+            offset = 0
+            while offset + _HEADER.size <= size:
+                magic, op, key_len, meta_len, blob_len, expires_at, crc = \
+                    _HEADER.unpack_from(view, offset)
+                body = offset + _HEADER.size
+                end = body + key_len + meta_len + blob_len
+                if magic != _MAGIC or end > size or zlib.crc32(view[body:end]) != crc:
+                    break
+                user_id = view[body:body + key_len].decode("utf-8")
+                self._forget(user_id)
+                if op == _PUT:
+                    meta_offset = body + key_len
+                    self._index[user_id] = (meta_offset, meta_len, meta_offset + meta_len,
+                                            blob_len, expires_at, end - offset)
+                else:
+                    self._dead_bytes += end - offset
+                offset = end
+        finally:
+            view.close()
+        if offset < size:
+            print(f"Append log {self.path}: truncating {size - offset} bytes of incomplete records")
+            os.ftruncate(self._fd, offset)
+        return offset
+
+    def _forget(self, user_id):
+        previous = self._index.pop(user_id, None)
+        if previous is not None:
+            self._dead_bytes += previous[5]
+
+    def _view(self):
+        """The mmap covering the whole file (remapped after appends)."""
+        if self._map is None or len(self._map) < self._size:
+            # Older maps stay alive while readers still hold slices of them
+            self._map = mmap.mmap(self._fd, self._size, access=mmap.ACCESS_READ) if self._size else None
+        return self._map
+
+    # --- interface ---
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._live_entry(user_id)
+            if entry is None:
+                return None
+            meta_offset, meta_len, blob_offset, blob_len, _, _ = entry
+            view = memoryview(self._view())
+        meta = loads(view[meta_offset:meta_offset + meta_len])
+        return UserRecord(meta, blob_len, (view[blob_offset:blob_offset + blob_len],))
+
+    def save(self, user_id, data, expected_revision=None):
+        blob = dumps(data["encryptedData"])
+        with self._lock:
+            entry = self._live_entry(user_id)
+            current = None
+            if entry is not None:
+                current = loads(self._view()[entry[0]:entry[0] + entry[1]])
+            revision = check_revision(expected_revision, current)
+            self._append(_PUT, user_id, encode_meta(data, revision), blob, time.time() + self.ttl)
+        return revision
+
+    def delete(self, user_id):
+        with self._lock:
+            if user_id in self._index:
+                self._append(_DELETE, user_id, b"", b"", 0.0)
+
+    def _live_entry(self, user_id):
+        entry = self._index.get(user_id)
+        if entry is None or entry[4] <= time.time():
+            return None
+        return entry
+
+    def _append(self, op, user_id, meta, blob, expires_at):
+        """Append one record and update the index (lock held)."""
+        key = user_id.encode("utf-8")
+        crc = zlib.crc32(blob, zlib.crc32(meta, zlib.crc32(key)))
+        header = _HEADER.pack(_MAGIC, op, len(key), len(meta), len(blob), expires_at, crc)
+        offset = self._size
+        os.writev(self._fd, [header, key, meta, blob])
+        if self.fsync:
+            os.fsync(self._fd)
+        record_len = _HEADER.size + len(key) + len(meta) + len(blob)
+        self._size += record_len
+        self._forget(user_id)
+        if op == _PUT:
+            meta_offset = offset + _HEADER.size + len(key)
+            self._index[user_id] = (meta_offset, len(meta), meta_offset + len(meta),
+                                    len(blob), expires_at, record_len)
+        else:
+            self._dead_bytes += record_len
+        if self._size >= self.compact_min_bytes and self._should_compact():
+            self._compact()
+
+    def _should_compact(self) -> bool:
+        limit = self._size * self.compact_ratio
+        if self._dead_bytes > limit:
+            return True
+        # Expired records are only counted occasionally: it is a full index scan
+        now = time.time()
+        if now - self._last_expiry_scan < self._EXPIRY_SCAN_INTERVAL:
+            return False
+        self._last_expiry_scan = now
+        expired = sum(entry[5] for entry in self._index.values() if entry[4] <= now)
+        return self._dead_bytes + expired > limit
+
+    def _compact(self):
+        """Rewrite live records to a new file and swap it in (lock held)."""
+        tmp_path = f"{self.path}.compact"
+        now = time.time()
+        view = self._view()
+        new_index = {}
+        offset = 0
+        with open(tmp_path, "wb") as out:
+            for user_id, entry in self._index.items():
+                meta_offset, meta_len, blob_offset, blob_len, expires_at, record_len = entry
+                if expires_at <= now:
+                    continue
+                start = meta_offset - _HEADER.size - len(user_id.encode("utf-8"))
+                out.write(view[start:start + record_len])
+                new_meta_offset = offset + (meta_offset - start)
+                new_index[user_id] = (new_meta_offset, meta_len, new_meta_offset + meta_len,
+                                      blob_len, expires_at, record_len)
+                offset += record_len
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+        os.close(self._fd)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+        self._index = new_index
+        self._size = offset
+        self._dead_bytes = 0
+        self._map = None
+        self._compactions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "path": self.path,
+                "users": len(self._index),
+                "file_bytes": self._size,
+                "dead_bytes": self._dead_bytes,
+                "compactions": self._compactions,
+            }
+
+    def close(self):
+        with self._lock:
+            self._map = None
+            os.close(self._fd)
@@ -0,0 +1,123 @@
+"""
+Say It Better - Theme recurrence shared by the serverless functions
+
+api/analyze-themes.py and api/translate-with-themes.py score current theme
+labels against past ones the same way: lexical pre-pass first, then the
+embedding service for whatever is left.
+"""
+
+import os
+import urllib.request
+
+from . import workload
+from .deadline import fetch_upstream
+from .lexical import LexicalPrepass
+from .serialization import dumps, loads
+from .vectors import EmbeddingCache, borderline, rerank, rerank_texts
+
+QWEN_EMB_ENDPOINT = os.environ.get("QWEN_EMB_ENDPOINT")
+QWEN_EMB_TOKEN = os.environ.get("QWEN_EMB_TOKEN")
+QWEN_EMB_MODEL = os.environ.get("QWEN_EMB_MODEL", "Qwen/Qwen3-Embedding-8B")
+QWEN_EMB_HEADERS = {
+    "Authorization": f"Bearer {QWEN_EMB_TOKEN}",
+    "Content-Type": "application/json"
+}
+EMBEDDINGS_CONFIGURED = bool(QWEN_EMB_ENDPOINT and QWEN_EMB_TOKEN)
+
+# Scores at or above this mark a theme as recurring
+RECURRING_THRESHOLD = 0.7
+
+
+def cosine_similarity(vec1, vec2):
+    dot_product = sum(a * b for a, b in zip(vec1, vec2))
+    magnitude1 = sum(a * a for a in vec1) ** 0.5
+    magnitude2 = sum(b * b for b in vec2) ** 0.5
+    if magnitude1 == 0 or magnitude2 == 0:
+        return 0.0
+    return dot_product / (magnitude1 * magnitude2)
+
+
+def get_embeddings(texts, deadline, handler=None, dimensions=0):
+    payload = {
+        "model": QWEN_EMB_MODEL,
+        "input": texts
+    }
+    if dimensions:
+        # Matryoshka truncation on the provider side
+        payload["dimensions"] = dimensions
+    request_data = dumps(payload)
+
+    req = urllib.request.Request(
+        f"{QWEN_EMB_ENDPOINT}/v1/embeddings",
+        data=request_data,
+        headers=QWEN_EMB_HEADERS
+    )
+
+    with workload.upstream():
+        result = loads(fetch_upstream(req, deadline, handler, 30))
+
+    return [item["embedding"] for item in result["data"]]
+
+
+# Theme vectors stay cached (quantized) for the life of a warm instance
+_embedding_cache = EmbeddingCache(QWEN_EMB_MODEL)
+
+
+def get_theme_vectors(texts, deadline, handler=None):
+    """Embed theme labels via the cache; returns (vectors, freshly fetched)."""
+    found, missing = _embedding_cache.lookup(texts)
+    fresh = {}
+    if missing:
+        embeddings = get_embeddings(missing, deadline, handler, _embedding_cache.dimensions)
+        for text, vector in zip(missing, embeddings):
+            fresh[text] = _embedding_cache.store(text, vector)
+    vectors = {**found, **fresh}
+    return [vectors[text] for text in texts], fresh
+
+
+def analyze_themes(current_themes, past_themes, deadline, handler=None, fresh=None) -> tuple:
+    """
+    Return (recurring_themes, similarity_scores) in the /analyze-themes
+    shape. fresh holds vectors the caller already fetched for this request
+    (full precision is only re-fetched for texts that came from the cache).
+    """
+    # Exact and near-identical labels are scored lexically; only the
+    # rest (deduplicated) are embedded
+    prepass = LexicalPrepass(current_themes, past_themes)
+
+    if prepass.needs_embeddings:
+        pending, past = prepass.pending_current, prepass.unique_past
+        vectors, fetched = get_theme_vectors(pending + past, deadline, handler)
+        fresh = {**(fresh or {}), **fetched}
+
+        current_embeddings = vectors[:len(pending)]
+        past_embeddings = vectors[len(pending):]
+
+        similarity_scores = {}
+        for i, current_theme in enumerate(pending):
+            max_similarity = 0.0
+            most_similar_past = None
+
+            for j, past_theme in enumerate(past):
+                similarity = cosine_similarity(current_embeddings[i], past_embeddings[j])
+                if similarity > max_similarity:
+                    max_similarity = similarity
+                    most_similar_past = past_theme
+
+            similarity_scores[current_theme] = {
+                "most_similar": most_similar_past,
+                "score": round(max_similarity, 3)
+            }
+
+        # Re-score borderline matches from full-precision vectors
+        uncertain = borderline(similarity_scores, RECURRING_THRESHOLD)
+        if uncertain:
+            texts = rerank_texts(similarity_scores, uncertain)
+            if _embedding_cache.dimensions or any(text not in fresh for text in texts):
+                full_vectors = get_embeddings(texts, deadline, handler)
+                rerank(similarity_scores, uncertain, dict(zip(texts, full_vectors)))
+                _embedding_cache.record_reranked(len(uncertain))
+        prepass.add_embedding_scores(similarity_scores)
+
+    # Find recurring themes
+    return prepass.results(current_themes, RECURRING_THRESHOLD)
@@ -0,0 +1,155 @@
+"""
+Say It Better - Groq translation call shared by the serverless functions
+
+api/translate.py and api/translate-with-themes.py build the same prompt,
+call Groq the same way and map its failures onto the same responses.
+"""
+
+import urllib.error
+import urllib.request
+
+from . import workload
+from .config import get_clean_env
+from .deadline import fetch_upstream
+from .serialization import dumps, loads
+
+# Groq API endpoint (OpenAI-compatible)
+GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+
+# Read once per cold start, reused by every warm request
+GROQ_API_KEY = get_clean_env("GROQ_API_KEY")
+GROQ_MODEL = get_clean_env("GROQ_MODEL", "llama-3.3-70b-versatile")
+GROQ_HEADERS = {
+    "Authorization": f"Bearer {GROQ_API_KEY}",
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "User-Agent": "SayItBetter/1.0 (+https://vercel.app)",
+    "Connection": "close"
+}
+
+# System prompt
+SYSTEM_PROMPT = """You are a language assistant that helps people express their thoughts more clearly. Your ONLY purpose is to rewrite emotional or unstructured text into clear, neutral, respectful language.
+
+STRICT RULES - YOU MUST FOLLOW THESE:
+1. DO NOT give advice or suggestions
+2. DO NOT diagnose or label mental health conditions
+3. DO NOT assume intent or read between the lines
+4. DO NOT act as a therapist, counselor, or medical professional
+5. DO NOT use crisis intervention language
+6. DO NOT add information that wasn't in the original text
+7. ONLY rephrase and summarize what the user has written
+
+Your output must be in valid JSON format with exactly this structure:
+{
+    "summary": "A clear, calm 2-4 sentence summary of what the person expressed",
+    "themes": [
+        {"theme": "Theme Name", "description": "Brief neutral description"},
+        {"theme": "Theme Name", "description": "Brief neutral description"}
+    ],
+    "share_ready": "A polished, professional version suitable for sharing with a healthcare provider, therapist, or trusted person"
+}
+
+Remember: You are translating language, not analyzing minds. Keep themes factual and based only on what was explicitly stated."""
+
+# Returned when GROQ_API_KEY is missing
+NOT_CONFIGURED = {
+    "error": "API not configured. Set GROQ_API_KEY in Vercel environment variables.",
+    "setup": "Get your free API key at https://console.groq.com"
+}
+
+
+def get_tone_instruction(tone: str) -> str:
+    if tone == "personal":
+        return "\nUse first-person language and a warmer, more personal tone while remaining clear."
+    elif tone == "clinical":
+        return "\nUse precise, clinical language suitable for medical contexts."
+    return "\nMaintain a balanced, neutral tone."
+
+
+def build_user_prompt(raw_text: str, tone: str) -> str:
+    return f"""Please rewrite the following text into clear, neutral language.
+{get_tone_instruction(tone)}
+
+Original text:
+\"\"\"{raw_text}\"\"\"
+
+Respond ONLY with valid JSON matching this exact structure:
+{{
+    "summary": "A clear, calm 2-4 sentence summary",
+    "themes": [
+        {{"theme": "Theme Name", "description": "Brief description"}},
+        {{"theme": "Theme Name", "description": "Brief description"}}
+    ],
+    "share_ready": "A polished version suitable for sharing"
+}}
+
+JSON Response:"""
+
+
+def extract_json(content: str):
+    """Parse the JSON object in a model reply, tolerating code fences and chatter."""
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+
+    content = content.strip()
+    if not content.startswith("{"):
+        start = content.find("{")
+        end = content.rfind("}") + 1
+        if start != -1 and end > start:
+            content = content[start:end]
+
+    return loads(content)
+
+
+def translate_text(raw_text: str, tone: str, deadline: float, handler=None) -> dict:
+    """
+    Translate raw_text with Groq; returns the parsed reply plus
+    original_length and translated_length. Raises urllib.error.HTTPError,
+    json.JSONDecodeError and the _lib.deadline exceptions.
+    """
+    # Call Groq API (OpenAI-compatible chat format)
+    request_data = dumps({
+        "model": GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_user_prompt(raw_text, tone)}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 1000
+    })
+
+    req = urllib.request.Request(
+        GROQ_ENDPOINT,
+        data=request_data,
+        headers=GROQ_HEADERS
+    )
+
+    with workload.upstream():
+        result = loads(fetch_upstream(req, deadline, handler, 60))
+
+    # Groq uses chat format - content is in message
+    parsed = extract_json(result["choices"][0]["message"]["content"])
+
+    # Add metadata
+    parsed["original_length"] = len(raw_text)
+    parsed["translated_length"] = len(parsed.get("summary", ""))
+    return parsed
+
+
+def upstream_error(e: urllib.error.HTTPError) -> dict:
+    """The 502 response body for a Groq HTTP error."""
+    error_body = ""
+    try:
+        error_body = e.read().decode('utf-8')[:500]
+    except Exception:
+        pass
+    hint = None
+    if e.code == 403 and "1010" in error_body:
+        hint = "Groq request blocked (Cloudflare 1010). Re-save GROQ_API_KEY in Vercel without quotes/spaces, redeploy, and ensure server sends User-Agent header."
+    return {
+        "error": f"AI service error: {e.code}",
+        "details": error_body,
+        "hint": hint
+    }
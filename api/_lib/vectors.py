@@ -0,0 +1,165 @@
+"""
+Say It Better - Compact embedding storage
+
+Embeddings arrive as lists of Python floats (about 32 bytes per dimension
+once boxed). Vectors kept across requests are stored compactly instead:
+
+- Matryoshka truncation: when EMBEDDING_DIMENSIONS is set, vectors are cut
+  to that many leading dimensions and re-normalized. Providers that support
+  a `dimensions` parameter are asked for it directly; truncate() is the
+  local fallback when they are not (or ignore it).
+- Quantization: cached vectors are stored as int8 codes with a per-vector
+  scale (default) or as float16, i.e. 1-2 bytes per dimension.
+- Re-ranking: quantized and truncated scores are slightly noisy, so scores
+  within EMBEDDING_RERANK_MARGIN of the recurrence threshold are recomputed
+  from full-precision, full-width vectors (see borderline()/rerank()).
+
+Stdlib only, so both the serverless functions and the backend can import it.
+"""
+
+import array
+import hashlib
+import os
+import struct
+import sys
+import threading
+
+from .memstore import MemoryStore
+
+EMBEDDING_DIMENSIONS = int(os.environ.get("EMBEDDING_DIMENSIONS") or 0)
+# "int8" (default) or "float16"
+EMBEDDING_STORAGE = (os.environ.get("EMBEDDING_STORAGE") or "int8").lower()
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES") or 16 * 1024 * 1024)
+EMBEDDING_RERANK_MARGIN = float(os.environ.get("EMBEDDING_RERANK_MARGIN") or 0.03)
+
+
+def truncate(vector, dimensions: int = EMBEDDING_DIMENSIONS) -> list:
+    """Keep the leading `dimensions` values and re-normalize (0 keeps all)."""
+    if not dimensions or len(vector) <= dimensions:
+        return list(vector)
+    head = vector[:dimensions]
+    norm = sum(x * x for x in head) ** 0.5
+    if norm == 0:
+        return list(head)
+    return [x / norm for x in head]
+
+
+def quantize(vector, storage: str = EMBEDDING_STORAGE) -> tuple:
+    """Encode a float vector as (storage, scale, codes bytes)."""
+    if storage == "float16":
+        return ("float16", 1.0, struct.pack(f"<{len(vector)}e", *vector))
+    peak = max((abs(x) for x in vector), default=0.0)
+    scale = peak / 127 if peak else 1.0
+    codes = array.array("b", (round(x / scale) for x in vector))
+    return ("int8", scale, codes.tobytes())
+
+
+def dequantize(encoded: tuple) -> list:
+    """Decode a quantize() result back into a list of floats."""
+    storage, scale, codes = encoded
+    if storage == "float16":
+        return list(struct.unpack(f"<{len(codes) // 2}e", codes))
+    values = array.array("b")
+    values.frombytes(codes)
+    return [x * scale for x in values]
+
+
+def float_list_size(dimensions: int) -> int:
+    """Memory held by a plain list of `dimensions` Python floats."""
+    return sys.getsizeof([0.0] * dimensions) + dimensions * sys.getsizeof(0.0)
+
+
+class EmbeddingCache:
+    """
+    Text -> quantized embedding cache on top of MemoryStore.
+
+    Keys include the model and dimension count, so changing either never
+    serves vectors from a different embedding space.
+    """
+
+    def __init__(self, model: str, dimensions: int = EMBEDDING_DIMENSIONS,
+                 storage: str = EMBEDDING_STORAGE, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.model = model
+        self.dimensions = dimensions
+        self.storage = storage
+        self._store = MemoryStore(max_bytes, name="embeddings")
+        self._lock = threading.Lock()
+        self._stats = {"stored": 0, "stored_bytes": 0, "float_list_bytes": 0, "reranked": 0}
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{self.model}:{self.dimensions}:{digest}"
+
+    def lookup(self, texts) -> tuple:
+        """Return ({text: dequantized vector} for hits, [texts to embed])."""
+        found = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            encoded = self._store.get(self._key(text))
+            if encoded is None:
+                missing.append(text)
+            else:
+                found[text] = dequantize(encoded)
+        return found, missing
+
+    def store(self, text: str, vector) -> list:
+        """
+        Truncate and cache a freshly fetched vector; return the truncated
+        full-precision vector for immediate use.
+        """
+        vector = truncate(vector, self.dimensions)
+        encoded = quantize(vector, self.storage)
+        self._store.set(self._key(text), encoded)
+        with self._lock:
+            self._stats["stored"] += 1
+            self._stats["stored_bytes"] += len(encoded[2])
+            self._stats["float_list_bytes"] += float_list_size(len(vector))
+        return vector
+
+    def record_reranked(self, count: int) -> None:
+        with self._lock:
+            self._stats["reranked"] += count
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stored_bytes = stats.pop("stored_bytes")
+        float_list_bytes = stats.pop("float_list_bytes")
+        return {
+            "model": self.model,
+            "dimensions": self.dimensions or "full",
+            "storage": self.storage,
+            **stats,
+            "compression_ratio": round(float_list_bytes / stored_bytes, 1) if stored_bytes else None,
+            "store": self._store.stats(),
+        }
+
+
+def borderline(similarity_scores: dict, threshold: float,
+               margin: float = EMBEDDING_RERANK_MARGIN) -> list:
+    """Current themes whose approximate score is too close to call."""
+    return [
+        theme for theme, entry in similarity_scores.items()
+        if entry["most_similar"] is not None and abs(entry["score"] - threshold) <= margin
+    ]
+
+
+def rerank_texts(similarity_scores: dict, themes) -> list:
+    """The distinct labels whose full-precision vectors rerank() needs."""
+    texts = []
+    for theme in themes:
+        texts += [theme, similarity_scores[theme]["most_similar"]]
+    return list(dict.fromkeys(texts))
+
+
+def rerank(similarity_scores: dict, themes, full_vectors: dict) -> None:
+    """
+    Recompute the scores of `themes` against their most similar past theme
+    from full-precision vectors ({text: vector}), in place.
+    """
+    for theme in themes:
+        entry = similarity_scores[theme]
+        a, b = full_vectors[theme], full_vectors[entry["most_similar"]]
+        dot = sum(x * y for x, y in zip(a, b))
+        norms = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+        entry["score"] = round(dot / norms, 3) if norms else 0.0
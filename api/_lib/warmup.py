@@ -0,0 +1,156 @@
+"""
+Say It Better - Upstream keep-warm and cold-start handling
+
+The Hugging Face Inference API unloads a model nobody has used for a
+while. The next request gets a 503 such as
+{"error": "Model ... is currently loading", "estimated_time": 20.0} until
+the model is back, which users used to see as "Model is loading, please
+try again".
+
+ModelWarmth tracks that per upstream model:
+- a request that hits a cold load is held and retried, pacing retries by
+  estimated_time, for at most max_wait seconds in total
+- requests arriving while a load is known to be in progress wait for it
+  first, instead of adding another 503 round trip to the pile
+- probe_due() says when a cheap keep-warm request is worth sending: only
+  while real traffic has been seen recently, so an idle deployment still
+  lets the model go
+- time spent in cold loads, and by requests held for them, is counted
+
+The retry loops live in the callers (blocking in the serverless handlers,
+asyncio in the backend); this module only keeps state and timing.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+COLD_START_MAX_WAIT_SECONDS = float(os.environ.get("COLD_START_MAX_WAIT_SECONDS") or 25)
+KEEP_WARM_INTERVAL_SECONDS = float(os.environ.get("KEEP_WARM_INTERVAL_SECONDS") or 240)
+KEEP_WARM_ACTIVE_SECONDS = float(os.environ.get("KEEP_WARM_ACTIVE_SECONDS") or 1800)
+
+# Bounds on the pause between retries of a loading model
+MIN_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 5.0
+# Used when a loading reply carries no estimated_time
+DEFAULT_LOAD_ESTIMATE = 10.0
+
+PROBE_TEXT = "warm-up"
+
+
+def loading_estimate(status: int, body) -> Optional[float]:
+    """
+    Estimated seconds until the model is loaded when an upstream reply is a
+    "model is loading" 503, otherwise None (a real outage stays an error).
+    """
+    if status != 503:
+        return None
+    try:
+        data = json.loads(body or b"{}")
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    estimate = data.get("estimated_time")
+    if isinstance(estimate, (int, float)) and estimate >= 0:
+        return float(estimate)
+    if "loading" in str(data.get("error", "")).lower():
+        return DEFAULT_LOAD_ESTIMATE
+    return None
+
+
+class ModelWarmth:
+    def __init__(self, name: str, max_wait: float = COLD_START_MAX_WAIT_SECONDS,
+                 probe_interval: float = KEEP_WARM_INTERVAL_SECONDS,
+                 active_window: float = KEEP_WARM_ACTIVE_SECONDS):
+        self.name = name
+        self.max_wait = max_wait
+        self.probe_interval = probe_interval
+        self.active_window = active_window
+        self._loading_since = None
+        self._ready_at = 0.0
+        self._last_traffic = None
+        self._last_contact = None
+        self._stats = {
+            "cold_starts": 0, "cold_start_ms_total": 0.0, "last_cold_start_ms": None,
+            "requests_held": 0, "held_ms_total": 0.0, "gave_up": 0,
+            "probes": 0, "probe_failures": 0,
+        }
+        self._lock = threading.Lock()
+
+    def record_use(self) -> None:
+        """A real (non-probe) request was sent to the model."""
+        with self._lock:
+            self._last_traffic = time.monotonic()
+
+    def queue_delay(self) -> float:
+        """Seconds a new request should wait for a load already in progress."""
+        with self._lock:
+            if self._loading_since is None:
+                return 0.0
+            return max(0.0, min(self._ready_at - time.monotonic(), MAX_RETRY_DELAY))
+
+    def record_loading(self, estimate: float) -> None:
+        """The model answered "loading", expected to be ready in estimate seconds."""
+        with self._lock:
+            now = time.monotonic()
+            if self._loading_since is None:
+                self._loading_since = now
+            self._ready_at = now + estimate
+            self._last_contact = now
+
+    def retry_delay(self, estimate: float, waited: float, time_left: float = None) -> Optional[float]:
+        """
+        Pause before retrying a request that has already waited `waited`
+        seconds, or None when retrying would exceed the bounded wait or the
+        `time_left` before the request's own deadline.
+        """
+        delay = max(MIN_RETRY_DELAY, min(estimate, MAX_RETRY_DELAY))
+        if waited + delay > self.max_wait or (time_left is not None and delay >= time_left):
+            return None
+        return delay
+
+    def record_ready(self) -> None:
+        """The model answered normally: any cold load is over."""
+        with self._lock:
+            now = time.monotonic()
+            self._last_contact = now
+            if self._loading_since is not None:
+                elapsed_ms = round((now - self._loading_since) * 1000, 1)
+                self._loading_since = None
+                self._stats["cold_starts"] += 1
+                self._stats["cold_start_ms_total"] = round(self._stats["cold_start_ms_total"] + elapsed_ms, 1)
+                self._stats["last_cold_start_ms"] = elapsed_ms
+                print(f"Model '{self.name}' finished loading after {elapsed_ms}ms")
+
+    def record_held(self, waited: float, served: bool) -> None:
+        """A request spent `waited` seconds held for a cold load."""
+        with self._lock:
+            self._stats["requests_held"] += 1
+            self._stats["held_ms_total"] = round(self._stats["held_ms_total"] + waited * 1000, 1)
+            if not served:
+                self._stats["gave_up"] += 1
+
+    def probe_due(self) -> bool:
+        """True while traffic is active and the model has been quiet for a probe interval."""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_traffic is None or now - self._last_traffic > self.active_window:
+                return False
+            return self._last_contact is None or now - self._last_contact >= self.probe_interval
+
+    def record_probe(self, ok: bool) -> None:
+        with self._lock:
+            self._stats["probes"] += 1
+            if not ok:
+                self._stats["probe_failures"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "model": self.name,
+                "loading": self._loading_since is not None,
+            }
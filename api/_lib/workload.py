@@ -0,0 +1,212 @@
+"""
+Say It Better - Privacy-safe workload capture
+
+Real inputs are too sensitive to load-test with, so this records only the
+shape of traffic: when requests arrive, how big they are, which options
+they use and how long the upstream calls took. benchmarks/replay_workload.py
+turns a capture back into synthetic requests with the same distributions.
+
+Capture is off unless WORKLOAD_CAPTURE is set:
+- WORKLOAD_CAPTURE=stdout prints each record to the function log as a
+  "workload {...}" line (serverless instances have no durable disk)
+- any other value is a file that JSON lines are appended to
+WORKLOAD_CAPTURE_SAMPLE keeps only that fraction of requests (default 1).
+
+Text never reaches a record. Handlers can only note() fields from a fixed
+schema: numbers and flags, plus a few strings that must come from a fixed
+vocabulary (anything else is written as "other"). Unknown fields are
+dropped.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+WORKLOAD_CAPTURE = os.environ.get("WORKLOAD_CAPTURE") or ""
+WORKLOAD_CAPTURE_SAMPLE = float(os.environ.get("WORKLOAD_CAPTURE_SAMPLE") or 1)
+
+LOG_PREFIX = "workload "
+
+# Endpoint names are the same for both runtimes, so captures are comparable
+ENDPOINTS = ("translate", "analyze-themes", "cloud", "share")
+
+_NUMBERS = {
+    "status", "bytes_in", "bytes_out", "ms", "upstream_ms", "upstream_calls",
+    "chars", "themes", "past_themes", "entries", "payload_bytes",
+}
+_FLAGS = {"all_tones", "draft", "variant", "conditional", "replayed"}
+_CHOICES = {
+    "endpoint": ENDPOINTS,
+    "method": ("GET", "POST", "DELETE"),
+    "tone": ("neutral", "personal", "clinical"),
+}
+
+_current = contextvars.ContextVar("workload_capture", default=None)
+
+
+def _clean(fields: dict) -> dict:
+    """Keep only schema fields, coerced to their types."""
+    record = {}
+    for name, value in fields.items():
+        if value is None:
+            continue
+        if name in _NUMBERS:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                record[name] = round(value, 1) if isinstance(value, float) else value
+        elif name in _FLAGS:
+            record[name] = bool(value)
+        elif name in _CHOICES:
+            record[name] = value if value in _CHOICES[name] else "other"
+    return record
+
+
+class Capture:
+    """Shape of one request, filled in while it is handled."""
+
+    def __init__(self, endpoint: str, method: str, bytes_in: int = None):
+        self.arrival = time.time()
+        self.started = time.perf_counter()
+        self.fields = {"endpoint": endpoint, "method": method, "bytes_in": bytes_in}
+        self.upstream_seconds = 0.0
+        self.upstream_calls = 0
+        self.discarded = False
+
+    def record(self) -> dict:
+        record = {"t": round(self.arrival, 3)}
+        record.update(_clean({
+            **self.fields,
+            "ms": (time.perf_counter() - self.started) * 1000,
+            "upstream_ms": self.upstream_seconds * 1000 if self.upstream_calls else None,
+            "upstream_calls": self.upstream_calls or None,
+        }))
+        return record
+
+
+def note(**fields) -> None:
+    """Add shape fields to the current request's capture (no-op when off)."""
+    capture = _current.get()
+    if capture is not None:
+        capture.fields.update(fields)
+
+
+def discard() -> None:
+    """Leave the current request out of the capture (health checks and such)."""
+    capture = _current.get()
+    if capture is not None:
+        capture.discarded = True
+
+
+@contextmanager
+def upstream():
+    """Time an upstream call made for the current request."""
+    capture = _current.get()
+    if capture is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        capture.upstream_seconds += time.perf_counter() - started
+        capture.upstream_calls += 1
+
+
+class WorkloadRecorder:
+    def __init__(self, target: str = WORKLOAD_CAPTURE, sample: float = WORKLOAD_CAPTURE_SAMPLE):
+        self.target = target
+        self.sample = sample
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "write_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.target)
+
+    def start(self, endpoint: str, method: str, bytes_in: int = None):
+        """
+        Begin capturing a request. Returns (capture, token) - capture is None
+        when capture is off or the request was not sampled.
+        """
+        if not self.target or (self.sample < 1 and random.random() >= self.sample):
+            return None, None
+        capture = Capture(endpoint, method, bytes_in)
+        return capture, _current.set(capture)
+
+    def finish(self, capture, token) -> None:
+        if capture is None:
+            return
+        _current.reset(token)
+        if not capture.discarded:
+            self.write(capture.record())
+
+    @contextmanager
+    def capture(self, endpoint: str, method: str, bytes_in: int = None):
+        capture, token = self.start(endpoint, method, bytes_in)
+        try:
+            yield capture
+        finally:
+            self.finish(capture, token)
+
+    def handler(self, endpoint: str):
+        """Decorator for a CapturedHandler do_* method: capture its requests."""
+        def decorate(method):
+            @functools.wraps(method)
+            def wrapper(handler):
+                with capture_request(self, handler, endpoint):
+                    return method(handler)
+            return wrapper
+        return decorate
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, separators=(",", ":"))
+        try:
+            if self.target == "stdout":
+                print(LOG_PREFIX + line, flush=True)
+            else:
+                with self._lock, open(self.target, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            self._stats["write_errors"] += 1
+            print(f"Workload capture write failed: {e}")
+            return
+        self._stats["recorded"] += 1
+
+    def stats(self) -> dict:
+        return {**self._stats, "enabled": self.enabled, "sample": self.sample}
+
+
+class CapturedHandler:
+    """
+    Mixin for BaseHTTPRequestHandler handlers: while a request is captured
+    (see WorkloadRecorder.handler), its status and response size are recorded.
+    """
+
+    _capture = None
+
+    def send_response(self, code, message=None):
+        if self._capture is not None:
+            self._capture.fields["status"] = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if self._capture is not None and keyword.lower() == "content-length":
+            self._capture.fields["bytes_out"] = int(value)
+        super().send_header(keyword, value)
+
+
+@contextmanager
+def capture_request(recorder: WorkloadRecorder, handler, endpoint: str):
+    """Capture one request served by a CapturedHandler."""
+    length = handler.headers.get("Content-Length")
+    bytes_in = int(length) if length and length.isdigit() else None
+    with recorder.capture(endpoint, handler.command, bytes_in) as capture:
+        handler._capture = capture
+        try:
+            yield capture
+        finally:
+            handler._capture = None
@@ -8,75 +8,359 @@ SECURITY ARCHITECTURE:
 - User IDs are derived client-side from the passphrase
 - Even developers cannot decrypt user data
 
-Storage Options (in order of preference):
-1. Redis Cloud - if STORAGE_KV_REDIS_URL is set
-2. In-memory (for development only)
+Storage Options (CLOUD_STORAGE, see _lib/storage.py):
+1. redis - Redis Cloud; the default if REDIS_HOST and REDIS_PASSWORD are set
+2. sqlite - a local SQLite file (self-hosting)
+3. applog - a local append-only log file read through mmap (self-hosting)
+4. memory - in-memory (for development only, and as a degraded-mode
+   fallback while the Redis circuit breaker is open)
 """
 
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from http.server import BaseHTTPRequestHandler
+import hashlib
 import json
 import os
+import sys
+import threading
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 
-# In-memory storage for development (NOT for production)
-# In production, use Redis Cloud
-_memory_store = {}
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib import coldstart, workload
+from _lib.circuit import CircuitBreaker
+from _lib.body import BodyError, read_json_body
+from _lib.idempotency import REPLAYED_HEADER, IdempotencyCache, IdempotencyError, SharedResults
+from _lib.serialization import dumps, loads, send_json_response as _send_json
+from _lib.storage import (
+    ANY_REVISION, AppendLogStorage, MemoryStorage, RevisionConflict, SQLiteStorage, StorageBackend,
+    StorageUnavailable, UserRecord, send_user_record, split_record,
+)
+from _lib.workload import CapturedHandler, WorkloadRecorder
+
+MAX_BODY_BYTES = 10 * 1024 * 1024  # 10MB limit
+
+# Redis connection details - read once per cold start
+REDIS_HOST = os.getenv('REDIS_HOST')
+REDIS_PORT = int(os.getenv('REDIS_PORT') or 6379)
+REDIS_USERNAME = os.getenv('REDIS_USERNAME', 'default')
+REDIS_PASSWORD = os.getenv('REDIS_PASSWORD')
+REDIS_CONFIGURED = bool(REDIS_HOST and REDIS_PASSWORD)
+
+# Short timeouts: a serverless invocation should fail over in ~1-2 s, not 10 s
+REDIS_POOL_SIZE = int(os.getenv('REDIS_POOL_SIZE') or 10)
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT') or 2)
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT') or 1)
+REDIS_POOL_WAIT_TIMEOUT = float(os.getenv('REDIS_POOL_WAIT_TIMEOUT') or 1)
+
+# Each user is stored as two keys, written and read together in one round trip:
+#   sayitbetter:<userId>:meta  - small JSON (version, checksum, counts, timestamps)
+#   sayitbetter:<userId>:blob  - the encryptedData JSON
+#   sayitbetter:<userId>:rev   - the revision counter used by If-Match uploads
+# The legacy single key sayitbetter:<userId> is still read and cleaned up on write.
+REDIS_TTL_SECONDS = 90 * 24 * 60 * 60  # 90 days, for every backend
 
-# Redis client singleton
+CLOUD_STORAGE = (os.getenv('CLOUD_STORAGE') or ('redis' if REDIS_CONFIGURED else 'memory')).lower()
+CLOUD_STORAGE_PATH = os.getenv('CLOUD_STORAGE_PATH')
+CLOUD_APPLOG_FSYNC = (os.getenv('CLOUD_APPLOG_FSYNC') or '1') != '0'
+
+# In-memory storage for development (NOT for production) and the fallback
+# while Redis is unavailable. Capped so a burst of 10MB uploads cannot
+# exhaust the function's memory; least recently used users are evicted.
+_memory_store = MemoryStorage(
+    max_bytes=int(os.getenv('CLOUD_MEMORY_STORE_MAX_BYTES') or 64 * 1024 * 1024),
+    ttl=REDIS_TTL_SECONDS,
+)
+
+# Opt-in shape-only capture (WORKLOAD_CAPTURE, see _lib/workload.py)
+_workload = WorkloadRecorder()
+
+# Redis client singleton, backed by a bounded shared connection pool
 _redis_client = None
+_redis_lock = threading.Lock()
+_redis_breaker = CircuitBreaker(
+    'redis',
+    failure_threshold=int(os.getenv('REDIS_BREAKER_THRESHOLD') or 3),
+    reset_timeout=float(os.getenv('REDIS_BREAKER_RESET_SECONDS') or 30),
+)
+
+def _redis_keys(user_id):
+    base = f"sayitbetter:{user_id}"
+    return f"{base}:meta", f"{base}:blob", base, f"{base}:rev"
+
+# Compare-and-swap save: bumps the revision and writes both keys only if
+# the stored revision matches ARGV[1] ('' = unconditional, '*' = any
+# existing record). Runs atomically on the server, so concurrent uploads
+# cannot interleave between the check and the write.
+# KEYS: meta, blob, legacy, rev   ARGV: expected, ttl, meta, blob
+_SAVE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[4]) or '0')
+if ARGV[1] == '*' then
+    if redis.call('EXISTS', KEYS[1], KEYS[3]) == 0 then
+        return {0, current, ''}
+    end
+elseif ARGV[1] ~= '' and tonumber(ARGV[1]) ~= current then
+    return {0, current, redis.call('GET', KEYS[1]) or ''}
+end
+local revision = current + 1
+redis.call('SETEX', KEYS[2], ARGV[2], ARGV[4])
+redis.call('SETEX', KEYS[1], ARGV[2], ARGV[3])
+redis.call('SETEX', KEYS[4], ARGV[2], revision)
+redis.call('DEL', KEYS[3])
+return {1, revision}
+"""
+_save_script = None
+
+def _warm_redis_connection(client):
+    """Open the first pooled connection off the request path."""
+    try:
+        conn = client.connection_pool.get_connection('PING')
+        client.connection_pool.release(conn)
+        _redis_breaker.record_success()
+        print("Redis connection successful!")
+    except Exception as e:
+        _redis_breaker.record_failure(e)
+        print(f"Redis connection failed: {e}")
 
 def get_redis_client():
-    """Get or create Redis client connection"""
+    """
+    Get or create the Redis client.
+
+    The client is created lazily without a blocking ping; the TCP/TLS
+    handshake runs on a background thread so it overlaps with request
+    parsing. Returns None when Redis is not configured, or while the
+    circuit breaker is open so callers fail fast to the memory store.
+    """
     global _redis_client
     
-    # Get Redis connection details from environment variables
-    redis_host = os.getenv('REDIS_HOST')
-    redis_port = os.getenv('REDIS_PORT')
-    redis_password = os.getenv('REDIS_PASSWORD')
-    
-    if not redis_host or not redis_password:
+    if not REDIS_CONFIGURED:
         print("Redis credentials not configured in environment variables")
         return None
     
     if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                try:
+                    import redis  # deferred: keeps the cold import path light
+                    pool = redis.BlockingConnectionPool(
+                        host=REDIS_HOST,
+                        port=REDIS_PORT,
+                        decode_responses=True,
+                        username=REDIS_USERNAME,
+                        password=REDIS_PASSWORD,
+                        socket_timeout=REDIS_SOCKET_TIMEOUT,
+                        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                        max_connections=REDIS_POOL_SIZE,
+                        timeout=REDIS_POOL_WAIT_TIMEOUT,
+                    )
+                    _redis_client = redis.Redis(connection_pool=pool)
+                except Exception as e:
+                    print(f"Redis client creation failed: {e}")
+                    return None
+                threading.Thread(
+                    target=_warm_redis_connection, args=(_redis_client,), daemon=True
+                ).start()
+    
+    if not _redis_breaker.allow_request():
+        return None
+    return _redis_client
+
+class RedisIdempotencyResults(SharedResults):
+    """Idempotency claims and results in Redis, so retries reach any instance."""
+
+    def _client(self):
+        redis_client = get_redis_client()
+        if not redis_client:
+            raise RuntimeError('Redis unavailable')
+        return redis_client
+
+    def _call(self, method, key, *args, **kwargs):
+        redis_client = self._client()
         try:
-            import redis
-            # Connect to Redis Cloud using environment variables
-            _redis_client = redis.Redis(
-                host=redis_host,
-                port=int(redis_port or 6379),
-                decode_responses=True,
-                username=os.getenv('REDIS_USERNAME', 'default'),
-                password=redis_password,
-                socket_timeout=10,
-                socket_connect_timeout=10,
-            )
-            # Test connection
-            _redis_client.ping()
-            print("Redis connection successful!")
+            result = getattr(redis_client, method)(f"sayitbetter:idempotency:{key}", *args, **kwargs)
+        except Exception as e:
+            _redis_breaker.record_failure(e)
+            raise
+        _redis_breaker.record_success()
+        return result
+
+    def get(self, key):
+        value = self._call('get', key)
+        return loads(value) if value else None
+
+    def add(self, key, value, ttl):
+        return bool(self._call('set', key, dumps(value), nx=True, ex=max(1, int(ttl))))
+
+    def set(self, key, value, ttl):
+        self._call('set', key, dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self._call('delete', key)
+
+
+# Responses to uploads that carried an Idempotency-Key, replayed to retries;
+# kept in Redis when it is configured (per instance while it is down)
+_idempotency = IdempotencyCache('cloud', shared=RedisIdempotencyResults() if REDIS_CONFIGURED else None)
+
+CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, Authorization, If-Match, Idempotency-Key'),
+    ('Access-Control-Expose-Headers', f'ETag, Retry-After, {REPLAYED_HEADER}'),
+    ('Access-Control-Max-Age', '86400'),
+)
+
+def send_json_response(handler, status_code, data, headers=()):
+    _send_json(handler, status_code, data, CORS_HEADERS + tuple(headers))
+
+def etag_header(revision):
+    return (('ETag', f'"{revision}"'),)
+
+def parse_if_match(value):
+    """
+    The revision named by an If-Match header: n, "n" or W/"n", or
+    ANY_REVISION for *. Returns None when the header is absent; raises
+    ValueError when it is not a revision.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value == '*':
+        return ANY_REVISION
+    if value.startswith('W/'):
+        value = value[2:]
+    revision = int(value.strip('"'))
+    if revision < 0:
+        raise ValueError(value)
+    return revision
+
+
+class RedisStorage(StorageBackend):
+    """Redis Cloud, falling back to the in-memory store while it is unavailable."""
+
+    name = 'redis'
+    durable = True
+
+    def get(self, user_id):
+        redis_client = get_redis_client()
+        if not redis_client:
+            return _memory_store.get(user_id)
+        try:
+            # One round trip for metadata, blob, the legacy key and revision
+            meta, blob, legacy, revision = redis_client.mget(_redis_keys(user_id))
+            _redis_breaker.record_success()
         except Exception as e:
-            print(f"Redis connection failed: {e}")
-            _redis_client = None
+            _redis_breaker.record_failure(e)
+            print(f"Redis GET error: {e}")
+            # Fall back to memory
+            return _memory_store.get(user_id)
+        
+        try:
+            if meta and blob:
+                # The blob was serialized by save(); it is sent back verbatim
+                # rather than parsed and re-encoded
+                if blob[:1] == '{':
+                    blob = blob.encode('utf-8')
+                    meta = loads(meta)
+                    meta['revision'] = int(revision or 0)
+                    return UserRecord(meta, len(blob), (blob,))
+            elif legacy:
+                parsed_data = loads(legacy)
+                if isinstance(parsed_data.get('encryptedData'), dict):
+                    meta, blob = split_record(parsed_data)
+                    meta = loads(meta)
+                    meta['revision'] = int(revision or 0)
+                    return UserRecord(meta, len(blob), (blob,))
+            else:
+                return None
+        except json.JSONDecodeError as e:
+            print(f"Redis JSON decode error: {e}")
             return None
-    
-    return _redis_client
+        
+        print(f"Warning: Invalid encryptedData structure for user {user_id}")
+        return None
+
+    def save(self, user_id, data, expected_revision=None):
+        global _save_script
+        redis_client = get_redis_client()
+        if not redis_client:
+            return self._save_degraded(user_id, data, expected_revision)
+        try:
+            meta, blob = split_record(data)
+            if _save_script is None:
+                _save_script = redis_client.register_script(_SAVE_SCRIPT)
+            
+            # Check the revision and write both keys atomically in one round trip
+            result = _save_script(
+                keys=_redis_keys(user_id),
+                args=['' if expected_revision is None else expected_revision,
+                      REDIS_TTL_SECONDS, meta, blob],
+                client=redis_client,
+            )
+            _redis_breaker.record_success()
+        except Exception as e:
+            _redis_breaker.record_failure(e)
+            print(f"Redis SET error: {e}")
+            return self._save_degraded(user_id, data, expected_revision)
+        
+        if not result[0]:
+            current = None
+            if result[2]:
+                current = loads(result[2])
+                current['revision'] = int(result[1])
+            raise RevisionConflict(current)
+        print(f"Successfully stored data for user {user_id}")
+        return int(result[1])
+
+    def _save_degraded(self, user_id, data, expected_revision):
+        """
+        Fall back to memory while Redis is unavailable. The memory store keeps
+        its own revision counter, so an If-Match precondition (a Redis
+        revision) cannot be checked there: conditional writes are refused.
+        """
+        if expected_revision is not None:
+            raise StorageUnavailable(max(1, int(_redis_breaker.reset_timeout)))
+        return _memory_store.save(user_id, data)
+
+    def delete(self, user_id):
+        redis_client = get_redis_client()
+        if redis_client:
+            try:
+                redis_client.delete(*_redis_keys(user_id))
+                _redis_breaker.record_success()
+            except Exception as e:
+                _redis_breaker.record_failure(e)
+                print(f"Redis DELETE error: {e}")
+        
+        # Also clear any copy written while Redis was unavailable
+        _memory_store.delete(user_id)
 
-def get_cors_headers():
-    return {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-        'Access-Control-Max-Age': '86400',
-    }
-
-def send_json_response(handler, status_code, data):
-    handler.send_response(status_code)
-    handler.send_header('Content-Type', 'application/json')
-    for key, value in get_cors_headers().items():
-        handler.send_header(key, value)
-    handler.end_headers()
-    handler.wfile.write(json.dumps(data).encode())
+    def stats(self):
+        return {'backend': self.name, 'breaker': _redis_breaker.snapshot()}
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Open the configured CLOUD_STORAGE backend on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if CLOUD_STORAGE == 'sqlite':
+                    _storage = SQLiteStorage(CLOUD_STORAGE_PATH or 'sayitbetter-cloud.db', REDIS_TTL_SECONDS)
+                elif CLOUD_STORAGE == 'applog':
+                    _storage = AppendLogStorage(CLOUD_STORAGE_PATH or 'sayitbetter-cloud.log',
+                                                REDIS_TTL_SECONDS, fsync=CLOUD_APPLOG_FSYNC)
+                elif CLOUD_STORAGE == 'redis':
+                    _storage = RedisStorage()
+                else:
+                    _storage = _memory_store
+    return _storage
 
 def validate_encrypted_payload(data):
     """
@@ -103,32 +387,57 @@ def validate_encrypted_payload(data):
     return True, None
 
 
-class handler(BaseHTTPRequestHandler):
+class handler(CapturedHandler, BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(204)
-        for key, value in get_cors_headers().items():
+        for key, value in CORS_HEADERS:
             self.send_header(key, value)
         self.end_headers()
     
+    @_workload.handler("cloud")
     def do_GET(self):
         """
         GET /api/cloud?userId=xxx - Download encrypted data for a user
         GET /api/cloud/health - Health check
         """
+        coldstart.report_first_request()
         parsed = urlparse(self.path)
         path = parsed.path
         params = parse_qs(parsed.query)
         
         # Health check
         if 'health' in path:
-            redis_client = get_redis_client()
-            storage_type = 'redis' if redis_client else 'memory'
-            send_json_response(self, 200, {
-                'status': 'healthy',
+            workload.discard()
+            storage = get_storage()
+            storage_type = storage.name
+            degraded = False
+            if storage_type == 'redis':
+                redis_client = get_redis_client()
+                if redis_client:
+                    try:
+                        redis_client.ping()
+                        _redis_breaker.record_success()
+                    except Exception as e:
+                        _redis_breaker.record_failure(e)
+                        redis_client = None
+                if not redis_client:
+                    storage_type = 'memory'
+                    # Redis configured but unavailable: serving from the memory fallback
+                    degraded = REDIS_CONFIGURED
+            health = {
+                'status': 'degraded' if degraded else 'healthy',
                 'storage': storage_type,
-                'message': 'E2E Encrypted Cloud Storage is running'
-            })
+                'message': 'E2E Encrypted Cloud Storage is running',
+                'startup': coldstart.startup_report(),
+                'memory_store': _memory_store.stats(),
+                'idempotency': _idempotency.stats()
+            }
+            if storage.name != 'memory':
+                health['storage_backend'] = storage.stats()
+            if REDIS_CONFIGURED:
+                health['redis'] = _redis_breaker.snapshot()
+            send_json_response(self, 200, health)
             return
         
         # Get user data
@@ -144,19 +453,30 @@ class handler(BaseHTTPRequestHandler):
         
         # Retrieve encrypted data
         try:
-            data = self._get_user_data(user_id)
-            if data is None:
+            record = self._get_user_data(user_id)
+            if record is not None:
+                workload.note(payload_bytes=record.size, entries=record.meta.get('entryCount'))
+            if record is None:
                 send_json_response(self, 404, {'error': 'No data found for this user'})
                 return
-            
-            send_json_response(self, 200, data)
         except Exception as e:
             send_json_response(self, 500, {'error': f'Failed to retrieve data: {str(e)}'})
+            return
+        
+        # The blob is streamed from storage into the response
+        send_user_record(self, record, CORS_HEADERS + etag_header(record.meta.get('revision', 0)))
     
+    @_workload.handler("cloud")
     def do_POST(self):
         """
         POST /api/cloud - Upload encrypted data
         
+        With If-Match: <revision> the upload only replaces the stored record
+        if it is still at that revision (0 = no record yet). Otherwise it is
+        rejected with 409 and the current metadata, without the blob, so the
+        client only downloads when there really is a conflict. If-Match: *
+        replaces whatever is stored, and fails with 412 when nothing is.
+        
         Body: {
             userId: string,
             encryptedData: { encrypted, salt, iv, algorithm, ... },
@@ -166,66 +486,126 @@ class handler(BaseHTTPRequestHandler):
             version: number
         }
         """
+        coldstart.report_first_request()
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            if content_length == 0:
-                send_json_response(self, 400, {'error': 'Empty request body'})
-                return
-            
-            if content_length > 10 * 1024 * 1024:  # 10MB limit
-                send_json_response(self, 413, {'error': 'Payload too large (max 10MB)'})
-                return
-            
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode('utf-8'))
-            
-            # Validate the encrypted payload structure
-            is_valid, error_msg = validate_encrypted_payload(data)
-            if not is_valid:
-                send_json_response(self, 400, {'error': error_msg})
+            expected_revision = parse_if_match(self.headers.get('If-Match'))
+        except ValueError:
+            send_json_response(self, 400, {'error': 'If-Match must be a revision number'})
+            return
+        workload.note(conditional=expected_revision is not None)
+        
+        key = self.headers.get('Idempotency-Key')
+        digest = hashlib.sha256() if key is not None else None
+        try:
+            user_id, stored_data = self._read_upload(digest)
+        except BodyError as e:
+            send_json_response(self, e.status, {'error': e.message})
+            return
+        except Exception as e:
+            send_json_response(self, 500, {'error': f'Failed to store data: {str(e)}'})
+            return
+        
+        # A retried upload with a known Idempotency-Key gets the original
+        # response and nothing is stored again. The key is scoped to the user
+        # and bound to a hash of the exact body, so it never replays another
+        # user's or another upload's response.
+        if key is not None:
+            key = f"{user_id}:{key}"
+            try:
+                replay = _idempotency.begin(key, digest.hexdigest())
+            except IdempotencyError as e:
+                send_json_response(self, e.status, {'error': e.message}, e.headers)
                 return
-            
-            user_id = data['userId']
-            
-            # Validate encryptedData structure before storing
-            encrypted_data = data['encryptedData']
-            if not isinstance(encrypted_data, dict):
-                send_json_response(self, 400, {'error': 'encryptedData must be an object'})
+            if replay is not None:
+                status, data, headers = replay
+                workload.note(replayed=True)
+                # Replays from Redis come back from JSON, with lists for tuples
+                headers = tuple(tuple(header) for header in headers)
+                send_json_response(self, status, data, headers + ((REPLAYED_HEADER, 'true'),))
                 return
+        
+        try:
+            status, data, headers = self._store_upload(user_id, stored_data, expected_revision)
+        except BaseException:
+            if key is not None:
+                _idempotency.abandon(key)
+            raise
+        if key is not None:
+            _idempotency.finish(key, status, (status, data, headers))
+        send_json_response(self, status, data, headers)
+    
+    def _read_upload(self, digest=None):
+        """
+        Read and validate an upload body; returns (user_id, stored_data).
+        Problems with the body are raised as BodyError.
+        """
+        try:
+            # Streams the body, rejecting it as soon as it crosses the limit
+            data = read_json_body(self, MAX_BODY_BYTES, digest)
+        except json.JSONDecodeError:
+            raise BodyError(400, 'Invalid JSON in request body')
+        if not isinstance(data, dict):
+            raise BodyError(400, 'Request body must be a JSON object')
+        
+        # Validate the encrypted payload structure
+        is_valid, error_msg = validate_encrypted_payload(data)
+        if not is_valid:
+            raise BodyError(400, error_msg)
+        
+        # Validate encryptedData structure before storing
+        encrypted_data = data['encryptedData']
+        if not isinstance(encrypted_data, dict):
+            raise BodyError(400, 'encryptedData must be an object')
+        workload.note(entries=data.get('entryCount'),
+                      payload_bytes=len(encrypted_data.get('encrypted') or ''))
+        
+        required_encrypted_fields = ['encrypted', 'salt', 'iv', 'algorithm']
+        for field in required_encrypted_fields:
+            if field not in encrypted_data:
+                raise BodyError(400, f'Missing required encryption field: {field}')
+        
+        return data['userId'], {
+            'encryptedData': encrypted_data,
+            'entryCount': data.get('entryCount', 0),
+            'checksum': data['checksum'],
+            'version': data.get('version', 1),
+            'lastModified': data.get('lastModified', datetime.utcnow().isoformat()),
+            'updatedAt': datetime.utcnow().isoformat()
+        }
+    
+    def _store_upload(self, user_id, stored_data, expected_revision):
+        """Store a validated upload; returns (status, response data, extra headers)."""
+        try:
+            revision = self._save_user_data(user_id, stored_data, expected_revision)
             
-            required_encrypted_fields = ['encrypted', 'salt', 'iv', 'algorithm']
-            for field in required_encrypted_fields:
-                if field not in encrypted_data:
-                    send_json_response(self, 400, {'error': f'Missing required encryption field: {field}'})
-                    return
-            
-            # Store the encrypted data
-            stored_data = {
-                'encryptedData': encrypted_data,
-                'entryCount': data.get('entryCount', 0),
-                'checksum': data['checksum'],
-                'version': data.get('version', 1),
-                'lastModified': data.get('lastModified', datetime.utcnow().isoformat()),
-                'updatedAt': datetime.utcnow().isoformat()
-            }
-            
-            self._save_user_data(user_id, stored_data)
-            
-            send_json_response(self, 200, {
+            return 200, {
                 'success': True,
                 'timestamp': stored_data['updatedAt'],
+                'revision': revision,
                 'message': 'Encrypted data stored successfully'
-            })
+            }, etag_header(revision)
             
-        except json.JSONDecodeError:
-            send_json_response(self, 400, {'error': 'Invalid JSON in request body'})
+        except StorageUnavailable as e:
+            return 503, {
+                'error': 'Cloud storage is temporarily unavailable; retry the upload later'
+            }, (('Retry-After', str(e.retry_after)),)
+        except RevisionConflict as e:
+            if expected_revision == ANY_REVISION:
+                # If-Match: * and there is no record to match
+                return 412, {'error': 'No stored data matches If-Match: *'}, ()
+            return 409, {
+                'error': 'Version conflict',
+                'current': e.current
+            }, etag_header(e.current_revision)
         except Exception as e:
-            send_json_response(self, 500, {'error': f'Failed to store data: {str(e)}'})
+            return 500, {'error': f'Failed to store data: {str(e)}'}, ()
     
+    @_workload.handler("cloud")
     def do_DELETE(self):
         """
         DELETE /api/cloud?userId=xxx - Delete all encrypted data for a user
         """
+        coldstart.report_first_request()
         parsed = urlparse(self.path)
         params = parse_qs(parsed.query)
         
@@ -248,87 +628,27 @@ class handler(BaseHTTPRequestHandler):
         except Exception as e:
             send_json_response(self, 500, {'error': f'Failed to delete data: {str(e)}'})
     
-    # Storage methods - using Redis Cloud
+    # Storage methods - delegate to the configured backend
     
     def _get_user_data(self, user_id):
-        """Retrieve encrypted data for a user"""
-        redis_client = get_redis_client()
-        if redis_client:
-            try:
-                data = redis_client.get(f"sayitbetter:{user_id}")
-                if data:
-                    # If decode_responses=True, data is already a string, parse it
-                    # If decode_responses=False, data is bytes, decode then parse
-                    if isinstance(data, bytes):
-                        data = data.decode('utf-8')
-                    parsed_data = json.loads(data)
-                    # Ensure encryptedData structure is preserved
-                    if 'encryptedData' in parsed_data and isinstance(parsed_data['encryptedData'], dict):
-                        return parsed_data
-                    else:
-                        print(f"Warning: Invalid encryptedData structure for user {user_id}")
-                        return None
-                return None
-            except json.JSONDecodeError as e:
-                print(f"Redis JSON decode error: {e}")
-                print(f"Raw data: {data[:200] if data else 'None'}")
-                return None
-            except Exception as e:
-                print(f"Redis GET error: {e}")
-                # Fall back to memory
-                return _memory_store.get(user_id)
-        
-        # Fall back to in-memory storage
-        return _memory_store.get(user_id)
+        """Retrieve encrypted data for a user as a UserRecord"""
+        with workload.upstream():
+            return get_storage().get(user_id)
     
-    def _save_user_data(self, user_id, data):
-        """Store encrypted data for a user"""
-        redis_client = get_redis_client()
-        if redis_client:
-            try:
-                # Ensure encryptedData structure is valid
-                if 'encryptedData' not in data or not isinstance(data['encryptedData'], dict):
-                    print(f"Error: Invalid encryptedData structure for user {user_id}")
-                    raise ValueError("Invalid encryptedData structure")
-                
-                # Serialize to JSON string
-                json_str = json.dumps(data, ensure_ascii=False)
-                
-                # Store with 90 day expiry (optional - remove if you want permanent storage)
-                redis_client.setex(
-                    f"sayitbetter:{user_id}",
-                    90 * 24 * 60 * 60,  # 90 days in seconds
-                    json_str
-                )
-                print(f"Successfully stored data for user {user_id}")
-                return True
-            except Exception as e:
-                print(f"Redis SET error: {e}")
-                import traceback
-                traceback.print_exc()
-                # Fall back to memory
-                _memory_store[user_id] = data
-                return True
+    def _save_user_data(self, user_id, data, expected_revision=None):
+        """Store encrypted data for a user and return its new revision"""
+        # Ensure encryptedData structure is valid
+        if 'encryptedData' not in data or not isinstance(data['encryptedData'], dict):
+            print(f"Error: Invalid encryptedData structure for user {user_id}")
+            raise ValueError("Invalid encryptedData structure")
         
-        # Fall back to in-memory storage
-        _memory_store[user_id] = data
-        return True
+        with workload.upstream():
+            return get_storage().save(user_id, data, expected_revision)
     
     def _delete_user_data(self, user_id):
         """Delete encrypted data for a user"""
-        redis_client = get_redis_client()
-        if redis_client:
-            try:
-                redis_client.delete(f"sayitbetter:{user_id}")
-                return True
-            except Exception as e:
-                print(f"Redis DELETE error: {e}")
-                # Fall back to memory
-                if user_id in _memory_store:
-                    del _memory_store[user_id]
-                return True
-        
-        # Fall back to in-memory storage
-        if user_id in _memory_store:
-            del _memory_store[user_id]
+        with workload.upstream():
+            get_storage().delete(user_id)
         return True
+
+coldstart.record_import(__name__, _IMPORT_STARTED)
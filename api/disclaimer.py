@@ -2,17 +2,21 @@
 Say It Better - Disclaimer Endpoint
 """
 
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from http.server import BaseHTTPRequestHandler
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib import coldstart
+from _lib.serialization import send_json_response
 
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
+        coldstart.report_first_request()
         response = {
             "title": "Important Notice",
             "content": """Say It Better is a communication aid designed to help you express your thoughts more clearly.
@@ -33,4 +37,7 @@ Your text is processed only for the current request and is not stored or used fo
             "acknowledgment_required": True
         }
         
-        self.wfile.write(json.dumps(response).encode())
+        send_json_response(self, 200, response)
+
+
+coldstart.record_import(__name__, _IMPORT_STARTED)
@@ -2,59 +2,109 @@
 Say It Better - Embeddings API using Hugging Face Inference API (free)
 """
 
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from http.server import BaseHTTPRequestHandler
-import json
 import os
+import sys
 import urllib.request
 import urllib.error
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib import coldstart, warmup
+from _lib.body import BodyError, read_json_body
+from _lib.config import ALLOW_HEADERS
+from _lib.deadline import ClientDisconnected, DeadlineExceeded, fetch_upstream, request_deadline
+from _lib import embedding_formats
+from _lib.serialization import ANY_ORIGIN, dumps, loads, send_json_response
+
+MAX_BODY_BYTES = 1024 * 1024
+
 # Hugging Face Inference API endpoint
 # Using BAAI/bge-small-en-v1.5 - fast and good quality
 HF_MODEL = "BAAI/bge-small-en-v1.5"
 HF_ENDPOINT = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
 
+# Hugging Face token (optional but recommended) - read once per cold start
+HF_TOKEN = os.environ.get('HF_TOKEN')
+HF_HEADERS = {"Content-Type": "application/json"}
+if HF_TOKEN:
+    HF_HEADERS["Authorization"] = f"Bearer {HF_TOKEN}"
+
+# Cold loads of the model are waited out (bounded) instead of failing
+HF_WARMTH = warmup.ModelWarmth(HF_MODEL)
+
+
+def fetch_embeddings(payload: bytes, deadline: float, handler) -> bytes:
+    """
+    POST to Hugging Face, holding the request through a cold model load
+    for at most COLD_START_MAX_WAIT_SECONDS (and never past the deadline).
+    """
+    HF_WARMTH.record_use()
+    started = time.monotonic()
+    pause = min(HF_WARMTH.queue_delay(), max(0.0, deadline - time.time()))
+    held = pause > 0
+    if held:
+        time.sleep(pause)
+    while True:
+        req = urllib.request.Request(HF_ENDPOINT, data=payload, headers=HF_HEADERS)
+        try:
+            body = fetch_upstream(req, deadline, handler, 30)
+        except urllib.error.HTTPError as e:
+            estimate = warmup.loading_estimate(e.code, e.read())
+            if estimate is None:
+                raise
+            HF_WARMTH.record_loading(estimate)
+            waited = time.monotonic() - started
+            delay = HF_WARMTH.retry_delay(estimate, waited, deadline - time.time())
+            if delay is None:
+                HF_WARMTH.record_held(waited, served=False)
+                raise
+            held = True
+            time.sleep(delay)
+            continue
+        HF_WARMTH.record_ready()
+        if held:
+            HF_WARMTH.record_held(time.monotonic() - started, served=True)
+        return body
+
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', ALLOW_HEADERS)
         self.end_headers()
     
+    def do_GET(self):
+        """Health check with cold-start counters for the embedding model."""
+        send_json_response(self, 200, {"status": "ok", "model": HF_MODEL, "warmth": HF_WARMTH.stats()})
+    
     def do_POST(self):
+        coldstart.report_first_request()
         try:
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body)
+            data = read_json_body(self, MAX_BODY_BYTES)
+            if not isinstance(data, dict):
+                raise BodyError(400, "Request body must be a JSON object")
             
             # Support both 'input' (old format) and 'texts' (new format)
             input_text = data.get('input') or data.get('texts', '')
             
+            try:
+                fmt, dtype = embedding_formats.negotiate(
+                    self.headers.get('Accept'), data.get('encoding_format'), data.get('dtype'))
+            except embedding_formats.FormatError as e:
+                raise BodyError(400, str(e))
+            
             if not input_text:
-                self.send_response(400)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": "Input text is required"}).encode())
+                send_json_response(self, 400, {"error": "Input text is required"})
                 return
             
-            # Get Hugging Face token from environment (optional but recommended)
-            hf_token = os.environ.get('HF_TOKEN')
-            
             # Prepare request - HF expects {"inputs": "text"} or {"inputs": ["text1", "text2"]}
-            if isinstance(input_text, list):
-                payload = json.dumps({"inputs": input_text}).encode('utf-8')
-            else:
-                payload = json.dumps({"inputs": input_text}).encode('utf-8')
-            
-            headers = {"Content-Type": "application/json"}
-            if hf_token:
-                headers["Authorization"] = f"Bearer {hf_token}"
+            payload = dumps({"inputs": input_text})
             
-            req = urllib.request.Request(HF_ENDPOINT, data=payload, headers=headers)
-            
-            with urllib.request.urlopen(req, timeout=30) as response:
-                result = json.loads(response.read().decode('utf-8'))
+            result = loads(fetch_embeddings(payload, request_deadline(self), self))
             
             # Format response to match expected structure
             # HF returns embeddings directly as array or array of arrays
@@ -68,24 +118,53 @@ class handler(BaseHTTPRequestHandler):
             else:
                 formatted_result = {"embeddings": result}
             
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(formatted_result).encode())
+            embeddings = formatted_result["embeddings"]
+            if fmt != embedding_formats.JSON and isinstance(embeddings, list):
+                self._send_compact(fmt, dtype, embeddings)
+                return
             
+            send_json_response(self, 200, formatted_result, ANY_ORIGIN + (('Vary', 'Accept'),))
+            
+        except ClientDisconnected:
+            self.close_connection = True
+        except DeadlineExceeded:
+            send_json_response(self, 504, {"error": "Request deadline exceeded"})
+        except BodyError as e:
+            send_json_response(self, e.status, {"error": e.message})
         except urllib.error.HTTPError as e:
             error_msg = f"Hugging Face API error: {e.code}"
             if e.code == 503:
+                # Still loading after the bounded wait in fetch_embeddings
                 error_msg = "Model is loading, please try again in a few seconds"
-            self.send_response(e.code)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": error_msg}).encode())
+            send_json_response(self, e.code, {"error": error_msg})
         except Exception as e:
-            self.send_response(500)
+            send_json_response(self, 500, {"error": str(e)})
+
+    def _send_compact(self, fmt, dtype, embeddings):
+        """Write a base64, raw binary or NDJSON response (see embedding_formats)."""
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', ', '.join(embedding_formats.EXPOSED_HEADERS))
+        self.send_header('Vary', 'Accept')
+        if fmt == embedding_formats.BASE64:
+            body = dumps(embedding_formats.base64_payload(embeddings, dtype))
             self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
+        elif fmt == embedding_formats.BINARY:
+            body = embedding_formats.pack_matrix(embeddings, dtype)
+            self.send_header('Content-Type', embedding_formats.OCTET_STREAM)
+            for name, value in embedding_formats.shape_headers(embeddings, dtype).items():
+                self.send_header(name, value)
+        else:
+            # NDJSON lines are written as they are encoded
+            self.send_header('Content-Type', embedding_formats.NDJSON_MEDIA_TYPE)
+            self.close_connection = True
             self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode())
+            for line in embedding_formats.iter_ndjson(embeddings):
+                self.wfile.write(line)
+            return
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+coldstart.record_import(__name__, _IMPORT_STARTED)
@@ -2,20 +2,30 @@
 Say It Better - Health Check Endpoint
 """
 
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from http.server import BaseHTTPRequestHandler
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib import coldstart
+from _lib.serialization import send_json_response
+from _lib.deadline import deadline_stats
 
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
+        coldstart.report_first_request()
         response = {
             "status": "healthy",
-            "message": "Say It Better API is running. This tool helps translate emotional language - it does not provide therapy or medical advice."
+            "message": "Say It Better API is running. This tool helps translate emotional language - it does not provide therapy or medical advice.",
+            "startup": coldstart.startup_report(),
+            "deadlines": deadline_stats()
         }
         
-        self.wfile.write(json.dumps(response).encode())
+        send_json_response(self, 200, response)
+
+
+coldstart.record_import(__name__, _IMPORT_STARTED)
@@ -0,0 +1,129 @@
+"""
+Say It Better - Translation plus theme recurrence in one request
+
+/api/translate and /api/analyze-themes in one round trip. Past themes are
+embedded on a worker thread while Groq is still translating, so once the
+new themes are known only they are left to embed.
+"""
+
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from http.server import BaseHTTPRequestHandler
+import contextvars
+import json
+import os
+import sys
+import threading
+import urllib.error
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _lib import coldstart
+from _lib.config import cors_headers, send_cors_headers
+from _lib.body import BodyError, read_json_body
+from _lib.deadline import ClientDisconnected, DeadlineExceeded, request_deadline
+from _lib.serialization import send_json_response
+from _lib.themes import EMBEDDINGS_CONFIGURED, analyze_themes, get_theme_vectors
+from _lib.translation import GROQ_API_KEY, NOT_CONFIGURED, translate_text, upstream_error
+
+# raw_text plus the user's theme history
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def prefetch_theme_vectors(texts, deadline):
+    """
+    Start embedding texts in the background; returns (worker, outcome),
+    where outcome["fresh"] is filled in on success. Failures are only
+    logged - the analysis fetches whatever is still missing.
+    """
+    outcome = {}
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            outcome["fresh"] = context.run(get_theme_vectors, texts, deadline)[1]
+        except Exception as e:
+            print(f"Theme pre-embedding failed: {e}")
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    return worker, outcome
+
+
+class handler(BaseHTTPRequestHandler):
+    def do_OPTIONS(self):
+        """Handle CORS preflight"""
+        self.send_response(200)
+        send_cors_headers(self)
+        self.end_headers()
+
+    def do_POST(self):
+        coldstart.report_first_request()
+        deadline = request_deadline(self)
+        try:
+            if not GROQ_API_KEY:
+                send_json_response(self, 500, NOT_CONFIGURED, cors_headers(self))
+                return
+
+            body = read_json_body(self, MAX_BODY_BYTES)
+            if not isinstance(body, dict):
+                raise BodyError(400, "Request body must be a JSON object")
+
+            raw_text = body.get('raw_text', '')
+            tone = body.get('tone', 'neutral')
+            past_themes = body.get('past_themes', [])
+            if not isinstance(past_themes, list):
+                raise BodyError(400, "past_themes must be a list")
+            past_themes = list(dict.fromkeys(theme for theme in past_themes if theme))
+
+            if len(raw_text) < 10:
+                send_json_response(self, 400, {
+                    "error": "Please enter at least 10 characters"
+                }, cors_headers(self))
+                return
+
+            prefetch = None
+            if past_themes and EMBEDDINGS_CONFIGURED:
+                prefetch = prefetch_theme_vectors(past_themes, deadline)
+
+            parsed = translate_text(raw_text, tone, deadline, self)
+
+            parsed["recurring_themes"] = []
+            parsed["similarity_scores"] = {}
+            if prefetch:
+                worker, outcome = prefetch
+                worker.join(max(0, deadline - time.time()))
+                # Recurrence is a nice-to-have: an embedding outage must not
+                # cost the user their translation
+                try:
+                    current_themes = [theme["theme"] for theme in parsed.get("themes", [])]
+                    parsed["recurring_themes"], parsed["similarity_scores"] = analyze_themes(
+                        current_themes, past_themes, deadline, self, outcome.get("fresh"))
+                except ClientDisconnected:
+                    raise
+                except Exception as e:
+                    print(f"Theme analysis failed: {e}")
+
+            send_json_response(self, 200, parsed, cors_headers(self))
+
+        except BodyError as e:
+            send_json_response(self, e.status, {"error": e.message}, cors_headers(self))
+        except ClientDisconnected:
+            # Nobody is listening any more; the upstream call was already aborted
+            self.close_connection = True
+        except DeadlineExceeded:
+            send_json_response(self, 504, {"error": "Request deadline exceeded"}, cors_headers(self))
+        except urllib.error.HTTPError as e:
+            send_json_response(self, 502, upstream_error(e), cors_headers(self))
+        except json.JSONDecodeError as je:
+            send_json_response(self, 500, {
+                "error": f"Failed to parse AI response: {str(je)}"
+            }, cors_headers(self))
+        except Exception as e:
+            send_json_response(self, 500, {
+                "error": str(e),
+                "type": type(e).__name__
+            }, cors_headers(self))
+
+
+coldstart.record_import(__name__, _IMPORT_STARTED)
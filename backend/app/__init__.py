@@ -1 +1,8 @@
 # Say It Better - Backend Application
+
+import sys
+from pathlib import Path
+
+# Stdlib-only helpers shared with the Vercel serverless functions (api/_lib),
+# importable from every app module whichever is loaded first
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "api"))
@@ -0,0 +1,294 @@
+"""
+Say It Better - Adaptive admission control and per-client fair queuing
+
+AdmissionControlMiddleware sits in front of the upstream-bound routes
+(/translate and friends). At most `limit` of those requests run at once,
+and at most `max_in_flight_per_client` of them for any one client; the rest
+wait in per-client queues that are served round-robin, so one scripted
+client can no longer take every slot while other users time out.
+
+The limit adapts to observed latency with a gradient rule: while request
+latency stays near its long-run baseline the limit grows, and when latency
+climbs (upstream saturating) or upstream errors come back it shrinks.
+
+Requests that cannot be served in time are rejected early with
+Retry-After, instead of timing out late:
+- 429 when the client already has too many requests queued (a client at
+  its in-flight cap queues even while other slots are free)
+- 503 when the whole queue is full, or a request waited too long for a slot
+
+Clients are keyed by a salted hash of their address, so raw IPs are never
+kept.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict, deque
+
+from .deadlines import current_deadline
+
+# Per-process salt: client keys cannot be reversed into addresses
+_CLIENT_SALT = os.urandom(16)
+
+
+def client_key(scope, trust_forwarded: bool = False) -> str:
+    """Salted hash of the request's client address."""
+    address = ""
+    if trust_forwarded:
+        for name, value in scope.get("headers") or ():
+            if name == b"x-forwarded-for":
+                address = value.decode("latin-1").split(",")[0].strip()
+                break
+    if not address and scope.get("client"):
+        address = scope["client"][0]
+    return hashlib.sha256(_CLIENT_SALT + address.encode("utf-8")).hexdigest()[:16]
+
+
+class GradientLimit:
+    """
+    Concurrency limit driven by the ratio of long-run to recent latency
+    (gradient), with a multiplicative backoff on upstream errors.
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 tolerance: float = 1.5, smoothing: float = 0.2, backoff: float = 0.9):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.short_rtt = 0.0
+        self.long_rtt = 0.0
+
+    def update(self, rtt: float, dropped: bool, in_flight: int) -> None:
+        if dropped:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            return
+        if not self.long_rtt:
+            self.short_rtt = self.long_rtt = rtt
+        self.short_rtt = self.short_rtt * 0.8 + rtt * 0.2
+        self.long_rtt = self.long_rtt * 0.99 + rtt * 0.01
+        # After a slow period the baseline is pulled back towards the present
+        if self.long_rtt > 2 * self.short_rtt:
+            self.long_rtt *= 0.95
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        # Growing while mostly idle would only inflate the limit
+        if gradient >= 1.0 and in_flight < self.limit / 2:
+            return
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency slots with round-robin queues per client (single event loop)."""
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 2, max_limit: int = 200,
+                 max_queue: int = 100, max_queue_per_client: int = 4, max_wait: float = 10.0,
+                 max_in_flight_per_client: int = 8):
+        self.limiter = GradientLimit(initial_limit, min_limit, max_limit)
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.max_in_flight_per_client = max_in_flight_per_client
+        self.max_wait = max_wait
+        self.in_flight = 0
+        # client -> requests holding a slot
+        self._client_in_flight = {}
+        # client -> deque of waiter futures, rotated for round-robin service
+        self._queues = OrderedDict()
+        self._queued = 0
+        self._stats = {"admitted": 0, "queued": 0, "rejected_client_queue": 0,
+                       "rejected_queue_full": 0, "rejected_wait": 0, "dropped_responses": 0}
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.limiter.limit))
+
+    def retry_after(self) -> int:
+        """Seconds until a queued request would likely get a slot."""
+        rtt = self.limiter.short_rtt or 1.0
+        return max(1, math.ceil(rtt * (self._queued + 1) / self.limit))
+
+    async def acquire(self, client: str, timeout: float = None) -> None:
+        """Wait for a slot; raises Rejected when the request should be shed."""
+        if self.in_flight < self.limit and not self._queued and self._has_room(client):
+            self._grant(client)
+            self._stats["admitted"] += 1
+            return
+
+        queue = self._queues.get(client)
+        if queue is not None and len(queue) >= self.max_queue_per_client:
+            self._stats["rejected_client_queue"] += 1
+            raise Rejected(429, "Too many requests in flight from this client", self.retry_after())
+        if self._queued >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise Rejected(503, "Server is at capacity", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._queues[client] = deque()
+        queue.append(waiter)
+        self._queued += 1
+        self._stats["queued"] += 1
+        # Clients ahead in the queue may only be waiting on their own cap
+        self._dispatch()
+        wait = self.max_wait if timeout is None else max(0.0, min(self.max_wait, timeout))
+        try:
+            await asyncio.wait_for(waiter, wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we gave up on it
+                self.release(client)
+            else:
+                self._forget(client, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._stats["rejected_wait"] += 1
+                raise Rejected(503, "Timed out waiting for capacity", self.retry_after()) from None
+            raise
+        task = asyncio.current_task()
+        if task is not None and task.cancelling():
+            # wait_for can return a result that raced our cancellation
+            # (client disconnect); hand the slot back instead of running
+            self.release(client)
+            raise asyncio.CancelledError()
+        self._stats["admitted"] += 1
+
+    def release(self, client: str, latency: float = None, dropped: bool = False) -> None:
+        """Free client's slot; latency (seconds) feeds the adaptive limit."""
+        self.in_flight -= 1
+        count = self._client_in_flight.get(client, 0) - 1
+        if count > 0:
+            self._client_in_flight[client] = count
+        else:
+            self._client_in_flight.pop(client, None)
+        if dropped:
+            self._stats["dropped_responses"] += 1
+        if latency is not None or dropped:
+            self.limiter.update(latency or 0.0, dropped, self.in_flight)
+        self._dispatch()
+
+    def _forget(self, client, waiter) -> None:
+        queue = self._queues.get(client)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+            self._queued -= 1
+        except ValueError:
+            pass
+        if not queue:
+            del self._queues[client]
+
+    def _has_room(self, client) -> bool:
+        return self._client_in_flight.get(client, 0) < self.max_in_flight_per_client
+
+    def _grant(self, client) -> None:
+        self.in_flight += 1
+        self._client_in_flight[client] = self._client_in_flight.get(client, 0) + 1
+
+    def _dispatch(self) -> None:
+        while self._queued and self.in_flight < self.limit:
+            # Next client in round-robin order that is below its own cap
+            client = next((c for c in self._queues if self._has_room(c)), None)
+            if client is None:
+                return
+            queue = self._queues[client]
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            if waiter.done():
+                # Cancelled (client gone) before it could forget itself
+                continue
+            waiter.set_result(None)
+            self._grant(client)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self._queued,
+            "waiting_clients": len(self._queues),
+            "active_clients": len(self._client_in_flight),
+            "latency_ms": round(self.limiter.short_rtt * 1000, 1),
+            "baseline_latency_ms": round(self.limiter.long_rtt * 1000, 1),
+        }
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware applying an AdmissionController to some paths."""
+
+    # Statuses that mean the upstream (or we) were overloaded
+    _DROPPED = {429, 502, 503, 504}
+
+    def __init__(self, app, controller: AdmissionController, paths, trust_forwarded: bool = False):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.trust_forwarded = trust_forwarded
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        client = client_key(scope, self.trust_forwarded)
+        deadline = current_deadline()
+        try:
+            await self.controller.acquire(
+                client,
+                None if deadline is None else deadline - time.time(),
+            )
+        except Rejected as e:
+            await _send_rejection(send, e)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def tracking_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, tracking_send)
+        except asyncio.CancelledError:
+            # Client went away: says nothing about upstream latency
+            self.controller.release(client)
+            raise
+        except BaseException:
+            self.controller.release(client, time.perf_counter() - started, True)
+            raise
+        self.controller.release(client, time.perf_counter() - started, status in self._DROPPED)
+
+
+async def _send_rejection(send, rejection: Rejected) -> None:
+    body = ('{"detail":"%s"}' % rejection.detail).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": rejection.status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(rejection.retry_after).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,73 @@
+"""
+Say It Better - Long-input chunking
+
+Long inputs are split on paragraph, then sentence, boundaries so each chunk
+can be translated concurrently; merge_translations() stitches the chunk
+results back into a single /translate response body.
+"""
+
+import re
+from typing import List
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    """Break text into paragraph/sentence pieces no longer than max_chars."""
+    pieces = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            # A single run-on "sentence" longer than a chunk is cut on whitespace
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+    return pieces
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Greedily pack paragraph/sentence pieces into chunks of up to max_chars."""
+    chunks = []
+    current = ""
+    for piece in _pieces(text, max_chars):
+        candidate = f"{current}\n\n{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_translations(results: List[dict]) -> dict:
+    """
+    Combine per-chunk model outputs (in input order) into one result:
+    summaries and share-ready text are joined, themes are deduplicated by
+    case-insensitive name keeping the first description.
+    """
+    themes = []
+    seen = set()
+    for result in results:
+        for theme in result.get("themes", []):
+            key = " ".join(str(theme.get("theme", "")).lower().split())
+            if key and key not in seen:
+                seen.add(key)
+                themes.append(theme)
+
+    return {
+        "summary": " ".join(r.get("summary", "").strip() for r in results if r.get("summary")),
+        "themes": themes,
+        "share_ready": "\n\n".join(r.get("share_ready", "").strip() for r in results if r.get("share_ready")),
+    }
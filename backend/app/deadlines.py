@@ -0,0 +1,143 @@
+"""
+Say It Better - Request deadlines and client-disconnect cancellation
+
+RequestLifecycleMiddleware gives every HTTP request a deadline, taken from
+the X-Request-Timeout or X-Request-Deadline header or from
+DEFAULT_REQUEST_DEADLINE_SECONDS, and stores it in a context variable so
+upstream calls can size their timeouts with remaining_timeout(). From the
+moment the request arrives (including while it waits for admission), the
+middleware watches for the client going away and cancels the handler task,
+which aborts any in-flight httpx request or stream instead of paying for a
+completion nobody will read.
+
+The headers are read as in the Vercel functions (see resolve_deadline() in
+api/_lib/deadline.py): X-Request-Timeout is a budget in seconds,
+X-Request-Deadline an absolute Unix timestamp; past deadlines are ignored
+as clock skew and budgets are clamped to the MIN/MAX settings.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+
+from fastapi import HTTPException
+
+from _lib.deadline import resolve_deadline
+
+DEFAULT_REQUEST_DEADLINE_SECONDS = float(os.getenv("DEFAULT_REQUEST_DEADLINE_SECONDS") or 60)
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+_stats = {
+    "client_disconnects": 0,
+    "cancelled_requests": 0,
+    "cancelled_upstream_calls": 0,
+    "internal_cancels": 0,
+    "deadline_exceeded": 0,
+}
+
+# Cancel message for upstream tasks the app abandons itself (the losing
+# draft tier, warm-ups after a failed translation); those are not client
+# disconnects and stay out of cancelled_upstream_calls
+INTERNAL_CANCEL = "internal"
+
+
+def parse_deadline(timeout=None, deadline=None, now: float = None) -> float:
+    """Return the request's absolute deadline as a Unix timestamp in seconds."""
+    return resolve_deadline(timeout, deadline, now, DEFAULT_REQUEST_DEADLINE_SECONDS)
+
+
+def remaining_timeout(default: float) -> float:
+    """
+    Timeout for an upstream call: the smaller of default and the time left
+    before the current request's deadline. Raises 504 when none is left.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        _stats["deadline_exceeded"] += 1
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    return min(default, remaining)
+
+
+def current_deadline():
+    """The current request's absolute deadline, or None outside a request."""
+    return _deadline.get()
+
+
+def record_upstream_cancelled(error: asyncio.CancelledError = None) -> None:
+    if error is not None and error.args[:1] == (INTERNAL_CANCEL,):
+        _stats["internal_cancels"] += 1
+        return
+    _stats["cancelled_upstream_calls"] += 1
+
+
+def deadline_stats() -> dict:
+    return dict(_stats)
+
+
+class RequestLifecycleMiddleware:
+    """Pure ASGI middleware: deadline context + cancel on client disconnect."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        timeout = headers.get(b"x-request-timeout")
+        deadline = headers.get(b"x-request-deadline")
+        token = _deadline.set(parse_deadline(timeout and timeout.decode("latin-1"),
+                                             deadline and deadline.decode("latin-1")))
+
+        # The pump owns the real receive channel from the start, so a client
+        # that leaves while the request is queued or uploading is noticed
+        messages = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_done = False
+
+        async def wrapped_receive():
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def wrapped_send(message):
+            nonlocal response_done
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_done = True
+            await send(message)
+
+        app_task = asyncio.ensure_future(self.app(scope, wrapped_receive, wrapped_send))
+
+        async def pump():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    # After the response, this is the normal end of the
+                    # exchange; background tasks may still be running
+                    if not response_done and not app_task.done():
+                        _stats["client_disconnects"] += 1
+                        app_task.cancel()
+                    messages.put_nowait(message)
+                    return
+                messages.put_nowait(message)
+
+        watcher = asyncio.ensure_future(pump())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if not disconnected.is_set() or response_done:
+                app_task.cancel()
+                raise
+            # Client is gone: nothing to send
+            _stats["cancelled_requests"] += 1
+        finally:
+            watcher.cancel()
+            _deadline.reset(token)
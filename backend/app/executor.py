@@ -0,0 +1,81 @@
+"""
+Say It Better - CPU offload for the FastAPI app
+
+Pure-Python work such as cosine scoring and parsing large JSON documents
+blocks the event loop, stalling every other in-flight request on the worker. Work
+whose estimated cost crosses a threshold is dispatched to a bounded pool;
+small jobs still run inline, where a thread hop would cost more than it saves.
+
+Configuration (environment):
+    CPU_EXECUTOR            "thread" (default) or "process"
+    CPU_WORKERS             pool size (default: min(4, cpu count))
+    CPU_OFFLOAD_MIN_OPS     similarity cost above which scoring is offloaded
+    JSON_OFFLOAD_MIN_BYTES  JSON size above which parsing is offloaded
+
+Threads keep the loop responsive (the GIL is released every few ms) with no
+pickling cost; processes add real parallelism for large histories at the
+price of copying vectors to the worker.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from _lib.serialization import loads
+
+CPU_EXECUTOR = os.getenv("CPU_EXECUTOR", "thread")
+CPU_WORKERS = int(os.getenv("CPU_WORKERS") or min(4, os.cpu_count() or 1))
+CPU_OFFLOAD_MIN_OPS = int(os.getenv("CPU_OFFLOAD_MIN_OPS") or 200_000)
+JSON_OFFLOAD_MIN_BYTES = int(os.getenv("JSON_OFFLOAD_MIN_BYTES") or 256 * 1024)
+
+_pool = None
+# Bounds queued + running jobs so a burst cannot pile up unbounded work
+_slots = None
+
+_stats = {"inline": 0, "offloaded": 0}
+
+
+def _get_pool():
+    global _pool, _slots
+    if _pool is None:
+        if CPU_EXECUTOR == "process":
+            _pool = ProcessPoolExecutor(max_workers=CPU_WORKERS)
+        else:
+            _pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+        _slots = asyncio.Semaphore(CPU_WORKERS * 4)
+    return _pool
+
+
+async def run_cpu_bound(fn, *args, cost: int = 0, threshold: int = None):
+    """
+    Run fn(*args) inline when cost is below threshold (CPU_OFFLOAD_MIN_OPS by
+    default), otherwise in the pool. fn and its arguments must be picklable
+    when CPU_EXECUTOR=process.
+    """
+    if threshold is None:
+        threshold = CPU_OFFLOAD_MIN_OPS
+    if cost < threshold:
+        _stats["inline"] += 1
+        return fn(*args)
+    pool = _get_pool()
+    _stats["offloaded"] += 1
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(fn, *args))
+
+
+async def json_loads(text):
+    """The shared serializer's loads, offloaded for large documents."""
+    return await run_cpu_bound(loads, text, cost=len(text), threshold=JSON_OFFLOAD_MIN_BYTES)
+
+
+def executor_stats() -> dict:
+    return {"executor": CPU_EXECUTOR, "workers": CPU_WORKERS, **_stats}
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,191 @@
+"""
+Say It Better - Model and parameter experiments for translation
+
+MODEL_EXPERIMENT splits /translate traffic between "arms": alternative
+Groq models, temperatures and max_tokens, next to the deployment's own
+settings. Example:
+
+    {"name": "cheaper-models", "arms": [
+        {"name": "control", "weight": 80},
+        {"name": "8b", "model": "llama-3.1-8b-instant", "weight": 10, "cost_per_million_tokens": 0.08},
+        {"name": "cool", "temperature": 0.3, "max_tokens": 600, "weight": 10}
+    ]}
+
+Fields an arm leaves out take the deployment default. Assignment hashes the
+experiment name with the input, so a request (and any retry of it) always
+lands in the same arm, and each arm gets its weight's share of traffic.
+
+Each arm keeps latency, token usage, output length, upstream errors and
+how often the reply was not valid translation JSON. report() ranks the
+arms that produce valid JSON reliably enough, cheapest first (estimated
+cost when every arm has a price, else tokens), then fastest.
+"""
+
+import hashlib
+import json
+import time
+from collections import deque
+from typing import Awaitable, Callable, List
+
+from fastapi import HTTPException
+
+# Hash buckets the weights are spread over
+_BUCKETS = 10_000
+# Recent latencies kept per arm for the percentiles
+_WINDOW = 1000
+# An arm needs this many requests before it can be recommended
+MIN_SAMPLES = 30
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+class Arm:
+    def __init__(self, name: str, weight: float, model: str = None, temperature: float = None,
+                 max_tokens: int = None, cost_per_million_tokens: float = None):
+        self.name = name
+        self.weight = weight
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.cost_per_million_tokens = cost_per_million_tokens
+        self.latencies = deque(maxlen=_WINDOW)
+        self.counts = {"requests": 0, "valid": 0, "parse_failures": 0, "upstream_errors": 0}
+        # Token totals over the calls that returned a completion
+        self.completed = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.output_chars = 0
+
+    def settings(self) -> dict:
+        return {key: value for key, value in (
+            ("model", self.model), ("temperature", self.temperature), ("max_tokens", self.max_tokens),
+        ) if value is not None}
+
+    def snapshot(self) -> dict:
+        answered = self.counts["valid"] + self.counts["parse_failures"]
+        completed = self.completed
+        tokens = self.prompt_tokens + self.completion_tokens
+        snapshot = {
+            "settings": self.settings(),
+            "weight": self.weight,
+            **self.counts,
+            "valid_rate": round(self.counts["valid"] / answered, 4) if answered else None,
+            "p50_ms": _percentile(self.latencies, 0.5),
+            "p95_ms": _percentile(self.latencies, 0.95),
+            "mean_prompt_tokens": round(self.prompt_tokens / completed, 1) if completed else None,
+            "mean_completion_tokens": round(self.completion_tokens / completed, 1) if completed else None,
+            "mean_output_chars": round(self.output_chars / self.counts["valid"], 1) if self.counts["valid"] else None,
+        }
+        if self.cost_per_million_tokens is not None and completed:
+            snapshot["est_cost_per_1k_requests"] = round(
+                tokens / completed * self.cost_per_million_tokens / 1000, 4)
+        return snapshot
+
+
+def parse_experiment(text: str) -> "Experiment":
+    """Build an Experiment from MODEL_EXPERIMENT JSON; raises ValueError if malformed."""
+    config = json.loads(text)
+    if not isinstance(config, dict) or not isinstance(config.get("arms"), list) or not config["arms"]:
+        raise ValueError("MODEL_EXPERIMENT needs a non-empty \"arms\" list")
+    arms = []
+    for i, spec in enumerate(config["arms"]):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Arm {i} must be an object")
+        unknown = set(spec) - {"name", "weight", "model", "temperature", "max_tokens", "cost_per_million_tokens"}
+        if unknown:
+            raise ValueError(f"Arm {i} has unknown fields: {', '.join(sorted(unknown))}")
+        weight = spec.get("weight", 1)
+        if not isinstance(weight, (int, float)) or weight < 0:
+            raise ValueError(f"Arm {i} weight must be a non-negative number")
+        arms.append(Arm(str(spec.get("name") or f"arm-{i}"), weight, spec.get("model"), spec.get("temperature"),
+                        spec.get("max_tokens"), spec.get("cost_per_million_tokens")))
+    if len({arm.name for arm in arms}) != len(arms):
+        raise ValueError("Arm names must be unique")
+    if not sum(arm.weight for arm in arms):
+        raise ValueError("At least one arm needs a positive weight")
+    return Experiment(str(config.get("name") or "experiment"), arms, float(config.get("min_valid_rate", 0.98)))
+
+
+class Experiment:
+    def __init__(self, name: str, arms: List[Arm], min_valid_rate: float = 0.98):
+        self.name = name
+        self.arms = arms
+        self.min_valid_rate = min_valid_rate
+        total = sum(arm.weight for arm in arms)
+        # Upper bucket bound of each arm, in order
+        self._bounds = []
+        cumulative = 0.0
+        for arm in arms:
+            cumulative += arm.weight
+            self._bounds.append(round(cumulative / total * _BUCKETS))
+
+    def assign(self, key: str) -> Arm:
+        """The arm for a request, decided by a hash of the experiment name and key."""
+        digest = hashlib.sha256(f"{self.name}\0{key}".encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:8], "big") % _BUCKETS
+        for arm, bound in zip(self.arms, self._bounds):
+            if bucket < bound:
+                return arm
+        return self.arms[-1]
+
+    async def run(self, arm: Arm, call: Callable[[Arm], Awaitable[tuple]],
+                  validate: Callable[[dict], bool]) -> dict:
+        """
+        Run one request in an arm. call(arm) returns (parsed, usage) like
+        complete_json(); the parsed reply is returned unchanged, only
+        measured.
+        """
+        arm.counts["requests"] += 1
+        started = time.perf_counter()
+        try:
+            parsed, usage = await call(arm)
+        except HTTPException as e:
+            if e.detail == "Failed to parse AI response":
+                arm.counts["parse_failures"] += 1
+                arm.latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                arm.counts["upstream_errors"] += 1
+            raise
+        arm.latencies.append((time.perf_counter() - started) * 1000)
+        arm.completed += 1
+        arm.prompt_tokens += usage.get("prompt_tokens") or 0
+        arm.completion_tokens += usage.get("completion_tokens") or 0
+        if validate(parsed):
+            arm.counts["valid"] += 1
+            arm.output_chars += len(parsed["summary"]) + len(parsed["share_ready"])
+        else:
+            arm.counts["parse_failures"] += 1
+        return parsed
+
+    def rank(self, snapshots: dict) -> List[str]:
+        """Arms with enough valid samples, cheapest then fastest first."""
+        eligible = [
+            (name, s) for name, s in snapshots.items()
+            if s["requests"] >= MIN_SAMPLES and s["valid_rate"] is not None
+            and s["valid_rate"] >= self.min_valid_rate and s["mean_prompt_tokens"] is not None
+        ]
+        priced = all("est_cost_per_1k_requests" in s for _, s in eligible)
+
+        def cost(item):
+            _, s = item
+            spend = s["est_cost_per_1k_requests"] if priced else s["mean_prompt_tokens"] + s["mean_completion_tokens"]
+            return spend, s["p50_ms"]
+
+        return [name for name, _ in sorted(eligible, key=cost)]
+
+    def report(self) -> dict:
+        arms = {arm.name: arm.snapshot() for arm in self.arms}
+        ranking = self.rank(arms)
+        return {
+            "name": self.name,
+            "min_valid_rate": self.min_valid_rate,
+            "min_samples": MIN_SAMPLES,
+            "arms": arms,
+            "ranking": ranking,
+            "recommended": ranking[0] if ranking else None,
+        }
@@ -3,14 +3,44 @@ Say It Better - Backend API
 An AI-powered emotional translation tool that helps people clearly express how they feel.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, Optional, List
+import asyncio
+import hashlib
+import hmac
 import os
 from dotenv import load_dotenv
 import httpx
 import json
+import time
+import uuid
+from contextlib import contextmanager
+
+from _lib.memstore import MemoryStore, MemoryStoreFull
+from _lib.idempotency import REPLAYED_HEADER, IdempotencyCache, IdempotencyError
+from _lib.lexical import LexicalPrepass, lexical_stats
+from _lib.vectors import EmbeddingCache, borderline, rerank, rerank_texts
+from _lib import embedding_formats, workload
+from _lib.warmup import PROBE_TEXT, ModelWarmth, loading_estimate
+from _lib.workload import WorkloadRecorder
+from _lib.serialization import BACKEND as JSON_BACKEND, dumps
+
+from .executor import run_cpu_bound, json_loads, executor_stats, shutdown as shutdown_executor
+from .similarity import RECURRENCE_THRESHOLD, find_recurring_themes, similarity_cost
+from .chunking import split_text, merge_translations
+from .admission import AdmissionController, AdmissionControlMiddleware, client_key
+from .deadlines import INTERNAL_CANCEL, RequestLifecycleMiddleware, remaining_timeout, record_upstream_cancelled, deadline_stats
+from .responses import FastJSONResponse
+from .streaming import ThemeScanner, sse_content, sse_event, unique
+from .tiers import DRAFT, FINAL, TierStats
+from .experiments import parse_experiment
+from .summaries import summarize_tree, valid_summary
+from .profiler import SamplingProfiler
+from .workload import WorkloadCaptureMiddleware
+from .tones import TONES, get_tone_instruction, build_multi_tone_prompt, validate_multi_tone, variant_metrics
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,16 +55,85 @@ QWEN_EMB_ENDPOINT = os.getenv("QWEN_EMB_ENDPOINT")
 QWEN_EMB_TOKEN = os.getenv("QWEN_EMB_TOKEN")
 QWEN_EMB_MODEL = os.getenv("QWEN_EMB_MODEL", "Qwen/Qwen3-Embedding-8B")
 
-# Validate required environment variables
-if not GEMMA_ENDPOINT or not GEMMA_TOKEN:
-    raise ValueError("Missing required environment variables: GEMMA_ENDPOINT and GEMMA_TOKEN. See .env.example for setup.")
+# Groq API (OpenAI-compatible) - used by call_ai_model
+GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+# Small, fast model for draft-mode translations (see tiers.py)
+GROQ_DRAFT_MODEL = os.getenv("GROQ_DRAFT_MODEL", "llama-3.1-8b-instant")
+
+# Optional traffic split of /translate across models/parameters (see
+# experiments.py for the JSON format)
+try:
+    model_experiment = parse_experiment(os.environ["MODEL_EXPERIMENT"]) if os.getenv("MODEL_EXPERIMENT") else None
+except ValueError as e:
+    raise ValueError(f"Invalid MODEL_EXPERIMENT: {e}")
+
+# Hugging Face Inference API - used by get_embeddings
+HF_TOKEN = os.getenv("HF_TOKEN")
+HF_MODEL = os.getenv("HF_MODEL", "BAAI/bge-small-en-v1.5")
+HF_ENDPOINT = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
+
+# Long-input mode: inputs above the threshold are split on paragraph/sentence
+# boundaries and the chunks are translated concurrently
+LONG_INPUT_THRESHOLD = int(os.getenv("LONG_INPUT_THRESHOLD") or 1500)
+LONG_INPUT_CHUNK_CHARS = int(os.getenv("LONG_INPUT_CHUNK_CHARS") or 1000)
+LONG_INPUT_MAX_PARALLEL = int(os.getenv("LONG_INPUT_MAX_PARALLEL") or 6)
+
+# Session summaries: map-reduce over entry summaries (see summaries.py)
+SESSION_SUMMARY_BATCH_SIZE = int(os.getenv("SESSION_SUMMARY_BATCH_SIZE") or 8)
+SESSION_SUMMARY_FAN_IN = int(os.getenv("SESSION_SUMMARY_FAN_IN") or 4)
+SESSION_SUMMARY_MAX_PARALLEL = int(os.getenv("SESSION_SUMMARY_MAX_PARALLEL") or 4)
+
+# Multi-tone mode: all tone variants are cached briefly under a request token
+TONE_VARIANT_TTL_SECONDS = int(os.getenv("TONE_VARIANT_TTL_SECONDS") or 600)
+
+# /admin/profile is only served when a token is configured
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+PROFILER_MAX_SECONDS = 60
+
+
+def config_problems() -> List[str]:
+    """
+    Missing settings, checked when needed rather than at import: the app
+    starts without them, reports them on /health, and only the features
+    that need them fail.
+    """
+    problems = []
+    if not GROQ_API_KEY:
+        problems.append("GROQ_API_KEY is not set: translation endpoints are unavailable")
+    return problems
+
 
 app = FastAPI(
     title="Say It Better API",
     description="Transform raw emotional thoughts into clear, calm, neutral language",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
+# Clients are told apart by X-Forwarded-For only behind a trusted proxy
+TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED") == "1"
+
+# Admission control for the upstream-bound routes: an adaptive concurrency
+# limit with per-client fair queuing (innermost, so rejections get CORS)
+admission = AdmissionController(
+    initial_limit=int(os.getenv("ADMISSION_INITIAL_LIMIT") or 20),
+    min_limit=int(os.getenv("ADMISSION_MIN_LIMIT") or 2),
+    max_limit=int(os.getenv("ADMISSION_MAX_LIMIT") or 200),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE") or 100),
+    max_queue_per_client=int(os.getenv("ADMISSION_MAX_QUEUE_PER_CLIENT") or 4),
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS") or 10),
+    max_in_flight_per_client=int(os.getenv("ADMISSION_MAX_IN_FLIGHT_PER_CLIENT") or 8),
+)
+if (os.getenv("ADMISSION_CONTROL") or "1") != "0":
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        controller=admission,
+        paths=("/translate", "/translate-with-themes", "/summarize-session", "/analyze-themes", "/embeddings"),
+        trust_forwarded=TRUST_FORWARDED,
+    )
+
 # CORS middleware for frontend communication
 app.add_middleware(
     CORSMiddleware,
@@ -42,12 +141,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[*embedding_formats.EXPOSED_HEADERS, REPLAYED_HEADER, "Retry-After"],
 )
 
+# Per-request deadlines (X-Request-Deadline) and cancellation of abandoned
+# requests when the client disconnects
+app.add_middleware(RequestLifecycleMiddleware)
+
+# Opt-in shape-only traffic capture for replay (WORKLOAD_CAPTURE, see
+# _lib/workload.py); outermost, so queueing time is part of the capture
+workload_recorder = WorkloadRecorder()
+if workload_recorder.enabled:
+    app.add_middleware(
+        WorkloadCaptureMiddleware,
+        recorder=workload_recorder,
+        endpoints={"/translate": "translate", "/analyze-themes": "analyze-themes", "/share": "share"},
+    )
+
 # Request/Response Models
 class TranslationRequest(BaseModel):
     raw_text: str = Field(..., min_length=10, max_length=5000, description="Raw emotional text to translate")
     tone: Optional[str] = Field(default="neutral", description="Output tone: 'neutral', 'personal', or 'clinical'")
+    all_tones: bool = Field(default=False, description="Generate every tone in one call and cache them under a variant_token")
+    variant_token: Optional[str] = Field(default=None, description="Token from an all_tones response; serves other tones from cache")
+    draft: bool = Field(default=False, description="Stream a fast draft (event: draft) before the full-quality result (event: final)")
 
 class ThemeItem(BaseModel):
     theme: str
@@ -59,9 +176,33 @@ class TranslationResponse(BaseModel):
     share_ready: str
     original_length: int
     translated_length: int
+    variant_token: Optional[str] = None
+    variant_metrics: Optional[dict] = None
+
+class PipelineRequest(BaseModel):
+    raw_text: str = Field(..., min_length=10, max_length=5000, description="Raw emotional text to translate")
+    tone: Optional[str] = Field(default="neutral", description="Output tone: 'neutral', 'personal', or 'clinical'")
+    past_themes: List[str] = Field(default_factory=list, description="Themes from past translations")
+
+class PipelineResponse(TranslationResponse):
+    recurring_themes: List[str] = []
+    similarity_scores: dict = {}
+
+class SessionSummaryRequest(BaseModel):
+    entries: List[Annotated[str, Field(min_length=1, max_length=2000)]] = Field(
+        ..., min_length=1, max_length=1000, description="Entry summaries, oldest first")
+
+class SessionSummaryResponse(BaseModel):
+    summary: str
+    themes: List[ThemeItem]
+    share_ready: str
+    entry_count: int
+    tree: dict
 
 class EmbeddingRequest(BaseModel):
     texts: List[str] = Field(..., description="List of texts to embed")
+    encoding_format: Optional[str] = Field(default="float", description="'float' (JSON arrays) or 'base64' (packed little-endian floats)")
+    dtype: Optional[str] = Field(default="float32", description="'float32' or 'float16' for base64 and binary responses")
 
 class EmbeddingResponse(BaseModel):
     embeddings: List[List[float]]
@@ -118,20 +259,27 @@ Your output must be in valid JSON format with exactly this structure:
 Remember: You are translating language, not analyzing minds. Keep themes factual and based only on what was explicitly stated."""
 
 
-def get_tone_instruction(tone: str) -> str:
-    """Return additional instructions based on desired tone."""
-    if tone == "personal":
-        return "\nUse first-person language and a warmer, more personal tone while remaining clear."
-    elif tone == "clinical":
-        return "\nUse precise, clinical language suitable for medical contexts."
-    return "\nMaintain a balanced, neutral tone."
+# Shared upstream client: keeps pooled keep-alive connections to Groq and
+# Hugging Face across requests instead of a new TLS handshake per call
+_http_client: Optional[httpx.AsyncClient] = None
 
 
-async def call_ai_model(raw_text: str, tone: str = "neutral") -> dict:
-    """Call the Groq API (Llama 3.3 70B) to translate emotional text."""
-    
-    # Build the user prompt
-    user_prompt = f"""Please rewrite the following text into clear, neutral language.
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide upstream HTTP client."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=60.0,
+            # Idle connections are kept long enough for the startup priming
+            # in keep_warm() to still be useful to the first requests
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0),
+        )
+    return _http_client
+
+
+def build_user_prompt(raw_text: str, tone: str = "neutral") -> str:
+    """Build the single-tone translation prompt."""
+    return f"""Please rewrite the following text into clear, neutral language.
 {get_tone_instruction(tone)}
 
 Original text:
@@ -149,60 +297,235 @@ Respond ONLY with valid JSON matching this exact structure:
 
 JSON Response:"""
 
+
+def extract_json_content(content: str) -> str:
+    """Strip markdown fences and surrounding prose from a model's JSON reply."""
+    # Handle potential markdown code blocks
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    
+    # Try to find JSON in the response
+    content = content.strip()
+    if not content.startswith("{"):
+        # Find the first { and last }
+        start = content.find("{")
+        end = content.rfind("}") + 1
+        if start != -1 and end > start:
+            content = content[start:end]
+    return content.strip()
+
+
+def completion_request(user_prompt: str, max_tokens: int = 1000, stream: bool = False,
+                       model: str = None, temperature: float = None) -> dict:
+    """Keyword arguments for a Groq chat completion under SYSTEM_PROMPT."""
+    if not GROQ_API_KEY:
+        raise HTTPException(status_code=503, detail="AI service is not configured")
+    body = {
+        "model": model or GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        "temperature": 0.7 if temperature is None else temperature,
+        "max_tokens": max_tokens
+    }
+    if stream:
+        body["stream"] = True
+    return {
+        "timeout": remaining_timeout(60.0),
+        "headers": {
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json"
+        },
+        "json": body,
+    }
+
+
+@contextmanager
+def upstream_errors():
+    """Map failures of a Groq call onto the HTTP errors clients see."""
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                GROQ_ENDPOINT,
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": GROQ_MODEL,
-                    "messages": [
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 1000
-                }
-            )
-            
-            if response.status_code != 200:
-                print(f"API Error: {response.status_code} - {response.text}")
-                raise HTTPException(status_code=502, detail="AI service unavailable")
-            
-            result = response.json()
-            content = result["choices"][0]["message"]["content"]
-            
-            # Parse JSON from response
-            # Handle potential markdown code blocks
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            # Try to find JSON in the response
-            content = content.strip()
-            if not content.startswith("{"):
-                # Find the first { and last }
-                start = content.find("{")
-                end = content.rfind("}") + 1
-                if start != -1 and end > start:
-                    content = content[start:end]
-            
-            return json.loads(content.strip())
-            
+        yield
     except json.JSONDecodeError as e:
         print(f"JSON Parse Error: {e}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="AI service timeout")
+    except asyncio.CancelledError as e:
+        # Client disconnected: the in-flight upstream request is aborted
+        record_upstream_cancelled(e)
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def complete_json(user_prompt: str, max_tokens: int = 1000, model: str = None,
+                        temperature: float = None) -> tuple:
+    """
+    Send one chat completion to Groq under SYSTEM_PROMPT and parse the JSON
+    reply. Returns (parsed, usage) where usage is the upstream token count.
+    """
+    with upstream_errors():
+        client = get_http_client()
+        with workload.upstream():
+            response = await client.post(
+                GROQ_ENDPOINT, **completion_request(user_prompt, max_tokens, model=model, temperature=temperature))
+        
+        if response.status_code != 200:
+            print(f"API Error: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=502, detail="AI service unavailable")
+        
+        result = await json_loads(response.text)
+        content = result["choices"][0]["message"]["content"]
+        parsed = await json_loads(extract_json_content(content))
+        return parsed, result.get("usage") or {}
+
+
+async def stream_json_completion(user_prompt: str, on_themes, max_tokens: int = 1000) -> dict:
+    """
+    Like complete_json(), but streams the reply and calls on_themes(labels)
+    with theme labels as soon as the model has finished writing them.
+    """
+    scanner = ThemeScanner()
+    with upstream_errors(), workload.upstream():
+        client = get_http_client()
+        async with client.stream(
+            "POST", GROQ_ENDPOINT, **completion_request(user_prompt, max_tokens, stream=True)
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                print(f"API Error: {response.status_code} - {body[:500]!r}")
+                raise HTTPException(status_code=502, detail="AI service unavailable")
+            async for line in response.aiter_lines():
+                delta = sse_content(line)
+                if delta:
+                    themes = scanner.feed(delta)
+                    if themes:
+                        on_themes(themes)
+        return await json_loads(extract_json_content(scanner.text))
+
+
+async def call_ai_model(raw_text: str, tone: str = "neutral", model: str = None,
+                        experiment: bool = True) -> dict:
+    """
+    Call the Groq API (Llama 3.3 70B by default) to translate emotional text.
+
+    Unless a model is given (or experiment=False), a running MODEL_EXPERIMENT
+    picks the model and parameters for this text and measures the call.
+    """
+    user_prompt = build_user_prompt(raw_text, tone)
+    if model is None and experiment and model_experiment is not None:
+        return await model_experiment.run(
+            model_experiment.assign(f"{tone}\0{raw_text}"),
+            lambda arm: complete_json(user_prompt, max_tokens=arm.max_tokens or 1000,
+                                      model=arm.model, temperature=arm.temperature),
+            valid_summary,
+        )
+    parsed, _ = await complete_json(user_prompt, model=model)
+    return parsed
+
+
+def translation_response(raw_text: str, result: dict) -> TranslationResponse:
+    """Validate a model's translation JSON into the /translate response."""
+    try:
+        return TranslationResponse(
+            summary=result["summary"],
+            themes=[ThemeItem(**t) for t in result["themes"]],
+            share_ready=result["share_ready"],
+            original_length=len(raw_text),
+            translated_length=len(result["summary"])
+        )
+    except (KeyError, TypeError, ValidationError) as e:
+        print(f"Invalid translation structure: {e}")
+        raise HTTPException(status_code=500, detail="Failed to parse AI response")
+
+
+async def translate_long_text(raw_text: str, tone: str = "neutral") -> dict:
+    """
+    Translate a long input as concurrently translated chunks and merge the
+    results. Falls back to a single call when the text does not split.
+    """
+    chunks = split_text(raw_text, LONG_INPUT_CHUNK_CHARS)
+    if len(chunks) < 2:
+        return await call_ai_model(raw_text, tone)
+    
+    slots = asyncio.Semaphore(LONG_INPUT_MAX_PARALLEL)
+    
+    # Chunks of one text are not split across experiment arms
+    async def translate_chunk(chunk: str) -> dict:
+        async with slots:
+            return await call_ai_model(chunk, tone, experiment=False)
+    
+    results = await asyncio.gather(*(translate_chunk(chunk) for chunk in chunks))
+    return merge_translations(results)
+
+
+# Tone variants from all_tones generations: {variant_token: generation}
+tone_variants = MemoryStore(
+    max_bytes=16 * 1024 * 1024,
+    default_ttl=TONE_VARIANT_TTL_SECONDS,
+    name="tone_variants",
+)
+_tone_stats = {"generations": 0}
+
+
+def _text_hash(raw_text: str) -> str:
+    return hashlib.sha256(raw_text.encode("utf-8")).hexdigest()
+
+
+async def generate_all_tones(raw_text: str) -> dict:
+    """Generate every tone variant in one structured call."""
+    started = time.perf_counter()
+    parsed, usage = await complete_json(build_multi_tone_prompt(raw_text), max_tokens=2500)
+    latency_ms = (time.perf_counter() - started) * 1000
+    
+    if not validate_multi_tone(parsed):
+        print("Multi-tone response has malformed themes or a missing tone variant")
+        raise HTTPException(status_code=500, detail="Failed to parse AI response")
+    
+    variants = {
+        tone: {
+            "summary": parsed["variants"][tone]["summary"],
+            "share_ready": parsed["variants"][tone]["share_ready"],
+        }
+        for tone in TONES
+    }
+    _tone_stats["generations"] += 1
+    return {
+        "text_hash": _text_hash(raw_text),
+        "themes": parsed["themes"],
+        "variants": variants,
+        "metrics": {
+            "latency_ms": round(latency_ms, 1),
+            "usage": usage,
+            "variants": variant_metrics(variants, usage, latency_ms),
+        },
+    }
+
+
+def tone_variant_response(raw_text: str, generation: dict, tone: str, token: str,
+                          include_metrics: bool) -> TranslationResponse:
+    try:
+        variant = generation["variants"][tone]
+        return TranslationResponse(
+            summary=variant["summary"],
+            themes=[ThemeItem(**t) for t in generation["themes"]],
+            share_ready=variant["share_ready"],
+            original_length=len(raw_text),
+            translated_length=len(variant["summary"]),
+            variant_token=token,
+            variant_metrics=generation["metrics"] if include_metrics else None,
+        )
+    except (KeyError, TypeError, ValidationError) as e:
+        print(f"Invalid multi-tone structure: {e}")
+        raise HTTPException(status_code=500, detail="Failed to parse AI response")
+
+
 @app.get("/", response_model=HealthResponse)
 async def root():
     """Health check endpoint."""
@@ -215,13 +538,113 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Detailed health check."""
+    problems = config_problems()
+    if problems:
+        return HealthResponse(status="degraded", message="; ".join(problems))
     return HealthResponse(
         status="healthy",
         message="All systems operational"
     )
 
 
-@app.post("/translate", response_model=TranslationResponse)
+@app.get("/metrics")
+async def metrics():
+    """Operational counters: in-memory store occupancy and CPU offload."""
+    return {
+        "share_links": shared_links.stats(),
+        "executor": executor_stats(),
+        "tone_variants": {**tone_variants.stats(), **_tone_stats},
+        "deadlines": deadline_stats(),
+        "theme_prepass": lexical_stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "json_backend": JSON_BACKEND,
+        "idempotency": {"share": share_idempotency.stats()},
+        "pipeline": _pipeline_stats,
+        "draft_tiers": tier_stats.snapshot(),
+        "session_summaries": {**_summary_stats, "cache": summary_nodes.stats()},
+        "admission": admission.stats(),
+        "cold_starts": {"embeddings": hf_warmth.stats()},
+        "workload_capture": workload_recorder.stats(),
+        "model_experiment": model_experiment.report() if model_experiment is not None else None,
+    }
+
+
+# Startup priming and periodic keep-warm probes for the upstreams
+KEEP_WARM = (os.getenv("KEEP_WARM") or "1") != "0"
+# How long the startup probe keeps retrying while the HF model loads
+PRIME_MAX_SECONDS = 120
+_keep_warm_task: Optional[asyncio.Task] = None
+
+
+async def probe_embeddings() -> Optional[float]:
+    """
+    Send one cheap embedding request. Returns the load estimate when the
+    model answered "loading", else None.
+    """
+    try:
+        response = await post_embeddings([PROBE_TEXT], 30.0)
+    except Exception as e:
+        print(f"Keep-warm probe failed: {e}")
+        hf_warmth.record_probe(ok=False)
+        return None
+    estimate = loading_estimate(response.status_code, response.content)
+    hf_warmth.record_probe(ok=response.status_code == 200)
+    if estimate is not None:
+        hf_warmth.record_loading(estimate)
+    elif response.status_code == 200:
+        hf_warmth.record_ready()
+    return estimate
+
+
+async def prime_groq() -> None:
+    """Open a pooled connection to Groq (listing models costs no tokens)."""
+    if not GROQ_API_KEY:
+        return
+    try:
+        await get_http_client().get(
+            GROQ_ENDPOINT.rsplit("/chat/", 1)[0] + "/models",
+            headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
+            timeout=10.0,
+        )
+    except Exception as e:
+        print(f"Groq warm-up failed: {e}")
+
+
+async def prime_embeddings() -> None:
+    """Load the HF model now, so the first user request does not pay for it."""
+    started = time.monotonic()
+    estimate = await probe_embeddings()
+    while estimate is not None and time.monotonic() - started < PRIME_MAX_SECONDS:
+        await asyncio.sleep(min(max(estimate, 1.0), 5.0))
+        estimate = await probe_embeddings()
+
+
+async def keep_warm() -> None:
+    """Prime connections and the HF model, then probe it while traffic is active."""
+    await asyncio.gather(prime_groq(), prime_embeddings())
+    while True:
+        await asyncio.sleep(min(hf_warmth.probe_interval, 60.0))
+        if hf_warmth.probe_due():
+            await probe_embeddings()
+
+
+@app.on_event("startup")
+async def on_startup():
+    global _keep_warm_task
+    if KEEP_WARM:
+        _keep_warm_task = asyncio.create_task(keep_warm())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if _keep_warm_task is not None:
+        _keep_warm_task.cancel()
+    shutdown_executor()
+    if _http_client is not None:
+        await _http_client.aclose()
+
+
+@app.post("/translate", response_model=TranslationResponse, response_model_exclude_none=True)
 async def translate_text(request: TranslationRequest):
     """
     Translate raw emotional text into clear, neutral language.
@@ -233,18 +656,96 @@ async def translate_text(request: TranslationRequest):
     - Handle crisis situations
     
     It ONLY helps with language translation and clarification.
+    
+    With all_tones, every tone is generated in one call and cached under the
+    returned variant_token; sending that token back with another tone serves
+    it instantly from the cache.
     """
+    tone = request.tone if request.tone in TONES else "neutral"
+    workload.note(chars=len(request.raw_text), tone=tone, all_tones=request.all_tones,
+                  draft=request.draft, variant=request.variant_token is not None)
     
-    # Call AI model
-    result = await call_ai_model(request.raw_text, request.tone)
+    if request.variant_token:
+        generation = tone_variants.get(request.variant_token)
+        # Only serve variants generated from this exact text
+        if generation and generation["text_hash"] == _text_hash(request.raw_text):
+            return tone_variant_response(request.raw_text, generation, tone, request.variant_token, False)
     
-    return TranslationResponse(
-        summary=result["summary"],
-        themes=[ThemeItem(**t) for t in result["themes"]],
-        share_ready=result["share_ready"],
-        original_length=len(request.raw_text),
-        translated_length=len(result["summary"])
-    )
+    if request.all_tones:
+        generation = await generate_all_tones(request.raw_text)
+        token = uuid.uuid4().hex
+        tone_variants.set(token, generation)
+        return tone_variant_response(request.raw_text, generation, tone, token, True)
+    
+    if request.draft:
+        return StreamingResponse(
+            draft_then_final(request.raw_text, request.tone),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    
+    return translation_response(request.raw_text, await translate_full(request.raw_text, request.tone))
+
+
+async def translate_full(raw_text: str, tone: str) -> dict:
+    """The main model's translation; long inputs are translated as parallel chunks."""
+    if len(raw_text) > LONG_INPUT_THRESHOLD:
+        return await translate_long_text(raw_text, tone)
+    return await call_ai_model(raw_text, tone)
+
+
+tier_stats = TierStats()
+
+
+async def draft_then_final(raw_text: str, tone: str):
+    """
+    Server-sent events for draft mode. Both tiers start at once; the draft
+    event is only sent if it beats the final one, which always follows (or
+    an error event if the main model fails).
+    """
+    tier_stats.record_request()
+    started = time.perf_counter()
+    
+    async def run(tier: str, translate):
+        result = translation_response(raw_text, await translate)
+        latency_ms = (time.perf_counter() - started) * 1000
+        tier_stats.record_latency(tier, latency_ms)
+        return result, latency_ms
+    
+    draft = asyncio.create_task(run(DRAFT, call_ai_model(raw_text, tone, model=GROQ_DRAFT_MODEL)))
+    final = asyncio.create_task(run(FINAL, translate_full(raw_text, tone)))
+    try:
+        await asyncio.wait((draft, final), return_when=asyncio.FIRST_COMPLETED)
+        draft_ms = None
+        if not final.done():
+            try:
+                result, draft_ms = await draft
+                yield sse_event(DRAFT, dumps({
+                    **result.model_dump(exclude_none=True), "tier": DRAFT, "model": GROQ_DRAFT_MODEL,
+                    "latency_ms": round(draft_ms, 1),
+                }))
+            except HTTPException as e:
+                tier_stats.record_failure(DRAFT)
+                print(f"Draft translation failed: {e.detail}")
+        tier_stats.record_draft(draft_ms is not None)
+        
+        try:
+            result, final_ms = await final
+        except HTTPException as e:
+            tier_stats.record_failure(FINAL)
+            yield sse_event("error", dumps({"status": e.status_code, "detail": e.detail}))
+            return
+        if draft_ms is not None:
+            tier_stats.record_lead(final_ms - draft_ms)
+        yield sse_event(FINAL, dumps({
+            **result.model_dump(exclude_none=True), "tier": FINAL, "model": GROQ_MODEL,
+            "latency_ms": round(final_ms, 1),
+        }))
+    finally:
+        # Once the final tier has settled, a still-running draft simply
+        # lost; otherwise the stream itself was abandoned by the client
+        for task in (draft, final):
+            task.cancel(INTERNAL_CANCEL if final.done() else None)
 
 
 @app.get("/disclaimer")
@@ -271,55 +772,129 @@ Your text is processed only for the current request and is not stored or used fo
     }
 
 
+# Cold loads of the HF model are waited out (bounded) instead of failing
+hf_warmth = ModelWarmth(HF_MODEL)
+
+
+async def post_embeddings(texts: List[str], timeout: float) -> httpx.Response:
+    headers = {"Content-Type": "application/json"}
+    if HF_TOKEN:
+        headers["Authorization"] = f"Bearer {HF_TOKEN}"
+    with workload.upstream():
+        return await get_http_client().post(HF_ENDPOINT, timeout=timeout, headers=headers, json={"inputs": texts})
+
+
 async def get_embeddings(texts: List[str]) -> List[List[float]]:
-    """Get embeddings from Hugging Face API for theme similarity detection."""
+    """
+    Get embeddings from Hugging Face API for theme similarity detection.
+
+    While the model is being (re)loaded the request is held and retried,
+    for at most COLD_START_MAX_WAIT_SECONDS, rather than failed.
+    """
+    hf_warmth.record_use()
+    started = time.monotonic()
     try:
-        headers = {"Content-Type": "application/json"}
-        if HF_TOKEN:
-            headers["Authorization"] = f"Bearer {HF_TOKEN}"
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                HF_ENDPOINT,
-                headers=headers,
-                json={"inputs": texts}
-            )
-            
-            if response.status_code == 503:
-                # Model is loading, wait and retry
+        pause = min(hf_warmth.queue_delay(), remaining_timeout(30.0))
+        held = pause > 0
+        if held:
+            await asyncio.sleep(pause)
+        while True:
+            response = await post_embeddings(texts, remaining_timeout(30.0))
+            estimate = loading_estimate(response.status_code, response.content)
+            if estimate is None:
+                break
+            hf_warmth.record_loading(estimate)
+            waited = time.monotonic() - started
+            delay = hf_warmth.retry_delay(estimate, waited, remaining_timeout(hf_warmth.max_wait))
+            if delay is None:
+                hf_warmth.record_held(waited, served=False)
                 raise HTTPException(status_code=503, detail="Model is loading, please try again in a few seconds")
+            held = True
+            await asyncio.sleep(delay)
+        
+        if response.status_code != 200:
+            print(f"Embedding API Error: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=502, detail="Embedding service unavailable")
+        
+        hf_warmth.record_ready()
+        if held:
+            hf_warmth.record_held(time.monotonic() - started, served=True)
+        # HF returns embeddings directly as list of lists
+        return response.json()
             
-            if response.status_code != 200:
-                print(f"Embedding API Error: {response.status_code} - {response.text}")
-                raise HTTPException(status_code=502, detail="Embedding service unavailable")
-            
-            result = response.json()
-            # HF returns embeddings directly as list of lists
-            return result
-            
+    except asyncio.CancelledError as e:
+        record_upstream_cancelled(e)
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Embedding Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    magnitude1 = sum(a * a for a in vec1) ** 0.5
-    magnitude2 = sum(b * b for b in vec2) ** 0.5
-    if magnitude1 == 0 or magnitude2 == 0:
-        return 0.0
-    return dot_product / (magnitude1 * magnitude2)
+# Theme vectors are kept across requests as int8/float16 codes (optionally
+# Matryoshka-truncated) instead of lists of Python floats
+embedding_cache = EmbeddingCache(HF_MODEL)
+
+
+async def get_theme_vectors(texts: List[str]) -> tuple:
+    """
+    Embed theme labels, serving repeats from the quantized cache.
+
+    Returns (vectors in input order, {text: vector} for the ones fetched
+    now - those are still full precision).
+    """
+    found, missing = embedding_cache.lookup(texts)
+    fresh = {}
+    if missing:
+        embeddings = await get_embeddings(missing)
+        for text, vector in zip(missing, embeddings):
+            fresh[text] = embedding_cache.store(text, vector)
+    vectors = {**found, **fresh}
+    return [vectors[text] for text in texts], fresh
 
 
-@app.post("/embeddings", response_model=EmbeddingResponse)
-async def create_embeddings(request: EmbeddingRequest):
+@app.post(
+    "/embeddings",
+    response_model=EmbeddingResponse,
+    responses={200: {"content": {
+        embedding_formats.OCTET_STREAM: {},
+        embedding_formats.NDJSON_MEDIA_TYPE: {},
+    }}},
+)
+async def create_embeddings(request: EmbeddingRequest, accept: Optional[str] = Header(default=None)):
     """
     Generate embeddings for a list of texts using qwen-emb.
     Useful for comparing themes across multiple translation sessions.
+    
+    Returns JSON float arrays by default; see api/_lib/embedding_formats.py
+    for the base64, application/octet-stream and NDJSON variants. Responses
+    are built directly, so vectors are not validated float by float.
     """
+    try:
+        fmt, dtype = embedding_formats.negotiate(accept, request.encoding_format, request.dtype)
+    except embedding_formats.FormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     embeddings = await get_embeddings(request.texts)
-    return EmbeddingResponse(embeddings=embeddings)
+    headers = {"Vary": "Accept"}
+    
+    if fmt == embedding_formats.BINARY:
+        headers.update(embedding_formats.shape_headers(embeddings, dtype))
+        return Response(
+            content=embedding_formats.pack_matrix(embeddings, dtype),
+            media_type=embedding_formats.OCTET_STREAM,
+            headers=headers,
+        )
+    if fmt == embedding_formats.NDJSON:
+        return StreamingResponse(
+            embedding_formats.iter_ndjson(embeddings),
+            media_type=embedding_formats.NDJSON_MEDIA_TYPE,
+            headers=headers,
+        )
+    if fmt == embedding_formats.BASE64:
+        return FastJSONResponse(embedding_formats.base64_payload(embeddings, dtype), headers=headers)
+    return FastJSONResponse({"embeddings": embeddings}, headers=headers)
 
 
 @app.post("/analyze-themes", response_model=ThemeSimilarityResponse)
@@ -330,92 +905,288 @@ async def analyze_theme_similarity(request: ThemeSimilarityRequest):
     
     This does NOT diagnose or label - it only identifies similar language patterns.
     """
+    workload.note(themes=len(request.current_themes), past_themes=len(request.past_themes))
     if not request.current_themes or not request.past_themes:
         return ThemeSimilarityResponse(recurring_themes=[], similarity_scores={})
     
-    # Get embeddings for all themes
-    all_themes = request.current_themes + request.past_themes
-    embeddings = await get_embeddings(all_themes)
-    
-    current_embeddings = embeddings[:len(request.current_themes)]
-    past_embeddings = embeddings[len(request.current_themes):]
+    # Exact and near-identical labels are scored lexically; only the rest
+    # (deduplicated) go to the embedding service
+    prepass = LexicalPrepass(request.current_themes, request.past_themes)
     
-    # Find recurring themes (similarity > 0.7)
-    recurring_themes = []
-    similarity_scores = {}
-    
-    for i, current_theme in enumerate(request.current_themes):
-        max_similarity = 0.0
-        most_similar_past = None
+    if prepass.needs_embeddings:
+        pending, past = prepass.pending_current, prepass.unique_past
+        vectors, fresh = await get_theme_vectors(pending + past)
         
-        for j, past_theme in enumerate(request.past_themes):
-            similarity = cosine_similarity(current_embeddings[i], past_embeddings[j])
-            if similarity > max_similarity:
-                max_similarity = similarity
-                most_similar_past = past_theme
+        current_embeddings = vectors[:len(pending)]
+        past_embeddings = vectors[len(pending):]
         
-        similarity_scores[current_theme] = {
-            "most_similar": most_similar_past,
-            "score": round(max_similarity, 3)
-        }
+        # Find recurring themes (similarity > 0.7). Scoring is O(n*m*d) pure
+        # Python, so large histories are scored off the event loop.
+        cost = similarity_cost(len(current_embeddings), len(past_embeddings), len(vectors[0]) if vectors else 0)
+        _, similarity_scores = await run_cpu_bound(
+            find_recurring_themes,
+            pending, past, current_embeddings, past_embeddings,
+            cost=cost,
+        )
         
-        if max_similarity > 0.7:
-            recurring_themes.append(current_theme)
+        # Cached vectors are quantized (and possibly truncated): scores too
+        # close to the threshold are recomputed at full precision
+        uncertain = borderline(similarity_scores, RECURRENCE_THRESHOLD)
+        if uncertain:
+            texts = rerank_texts(similarity_scores, uncertain)
+            if embedding_cache.dimensions or any(text not in fresh for text in texts):
+                full_vectors = await get_embeddings(texts)
+                rerank(similarity_scores, uncertain, dict(zip(texts, full_vectors)))
+                embedding_cache.record_reranked(len(uncertain))
+        prepass.add_embedding_scores(similarity_scores)
     
+    recurring_themes, similarity_scores = prepass.results(request.current_themes, RECURRENCE_THRESHOLD)
     return ThemeSimilarityResponse(
         recurring_themes=recurring_themes,
         similarity_scores=similarity_scores
     )
 
 
+_pipeline_stats = {"requests": 0, "themes_embedded_early": 0, "analysis_failures": 0}
+
+
+async def warm_theme_vectors(texts: List[str]) -> None:
+    """Embed theme labels into the cache ahead of the analysis; errors are left to it."""
+    try:
+        await get_theme_vectors(texts)
+    except HTTPException as e:
+        print(f"Theme pre-embedding failed: {e.detail}")
+
+
+@app.post("/translate-with-themes", response_model=PipelineResponse, response_model_exclude_none=True)
+async def translate_with_themes(request: PipelineRequest):
+    """
+    /translate and /analyze-themes in one round trip.
+    
+    Past themes are embedded while the model is still generating, and each
+    new theme is embedded as soon as the streamed reply has finished writing
+    it, so by the time the translation is complete the similarity analysis
+    is served from the embedding cache.
+    """
+    _pipeline_stats["requests"] += 1
+    warmups = []
+    warmed = set()
+    
+    def warm(texts: List[str], early: bool = False) -> None:
+        texts = [text for text in texts if text not in warmed]
+        if not texts:
+            return
+        warmed.update(texts)
+        if early:
+            _pipeline_stats["themes_embedded_early"] += len(texts)
+        warmups.append(asyncio.create_task(warm_theme_vectors(texts)))
+    
+    past_themes = unique(request.past_themes)
+    warm(past_themes)
+    
+    try:
+        if len(request.raw_text) > LONG_INPUT_THRESHOLD:
+            result = await translate_long_text(request.raw_text, request.tone)
+        elif past_themes:
+            result = await stream_json_completion(
+                build_user_prompt(request.raw_text, request.tone),
+                lambda themes: warm(themes, early=True),
+            )
+        else:
+            result = await call_ai_model(request.raw_text, request.tone)
+        await asyncio.gather(*warmups)
+    except BaseException as e:
+        for task in warmups:
+            task.cancel(None if isinstance(e, asyncio.CancelledError) else INTERNAL_CANCEL)
+        raise
+    
+    # Malformed model output fails like /translate, not as a bare 500
+    response = PipelineResponse(**translation_response(request.raw_text, result).model_dump())
+    if past_themes:
+        # Recurrence is a nice-to-have: an embedding outage must not cost
+        # the user their translation
+        try:
+            analysis = await analyze_theme_similarity(ThemeSimilarityRequest(
+                current_themes=[theme.theme for theme in response.themes],
+                past_themes=past_themes,
+            ))
+            response.recurring_themes = analysis.recurring_themes
+            response.similarity_scores = analysis.similarity_scores
+        except HTTPException as e:
+            _pipeline_stats["analysis_failures"] += 1
+            print(f"Theme analysis failed: {e.detail}")
+    return response
+
+
+# Session summary tree nodes, keyed by a hash of their level and inputs
+summary_nodes = MemoryStore(
+    max_bytes=int(os.getenv("SESSION_SUMMARY_CACHE_MAX_BYTES") or 8 * 1024 * 1024),
+    default_ttl=24 * 60 * 60,
+    name="summary_nodes",
+)
+_summary_stats = {"requests": 0, "nodes_computed": 0, "nodes_cached": 0}
+
+
+async def complete_summary(prompt: str) -> dict:
+    parsed, _ = await complete_json(prompt, max_tokens=1500)
+    if not valid_summary(parsed):
+        raise HTTPException(status_code=500, detail="Failed to parse AI response")
+    return parsed
+
+
+@app.post("/summarize-session", response_model=SessionSummaryResponse)
+async def summarize_session(request: SessionSummaryRequest):
+    """
+    Summarize many past entry summaries into one, without a single prompt
+    that would exceed the /translate input limits: batches are summarized in
+    parallel and merged hierarchically. Unchanged branches of the tree are
+    served from cache, so adding an entry recomputes only its own branch.
+    """
+    _summary_stats["requests"] += 1
+    result, tree = await summarize_tree(
+        request.entries,
+        complete_summary,
+        summary_nodes,
+        batch_size=SESSION_SUMMARY_BATCH_SIZE,
+        fan_in=SESSION_SUMMARY_FAN_IN,
+        max_parallel=SESSION_SUMMARY_MAX_PARALLEL,
+    )
+    _summary_stats["nodes_computed"] += tree["computed"]
+    _summary_stats["nodes_cached"] += tree["cached"]
+    return SessionSummaryResponse(
+        summary=result["summary"],
+        themes=[ThemeItem(**t) for t in result["themes"]],
+        share_ready=result["share_ready"],
+        entry_count=len(request.entries),
+        tree=tree,
+    )
+
+
 # --- Secure Sharing (In-Memory for Demo) ---
-import uuid
-import time
+
+SHARE_TTL_SECONDS = 24 * 60 * 60  # 24 hours
+# Expired links are kept a little longer so clients get 410 instead of 404
+SHARE_EXPIRED_GRACE_SECONDS = 60 * 60
 
 # Store shared links in memory: {share_id: SharedAndEncryptedData}
+# Bounded by bytes with LRU eviction; expiry is enforced by the store.
 # In production, use Redis or a Database with TTL
-shared_links = {}
+shared_links = MemoryStore(
+    max_bytes=int(os.getenv("SHARE_STORE_MAX_BYTES") or 64 * 1024 * 1024),
+    default_ttl=SHARE_TTL_SECONDS + SHARE_EXPIRED_GRACE_SECONDS,
+    name="share",
+)
+
+# Responses to POST /share requests that carried an Idempotency-Key, so a
+# retried upload returns the original link instead of storing another copy
+share_idempotency = IdempotencyCache("share")
 
 @app.post("/share", response_model=ShareResponse)
-async def create_share_link(request: ShareRequest):
+async def create_share_link(request: ShareRequest, response: Response, http_request: Request,
+                            idempotency_key: Optional[str] = Header(None)):
     """
     Store an encrypted blob for temporary sharing.
     The server CANNOT read this data (it doesn't have the key).
     """
+    workload.note(payload_bytes=len(request.encrypted_data))
+    if idempotency_key is None:
+        return store_share(request)
+    
+    # Keys are scoped to the client (salted address hash) and bound to a hash
+    # of the whole payload, so neither another client's request nor a
+    # different upload under the same key is ever replayed
+    idempotency_key = f"{client_key(http_request.scope, TRUST_FORWARDED)}:{idempotency_key}"
+    fingerprint = hashlib.sha256(
+        request.iv.encode("utf-8") + b"\0" + request.encrypted_data.encode("utf-8")).hexdigest()
+    try:
+        replay = share_idempotency.begin(idempotency_key, fingerprint)
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status, detail=e.message, headers=dict(e.headers) or None)
+    if replay is not None:
+        status, result = replay
+        workload.note(replayed=True)
+        if status != 200:
+            raise HTTPException(status_code=status, detail=result, headers={REPLAYED_HEADER: "true"})
+        response.headers[REPLAYED_HEADER] = "true"
+        return result
+    
+    try:
+        result = store_share(request)
+    except HTTPException as e:
+        share_idempotency.finish(idempotency_key, e.status_code, (e.status_code, e.detail))
+        raise
+    except BaseException:
+        share_idempotency.abandon(idempotency_key)
+        raise
+    share_idempotency.finish(idempotency_key, 200, (200, result))
+    return result
+
+def store_share(request: ShareRequest) -> ShareResponse:
     share_id = str(uuid.uuid4())
     now = time.time()
-    expires_at = now + (24 * 60 * 60) # 24 hours
+    expires_at = now + SHARE_TTL_SECONDS
     
-    shared_links[share_id] = {
-        "encrypted_data": request.encrypted_data,
-        "iv": request.iv,
-        "created_at": now,
-        "expires_at": expires_at
-    }
-    
-    # Cleanup expired links (lazy cleanup)
-    expired_ids = [sid for sid, data in shared_links.items() if data["expires_at"] < now]
-    for sid in expired_ids:
-        del shared_links[sid]
+    try:
+        shared_links.set(share_id, {
+            "encrypted_data": request.encrypted_data,
+            "iv": request.iv,
+            "created_at": now,
+            "expires_at": expires_at
+        })
+    except MemoryStoreFull:
+        raise HTTPException(status_code=413, detail="Shared data is too large")
         
     return ShareResponse(share_id=share_id, expires_at=str(expires_at))
 
 @app.get("/share/{share_id}")
 async def get_share_link(share_id: str):
     """Retrieve an encrypted blob by ID."""
-    if share_id not in shared_links:
+    data = shared_links.get(share_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Link not found or expired")
     
-    data = shared_links[share_id]
-    
     # Check expiry
     if data["expires_at"] < time.time():
-        del shared_links[share_id]
+        shared_links.pop(share_id)
         raise HTTPException(status_code=410, detail="Link has expired")
         
     return data
 
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+# Sampling profiler (disabled unless PROFILER_TOKEN is set)
+_profile_lock = asyncio.Lock()
+
+
+@app.get("/admin/profile")
+async def profile(
+    seconds: float = Query(default=10, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(default=5, ge=1, le=100),
+    top: int = Query(default=30, ge=1, le=200),
+    format: str = Query(default="collapsed", pattern="^(collapsed|json)$"),
+    include_idle: bool = False,
+    authorization: Optional[str] = Header(default=None),
+):
+    """
+    Sample every thread's stack for `seconds` and return collapsed stacks
+    (feed to flamegraph.pl or speedscope) or, with format=json, a top-N
+    table as well. Only code locations are captured, never request data.
+    """
+    if not PROFILER_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), PROFILER_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid profiler token")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval_ms / 1000, include_idle)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+
+    if format == "json":
+        return profiler.report(top)
+    return PlainTextResponse(profiler.collapsed() + "\n")
@@ -0,0 +1,133 @@
+"""
+Say It Better - On-demand statistical sampling profiler
+
+A background thread wakes every interval, reads every thread's current
+Python stack via sys._current_frames() and counts identical stacks. That
+covers the event loop thread and the CPU offload threads (executor.py);
+CPU_EXECUTOR=process workers are separate processes and are not sampled.
+
+Only code locations are recorded (function name, file, first line), never
+frame locals or arguments, so request payloads cannot leak into a
+profile. Overhead is one stack walk per thread per interval, and nothing
+runs while no profile is being taken.
+
+Output:
+- collapsed stacks ("outer;inner;leaf count" lines), the input format of
+  flamegraph.pl, speedscope and inferno
+- a top-N table of functions by self and total (inclusive) samples
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Leaf frames of threads that are blocked waiting for work, not running
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+def _frame_label(code, labels: dict) -> tuple:
+    """(label, idle key) for a code object, cached per code object."""
+    cached = labels.get(code)
+    if cached is None:
+        directory, filename = os.path.split(code.co_filename)
+        short = f"{os.path.basename(directory)}/{filename}" if directory else filename
+        name = getattr(code, "co_qualname", code.co_name)
+        # ';' separates frames in the collapsed format
+        label = f"{name} ({short}:{code.co_firstlineno})".replace(";", ":")
+        cached = labels[code] = (label, (filename, code.co_name))
+    return cached
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks for a fixed time, one profile at a time."""
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self.ticks = 0
+        self.threads = set()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code, self._labels))
+                    frame = frame.f_back
+                if not stack or (not self.include_idle and stack[0][1] in _IDLE_LEAVES):
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                thread_name = names.get(thread_id, str(thread_id))
+                self.threads.add(thread_name)
+                self.stacks[(thread_name,) + tuple(label for label, _ in reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        """Flamegraph-compatible collapsed stacks, thread name as the root frame."""
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+        )
+
+    def top(self, n: int = 30) -> list:
+        """Functions by self samples, with their inclusive (total) samples."""
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack[1:]
+            self_counts[frames[-1]] += count
+            # Recursion must not count a frame twice for one sample
+            for frame in set(frames):
+                total_counts[frame] += count
+        samples = self.samples or 1
+        return [
+            {
+                "function": frame,
+                "self": count,
+                "self_pct": round(100 * count / samples, 1),
+                "total": total_counts[frame],
+                "total_pct": round(100 * total_counts[frame] / samples, 1),
+            }
+            for frame, count in self_counts.most_common(n)
+        ]
+
+    def report(self, top: int = 30) -> dict:
+        return {
+            "seconds": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "threads": sorted(self.threads),
+            "top": self.top(top),
+            "collapsed": self.collapsed(),
+        }
@@ -0,0 +1,16 @@
+"""
+Say It Better - Response classes
+
+FastJSONResponse renders through the shared serialization module
+(api/_lib/serialization.py): orjson or msgspec when installed, the stdlib
+json module otherwise. It is the app's default response class.
+"""
+
+from fastapi.responses import JSONResponse
+
+from _lib.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,94 @@
+"""
+Say It Better - Production server entry point
+
+    cd backend && python -m app.server
+
+Settings (environment):
+- HOST, PORT (0.0.0.0, 8000)
+- WEB_CONCURRENCY: worker processes (default 1). See the note below.
+- SERVER_LOOP: auto | uvloop | asyncio. auto picks uvloop when installed.
+- SERVER_HTTP: auto | httptools | h11. auto picks httptools when installed.
+- GRACEFUL_SHUTDOWN_SECONDS (30): on SIGTERM/SIGINT the server stops
+  accepting connections and lets in-flight requests finish for up to this
+  long. The app's shutdown hooks then close the upstream connection pool
+  and the CPU executor.
+- KEEP_ALIVE_SECONDS (5): idle client keep-alive. Set it above the load
+  balancer's idle timeout when running behind one.
+- SERVER_BACKLOG (2048)
+
+The app is imported once in this process before any worker starts, so a
+broken module or bad setting (such as MODEL_EXPERIMENT) fails here, once,
+with a readable error, instead of in every worker. Missing credentials are
+only reported: the affected endpoints fail when called (see
+config_problems() in main.py).
+
+Workers are separate processes, and each one has its own in-memory state:
+share links, tone variants, idempotency keys and caches. A /share link
+created on one worker is not found on another. Run several workers only
+behind sticky sessions, or when those features are not in use.
+benchmarks/server_scaling.py measures throughput per worker count.
+"""
+
+import importlib.util
+import os
+import sys
+
+import uvicorn
+from dotenv import load_dotenv
+
+LOOPS = {"auto", "uvloop", "asyncio"}
+HTTP_IMPLEMENTATIONS = {"auto", "httptools", "h11"}
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve(choice: str, fast: str, fallback: str, allowed: set, setting: str) -> str:
+    """Concrete implementation for an auto/explicit setting; exits if unusable."""
+    if choice not in allowed:
+        sys.exit(f"{setting} must be one of: {', '.join(sorted(allowed))}")
+    if choice == "auto":
+        return fast if _installed(fast) else fallback
+    if choice == fast and not _installed(fast):
+        sys.exit(f"{setting}={fast} but {fast} is not installed (pip install {fast})")
+    return choice
+
+
+def preload_check() -> None:
+    """Import the app once, before workers start, and report config problems."""
+    from app.main import config_problems
+
+    for problem in config_problems():
+        print(f"WARNING: {problem}")
+
+
+def main() -> None:
+    # Server settings may come from .env, like the app's own
+    load_dotenv()
+    workers = int(os.getenv("WEB_CONCURRENCY") or 1)
+    if workers < 1:
+        sys.exit("WEB_CONCURRENCY must be at least 1")
+    loop = resolve(os.getenv("SERVER_LOOP") or "auto", "uvloop", "asyncio", LOOPS, "SERVER_LOOP")
+    http = resolve(os.getenv("SERVER_HTTP") or "auto", "httptools", "h11", HTTP_IMPLEMENTATIONS, "SERVER_HTTP")
+
+    preload_check()
+    if workers > 1:
+        print(f"WARNING: {workers} workers do not share share links, tone variants or caches (see app/server.py)")
+    print(f"Starting {workers} worker(s), loop={loop}, http={http}")
+
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST") or "0.0.0.0",
+        port=int(os.getenv("PORT") or 8000),
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS") or 30),
+        timeout_keep_alive=int(os.getenv("KEEP_ALIVE_SECONDS") or 5),
+        backlog=int(os.getenv("SERVER_BACKLOG") or 2048),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Say It Better - Theme similarity scoring
+
+Pure functions with no app state, so they can run on the event loop, in a
+worker thread, or in a worker process (see app.executor).
+"""
+
+from typing import List
+
+# Themes scoring above this are reported as recurring
+RECURRENCE_THRESHOLD = 0.7
+
+
+def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
+    """Calculate cosine similarity between two vectors."""
+    dot_product = sum(a * b for a, b in zip(vec1, vec2))
+    magnitude1 = sum(a * a for a in vec1) ** 0.5
+    magnitude2 = sum(b * b for b in vec2) ** 0.5
+    if magnitude1 == 0 or magnitude2 == 0:
+        return 0.0
+    return dot_product / (magnitude1 * magnitude2)
+
+
+def find_recurring_themes(
+    current_themes: List[str],
+    past_themes: List[str],
+    current_embeddings: List[List[float]],
+    past_embeddings: List[List[float]],
+) -> tuple:
+    """
+    Match each current theme to its most similar past theme.
+
+    Returns (recurring_themes, similarity_scores) in the /analyze-themes
+    response shape.
+    """
+    recurring_themes = []
+    similarity_scores = {}
+    
+    for i, current_theme in enumerate(current_themes):
+        max_similarity = 0.0
+        most_similar_past = None
+        
+        for j, past_theme in enumerate(past_themes):
+            similarity = cosine_similarity(current_embeddings[i], past_embeddings[j])
+            if similarity > max_similarity:
+                max_similarity = similarity
+                most_similar_past = past_theme
+        
+        similarity_scores[current_theme] = {
+            "most_similar": most_similar_past,
+            "score": round(max_similarity, 3)
+        }
+        
+        if max_similarity > RECURRENCE_THRESHOLD:
+            recurring_themes.append(current_theme)
+    
+    return recurring_themes, similarity_scores
+
+
+def similarity_cost(current_count: int, past_count: int, dimensions: int) -> int:
+    """Rough number of multiply-adds find_recurring_themes will perform."""
+    return current_count * past_count * dimensions * 3
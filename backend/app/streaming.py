@@ -0,0 +1,71 @@
+"""
+Say It Better - Streamed completion helpers
+
+The pipelined /translate-with-themes endpoint streams the model's JSON reply
+(OpenAI-style server-sent events) and starts embedding each theme label as
+soon as it has been written, long before the whole reply is complete.
+"""
+
+import json
+import re
+from typing import Iterable, List, Optional
+
+# A complete "theme": "..." pair; the closing quote means the label is final
+_THEME_VALUE = re.compile(r'"theme"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def sse_content(line: str) -> Optional[str]:
+    """
+    The content delta carried by one server-sent event line, or None for
+    keep-alives, other fields and the final [DONE] marker.
+    """
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return None
+    try:
+        event = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    choices = event.get("choices") or ()
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
+
+
+class ThemeScanner:
+    """
+    Finds theme labels in a partially generated JSON reply. feed() takes
+    each new piece of text and returns the labels completed by it.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._scanned = 0
+        self._seen = set()
+
+    def feed(self, delta: str) -> List[str]:
+        self.text += delta
+        found = []
+        # Re-scan from the last incomplete match, not the whole reply
+        for match in _THEME_VALUE.finditer(self.text, self._scanned):
+            self._scanned = match.end()
+            try:
+                theme = json.loads(f'"{match.group(1)}"').strip()
+            except json.JSONDecodeError:
+                continue
+            if theme and theme not in self._seen:
+                self._seen.add(theme)
+                found.append(theme)
+        return found
+
+
+def unique(texts: Iterable[str]) -> List[str]:
+    """Non-empty texts, first occurrence order."""
+    return list(dict.fromkeys(text for text in texts if text))
+
+
+def sse_event(event: str, data: bytes) -> bytes:
+    """Frame one server-sent event whose data is a JSON document."""
+    return b"event: " + event.encode("ascii") + b"\ndata: " + data + b"\n\n"
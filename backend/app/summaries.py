@@ -0,0 +1,134 @@
+"""
+Say It Better - Map-reduce session summaries
+
+Many past entry summaries are too much for one prompt, so /summarize-session
+works as a tree. Entries are cut into fixed-size batches that are
+summarized concurrently (map), then the partial summaries are combined
+FAN_IN at a time, level by level, until one is left (reduce).
+
+Every node is cached by a hash of its level and inputs. Batches are cut by
+position, so appending an entry only changes the last batch and the nodes
+above it. Those are recomputed, and every other branch is served from the
+cache.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable, List
+
+SUMMARY_STRUCTURE = """{
+    "summary": "A clear, calm summary of what was expressed across these entries",
+    "themes": [
+        {"theme": "Theme Name", "description": "Brief description"}
+    ],
+    "share_ready": "A polished version suitable for sharing with a healthcare provider"
+}"""
+
+
+def batches(items: list, size: int) -> List[list]:
+    """Consecutive slices of at most size items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def node_key(level: int, inputs: list) -> str:
+    """Content hash of a tree node: the same inputs at the same level give the same key."""
+    encoded = json.dumps([level, inputs], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def build_map_prompt(entries: List[str]) -> str:
+    """Prompt for summarizing one batch of entry summaries."""
+    numbered = "\n".join(f"{i}. {entry}" for i, entry in enumerate(entries, 1))
+    return f"""Below are summaries of several separate entries one person wrote over time.
+Rewrite them into ONE combined summary, in clear, neutral language.
+Only restate what the entries say. Keep every distinct topic.
+
+Entries:
+\"\"\"
+{numbered}
+\"\"\"
+
+Respond ONLY with valid JSON matching this exact structure:
+{SUMMARY_STRUCTURE}
+
+JSON Response:"""
+
+
+def build_reduce_prompt(partials: List[dict]) -> str:
+    """Prompt for merging several partial summaries into one."""
+    parts = "\n\n".join(
+        f"Part {i}:\nSummary: {part['summary']}\nThemes: "
+        + ", ".join(theme["theme"] for theme in part["themes"])
+        for i, part in enumerate(partials, 1)
+    )
+    return f"""Below are summaries of consecutive groups of entries one person wrote over time.
+Merge them into ONE summary, in clear, neutral language. Merge themes that
+mean the same thing, and keep every distinct topic.
+
+{parts}
+
+Respond ONLY with valid JSON matching this exact structure:
+{SUMMARY_STRUCTURE}
+
+JSON Response:"""
+
+
+def valid_summary(parsed) -> bool:
+    return (
+        isinstance(parsed, dict)
+        and isinstance(parsed.get("summary"), str)
+        and isinstance(parsed.get("share_ready"), str)
+        and isinstance(parsed.get("themes"), list)
+        and all(isinstance(t, dict) and isinstance(t.get("theme"), str)
+                and isinstance(t.get("description"), str) for t in parsed["themes"])
+    )
+
+
+async def summarize_tree(
+    entries: List[str],
+    complete: Callable[[str], Awaitable[dict]],
+    cache,
+    batch_size: int,
+    fan_in: int,
+    max_parallel: int,
+) -> tuple:
+    """
+    Summarize entries with a map-reduce tree. complete(prompt) returns a
+    validated summary dict; cache is a MemoryStore of node results.
+
+    Returns (summary dict, stats) where stats counts computed and cached
+    nodes and the number of levels.
+    """
+    slots = asyncio.Semaphore(max_parallel)
+    stats = {"levels": 0, "computed": 0, "cached": 0}
+
+    async def node(level: int, inputs: list, prompt: str) -> dict:
+        key = node_key(level, inputs)
+        cached = cache.get(key)
+        if cached is not None:
+            stats["cached"] += 1
+            return cached
+        async with slots:
+            result = await complete(prompt)
+        stats["computed"] += 1
+        cache.set(key, result)
+        return result
+
+    level = 0
+    nodes = await asyncio.gather(*(
+        node(level, batch, build_map_prompt(batch)) for batch in batches(entries, batch_size)
+    ))
+    while len(nodes) > 1:
+        level += 1
+        # A trailing group of one is carried up as-is rather than "merged"
+        nodes = await asyncio.gather(*(
+            node(level, group, build_reduce_prompt(group)) if len(group) > 1 else _done(group[0])
+            for group in batches(list(nodes), fan_in)
+        ))
+    stats["levels"] = level + 1
+    return nodes[0], stats
+
+
+async def _done(value):
+    return value
@@ -0,0 +1,64 @@
+"""
+Say It Better - Draft/final translation tiers
+
+In draft mode /translate asks a small, fast model and the configured main
+model at the same time and streams both results as server-sent events: the
+draft first, then the final translation that supersedes it. Latency per
+tier (and how long the draft was on screen before the final arrived) is
+kept here, so we can tell when issuing a draft is worth its extra call.
+"""
+
+from collections import deque
+from typing import Dict
+
+# Recent latencies kept per tier for the percentiles
+_WINDOW = 500
+
+DRAFT = "draft"
+FINAL = "final"
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+class TierStats:
+    def __init__(self):
+        self._latencies: Dict[str, deque] = {DRAFT: deque(maxlen=_WINDOW), FINAL: deque(maxlen=_WINDOW)}
+        self._lead = deque(maxlen=_WINDOW)
+        self._counts = {"requests": 0, "drafts_sent": 0, "drafts_skipped": 0, "draft_failures": 0, "final_failures": 0}
+
+    def record_request(self) -> None:
+        self._counts["requests"] += 1
+
+    def record_latency(self, tier: str, latency_ms: float) -> None:
+        self._latencies[tier].append(latency_ms)
+
+    def record_draft(self, sent: bool) -> None:
+        """sent=False: the final result arrived first, so no draft was shown."""
+        self._counts["drafts_sent" if sent else "drafts_skipped"] += 1
+
+    def record_failure(self, tier: str) -> None:
+        self._counts[f"{tier}_failures"] += 1
+
+    def record_lead(self, lead_ms: float) -> None:
+        """How long the draft was shown before the final result replaced it."""
+        self._lead.append(lead_ms)
+
+    def snapshot(self) -> dict:
+        tiers = {
+            tier: {
+                "samples": len(values),
+                "p50_ms": _percentile(values, 0.5),
+                "p95_ms": _percentile(values, 0.95),
+            }
+            for tier, values in self._latencies.items()
+        }
+        return {
+            **self._counts,
+            "tiers": tiers,
+            "draft_lead_p50_ms": _percentile(self._lead, 0.5),
+        }
@@ -0,0 +1,87 @@
+"""
+Say It Better - Tone instructions and multi-tone generation helpers
+
+In multi-tone mode one structured generation returns the summary and
+share-ready text for every tone, sharing a single themes list, so switching
+tone afterwards needs no new upstream call.
+"""
+
+from typing import Dict
+
+TONES = ("neutral", "personal", "clinical")
+
+
+def get_tone_instruction(tone: str) -> str:
+    """Return additional instructions based on desired tone."""
+    if tone == "personal":
+        return "\nUse first-person language and a warmer, more personal tone while remaining clear."
+    elif tone == "clinical":
+        return "\nUse precise, clinical language suitable for medical contexts."
+    return "\nMaintain a balanced, neutral tone."
+
+
+def build_multi_tone_prompt(raw_text: str) -> str:
+    """Build a prompt asking for every tone variant in one JSON reply."""
+    tone_lines = "\n".join(f"- {tone}:{get_tone_instruction(tone)}" for tone in TONES)
+    variant_lines = ",\n".join(
+        f'        "{tone}": {{"summary": "A clear, calm 2-4 sentence summary", '
+        f'"share_ready": "A polished version suitable for sharing"}}'
+        for tone in TONES
+    )
+    return f"""Please rewrite the following text into clear, neutral language, once for each tone below.
+{tone_lines}
+
+Original text:
+\"\"\"{raw_text}\"\"\"
+
+The themes are shared by all tones. Respond ONLY with valid JSON matching this exact structure:
+{{
+    "themes": [
+        {{"theme": "Theme Name", "description": "Brief description"}},
+        {{"theme": "Theme Name", "description": "Brief description"}}
+    ],
+    "variants": {{
+{variant_lines}
+    }}
+}}
+
+JSON Response:"""
+
+
+def validate_multi_tone(parsed: dict) -> bool:
+    """True when the reply has well-formed themes and a complete variant for every tone."""
+    themes = parsed.get("themes")
+    variants = parsed.get("variants")
+    if not isinstance(themes, list) or not isinstance(variants, dict):
+        return False
+    if not all(isinstance(t, dict) and isinstance(t.get("theme"), str)
+               and isinstance(t.get("description"), str) for t in themes):
+        return False
+    return all(
+        isinstance(variants.get(tone), dict)
+        and isinstance(variants[tone].get("summary"), str)
+        and isinstance(variants[tone].get("share_ready"), str)
+        for tone in TONES
+    )
+
+
+def variant_metrics(variants: Dict[str, dict], usage: dict, latency_ms: float) -> Dict[str, dict]:
+    """
+    Apportion one generation's latency and token cost across tone variants.
+
+    Completion tokens and generation time are split by each variant's share
+    of the output text; prompt tokens are split evenly. These are estimates:
+    the upstream only reports totals for the whole call.
+    """
+    sizes = {tone: len(v["summary"]) + len(v["share_ready"]) for tone, v in variants.items()}
+    total = sum(sizes.values()) or 1
+    completion = usage.get("completion_tokens", 0)
+    prompt = usage.get("prompt_tokens", 0)
+    return {
+        tone: {
+            "latency_ms": round(latency_ms * size / total, 1),
+            "completion_tokens": round(completion * size / total),
+            "prompt_tokens": round(prompt / len(variants)),
+        }
+        for tone, size in sizes.items()
+    }
@@ -0,0 +1,48 @@
+"""
+Say It Better - Workload capture for the backend
+
+Applies the shape-only recorder in _lib/workload.py to the backend's
+routes: status, sizes and total time are taken here, and handlers add
+their own shape fields with workload.note().
+"""
+
+from _lib.workload import WorkloadRecorder
+
+
+class WorkloadCaptureMiddleware:
+    """Pure ASGI middleware capturing the requests to some paths."""
+
+    def __init__(self, app, recorder: WorkloadRecorder, endpoints: dict):
+        self.app = app
+        self.recorder = recorder
+        # path -> endpoint name
+        self.endpoints = endpoints
+
+    async def __call__(self, scope, receive, send):
+        endpoint = self.endpoints.get(scope.get("path")) if scope["type"] == "http" else None
+        if endpoint is None or scope["method"] == "OPTIONS" or not self.recorder.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope.get("headers") or []).get(b"content-length", b"")
+        capture, token = self.recorder.start(
+            endpoint, scope["method"], int(length) if length.isdigit() else None)
+        if capture is None:
+            await self.app(scope, receive, send)
+            return
+
+        sent = 0
+
+        async def counting_send(message):
+            nonlocal sent
+            if message["type"] == "http.response.start":
+                capture.fields["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            capture.fields["bytes_out"] = sent
+            self.recorder.finish(capture, token)
@@ -0,0 +1,27 @@
+"""
+Shared setup for benchmarks that exercise the FastAPI backend in-process.
+
+Importing this module puts backend/ on sys.path and fills in a placeholder
+Groq key, so translation calls reach the mocks. Upstream calls are never
+made: benchmarks replace them with local mocks.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+for name, value in {
+    "GROQ_API_KEY": "benchmark",
+    "KEEP_WARM": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,58 @@
+"""
+Mock Groq chat-completions upstream for backend benchmarks.
+
+Latency follows a simple generation model: a fixed time-to-first-token plus
+a per-output-token cost, with output length proportional to the input (the
+model rewrites what it is given), capped at the request's max_tokens.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+TIME_TO_FIRST_TOKEN = 0.15   # seconds
+SECONDS_PER_TOKEN = 0.002    # ~500 tokens/s
+CHARS_PER_TOKEN = 4
+
+
+def fake_translation(prompt: str) -> dict:
+    words = prompt.split()
+    if '"variants"' in prompt:
+        return {
+            "themes": [{"theme": "Work Stress", "description": "Pressure related to work"}],
+            "variants": {
+                tone: {"summary": f"A {tone} summary of {len(words)} words.",
+                       "share_ready": f"A {tone} rewrite suitable for sharing."}
+                for tone in ("neutral", "personal", "clinical")
+            },
+        }
+    return {
+        "summary": f"The writer describes {len(words)} words of experience.",
+        "themes": [
+            {"theme": "Work Stress", "description": "Pressure related to work"},
+            {"theme": f"Theme {len(words) % 5}", "description": "Recurring topic"},
+        ],
+        "share_ready": "A calm, shareable rewrite of the text.",
+    }
+
+
+def install(main, stats=None):
+    """Point the app's shared upstream client at the mock; returns stats dict."""
+    stats = stats if stats is not None else {"calls": 0, "output_tokens": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        prompt = body["messages"][-1]["content"]
+        output_tokens = min(body.get("max_tokens", 1000), len(prompt) // CHARS_PER_TOKEN)
+        stats["calls"] += 1
+        stats["output_tokens"] += output_tokens
+        await asyncio.sleep(TIME_TO_FIRST_TOKEN + output_tokens * SECONDS_PER_TOKEN)
+        content = json.dumps(fake_translation(prompt))
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // CHARS_PER_TOKEN, "completion_tokens": output_tokens},
+        })
+
+    main._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return stats
@@ -0,0 +1,138 @@
+"""
+Say It Better - Cloud sync storage backend benchmark
+
+Saves and reads back encrypted-sized records through each api/_lib/storage.py
+backend (and Redis, when REDIS_HOST/REDIS_PASSWORD are set) and reports
+throughput, the Python heap each backend holds after the saves, and the
+extra heap used while serving GETs. GET responses are streamed into a
+byte-counting sink, as send_user_record() does for a real socket.
+
+Usage:
+    python benchmarks/cloud_storage.py [--users 50] [--blob-kb 512] [--reads 500]
+"""
+
+import argparse
+import base64
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+sys.path.insert(0, API_DIR)
+
+from _lib.storage import AppendLogStorage, MemoryStorage, SQLiteStorage, send_user_record  # noqa: E402
+
+TTL = 90 * 24 * 60 * 60
+
+
+class CountingSink:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+
+class FakeHandler:
+    """Just enough of BaseHTTPRequestHandler for send_user_record()."""
+
+    def __init__(self):
+        self.wfile = CountingSink()
+
+    def send_response(self, status):
+        pass
+
+    def send_header(self, key, value):
+        pass
+
+    def end_headers(self):
+        pass
+
+
+def make_record(blob_kb, version):
+    encrypted = base64.b64encode(os.urandom(blob_kb * 1024 * 3 // 4)).decode("ascii")
+    return {
+        "encryptedData": {"encrypted": encrypted, "salt": "c2FsdA==", "iv": "aXY=", "algorithm": "AES-GCM"},
+        "entryCount": 100,
+        "checksum": f"checksum-{version}",
+        "version": version,
+        "lastModified": "2026-01-01T00:00:00",
+        "updatedAt": "2026-01-01T00:00:00",
+    }
+
+
+def redis_backend():
+    if not (os.environ.get("REDIS_HOST") and os.environ.get("REDIS_PASSWORD")):
+        return None
+    spec = importlib.util.spec_from_file_location("cloud", os.path.join(API_DIR, "cloud.py"))
+    cloud = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(cloud)
+    return cloud.RedisStorage()
+
+
+def run(backend, args, records):
+    user_ids = [f"user_benchmark_{i:08d}" for i in range(args.users)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i, user_id in enumerate(user_ids):
+        backend.save(user_id, records[i % len(records)])
+    save_seconds = time.perf_counter() - started
+    held, _ = tracemalloc.get_traced_memory()
+
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    handler = FakeHandler()
+    started = time.perf_counter()
+    for i in range(args.reads):
+        send_user_record(handler, backend.get(user_ids[i % len(user_ids)]))
+    read_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "saves_per_s": args.users / save_seconds,
+        "gets_per_s": args.reads / read_seconds,
+        "read_mb_per_s": handler.wfile.bytes / read_seconds / 1e6,
+        "get_heap_peak_kb": (peak - baseline) / 1024,
+        "held_heap_mb": held / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--blob-kb", type=int, default=512)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    records = [make_record(args.blob_kb, version) for version in range(4)]
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory", MemoryStorage(max_bytes=4 * 1024 ** 3, ttl=TTL)),
+            ("sqlite", SQLiteStorage(os.path.join(tmp, "cloud.db"), TTL)),
+            ("applog (fsync)", AppendLogStorage(os.path.join(tmp, "cloud.log"), TTL, fsync=True)),
+            ("applog", AppendLogStorage(os.path.join(tmp, "nosync.log"), TTL, fsync=False)),
+        ]
+        redis = redis_backend()
+        if redis is not None:
+            backends.append(("redis", redis))
+        else:
+            print("redis: REDIS_HOST/REDIS_PASSWORD not set, skipped")
+
+        print(f"{args.users} users x {args.blob_kb}KB blobs, {args.reads} GETs\n")
+        print(f"{'backend':<16}{'saves/s':>10}{'gets/s':>10}{'read MB/s':>11}"
+              f"{'heap held MB':>14}{'GET heap peak KB':>18}")
+        for name, backend in backends:
+            result = run(backend, args, records)
+            print(f"{name:<16}{result['saves_per_s']:>10.0f}{result['gets_per_s']:>10.0f}"
+                  f"{result['read_mb_per_s']:>11.0f}{result['held_heap_mb']:>14.1f}"
+                  f"{result['get_heap_peak_kb']:>18.0f}")
+            backend.close()
+
+
+if __name__ == "__main__":
+    main()
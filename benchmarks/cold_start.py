@@ -0,0 +1,75 @@
+"""
+Say It Better - Serverless cold start benchmark
+
+Imports each api/*.py handler in a fresh interpreter, as Vercel does on a
+cold start, and reports p50/p99 import latency against a budget.
+
+Usage:
+    python benchmarks/cold_start.py [--runs 20] [--budget-ms 250]
+
+Exits non-zero when any handler's p99 exceeds the budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+HANDLERS = ["translate", "translate-with-themes", "analyze-themes", "embeddings", "cloud", "disclaimer", "index"]
+
+_PROBE = """
+import importlib.util, json, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler_under_test", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+wall_ms = (time.perf_counter() - started) * 1000
+from _lib import coldstart
+print(json.dumps({"wall_ms": wall_ms, "report": coldstart.startup_report()}))
+"""
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(name, runs):
+    path = os.path.abspath(os.path.join(API_DIR, f"{name}.py"))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE, path],
+            capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1])["wall_ms"])
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("COLD_START_BUDGET_MS", "250")))
+    args = parser.parse_args()
+
+    print(f"{'handler':<16}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    over_budget = []
+    for name in HANDLERS:
+        samples = measure(name, args.runs)
+        p50, p99 = statistics.median(samples), percentile(samples, 99)
+        print(f"{name:<16}{p50:>10.2f}{p99:>10.2f}{max(samples):>10.2f}")
+        if p99 > args.budget_ms:
+            over_budget.append(name)
+
+    if over_budget:
+        print(f"\nOver the {args.budget_ms:.0f} ms cold start budget: {', '.join(over_budget)}")
+        sys.exit(1)
+    print(f"\nAll handlers within the {args.budget_ms:.0f} ms cold start budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Say It Better - Event loop lag under mixed load
+
+Runs /analyze-themes requests for users with large theme histories alongside
+a steady stream of lightweight requests (mock upstream), once with all CPU
+work inline on the event loop and once with the app.executor offload, and
+reports how late the loop wakes up and how long the light requests take.
+
+Usage:
+    python benchmarks/event_loop_lag.py [--past 300] [--dims 384] [--heavy 6]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import _backend  # noqa: F401  (sets up sys.path and env)
+from _backend import percentile
+
+from app import executor
+from app import main
+
+
+def fake_vectors(count, dims):
+    return [[random.uniform(-1, 1) for _ in range(dims)] for _ in range(count)]
+
+
+async def lag_probe(samples, stop, interval=0.005):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def light_request(latencies):
+    started = time.perf_counter()
+    await asyncio.sleep(0.02)  # mock upstream round trip
+    latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run_scenario(args, offload):
+    executor.CPU_OFFLOAD_MIN_OPS = 200_000 if offload else float("inf")
+    vectors = fake_vectors(args.current + args.past, args.dims)
+
+    async def mock_embeddings(texts):
+        await asyncio.sleep(0.01)
+        return vectors[:len(texts)]
+
+    main.get_embeddings = mock_embeddings
+    request = main.ThemeSimilarityRequest(
+        current_themes=[f"current {i}" for i in range(args.current)],
+        past_themes=[f"past {i}" for i in range(args.past)],
+    )
+
+    lag, light = [], []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(lag_probe(lag, stop))
+    started = time.perf_counter()
+
+    async def light_stream():
+        while not stop.is_set():
+            asyncio.create_task(light_request(light))
+            await asyncio.sleep(0.01)
+
+    stream = asyncio.create_task(light_stream())
+    await asyncio.gather(*(main.analyze_theme_similarity(request) for _ in range(args.heavy)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(probe, stream)
+    await asyncio.sleep(0.05)
+    return lag, light, elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--current", type=int, default=8)
+    parser.add_argument("--past", type=int, default=300)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--heavy", type=int, default=6, help="concurrent heavy /analyze-themes requests")
+    args = parser.parse_args()
+
+    print(f"{args.heavy} x analyze({args.current} x {args.past} themes, {args.dims} dims) "
+          f"+ light requests every 10 ms; executor={executor.CPU_EXECUTOR} workers={executor.CPU_WORKERS}\n")
+    print(f"{'mode':<10}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}{'light p99':>12}{'total s':>10}")
+    for label, offload in (("inline", False), ("offload", True)):
+        lag, light, elapsed = asyncio.run(run_scenario(args, offload))
+        print(f"{label:<10}{percentile(lag, 50):>10.1f}{percentile(lag, 99):>10.1f}{max(lag):>10.1f}"
+              f"{percentile(light, 99):>12.1f}{elapsed:>10.2f}")
+    print("\n(lag and latency in ms)")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,65 @@
+"""
+Say It Better - Long-input translation: single call vs parallel chunks
+
+Translates inputs of increasing length through call_ai_model (one prompt)
+and translate_long_text (paragraph/sentence chunks in parallel) against the
+mock upstream in _mock_upstream.py, and reports end-to-end latency.
+
+Usage:
+    python benchmarks/long_input.py [--repeats 3]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import _backend  # noqa: F401  (sets up sys.path and env)
+import _mock_upstream
+
+from app import main
+
+PARAGRAPH = (
+    "I have been feeling tired all the time and work keeps piling up. "
+    "Every morning I dread opening my inbox. I try to keep up but it feels like too much. "
+    "My sleep has been bad and I keep thinking about deadlines at night. "
+)
+
+
+def make_text(chars: int) -> str:
+    paragraphs = []
+    while sum(len(p) + 2 for p in paragraphs) < chars:
+        paragraphs.append(PARAGRAPH.strip())
+    return "\n\n".join(paragraphs)[:chars]
+
+
+async def timed(coro_fn, text, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await coro_fn(text, "neutral")
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run(repeats):
+    _mock_upstream.install(main)
+    print(f"chunk={main.LONG_INPUT_CHUNK_CHARS} chars, parallel={main.LONG_INPUT_MAX_PARALLEL}\n")
+    print(f"{'input chars':>12}{'chunks':>8}{'single ms':>12}{'chunked ms':>12}{'speedup':>9}")
+    for chars in (500, 1500, 2500, 3500, 5000):
+        text = make_text(chars)
+        chunks = len(main.split_text(text, main.LONG_INPUT_CHUNK_CHARS))
+        single = await timed(main.call_ai_model, text, repeats)
+        chunked = await timed(main.translate_long_text, text, repeats)
+        print(f"{chars:>12}{chunks:>8}{single:>12.0f}{chunked:>12.0f}{single / chunked:>8.2f}x")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.repeats))
+
+
+if __name__ == "__main__":
+    main_cli()
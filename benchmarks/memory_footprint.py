@@ -0,0 +1,507 @@
+"""
+Say It Better - Memory footprint per request for large payloads, with a regression gate
+
+Sends one request at a time, in-process, through the large-payload paths and
+measures what each request costs in memory at payload sizes from 1KB to 10MB:
+- cloud upload / cloud download: the Vercel function api/cloud.py (memory
+  storage backend, so the stored record counts as retained)
+- share create / share get: POST /share and GET /share/{id} on the backend
+- embeddings (vercel) / embeddings (backend): the JSON response to
+  /api/embeddings and POST /embeddings, for a Hugging Face reply of that
+  size (the upstream is mocked; at least one 384-dimension vector, ~8KB)
+
+For each request it reports:
+- heap peak: Python heap allocated above the pre-request level at the peak
+  (tracemalloc). The request body is already in memory before it starts,
+  like a socket buffer, so the ratio counts copies the code makes.
+- peak/payload: heap peak divided by payload bytes, the number the gate checks
+- retained: heap still held after the request and a gc (store entries, caches)
+- RSS peak: resident set growth, sampled from a separate process so long
+  C calls (json.loads of 10MB) are not missed. Measured in a second pass
+  without tracemalloc. RSS includes allocator slack and is only reported.
+
+Vercel functions are driven through their BaseHTTPRequestHandler methods
+with an in-memory request; the backend through its ASGI app with the body
+delivered in 64KB messages, as uvicorn does. Responses go to a byte counter,
+as to a socket.
+
+Regression gate: the peak/payload ratios are compared with a baseline file.
+A case fails when its heap peak exceeds the baseline ratio x payload by more
+than the tolerance plus a fixed allowance (--slack-kb) for per-request
+overhead that does not scale with the payload, which dominates at 1KB.
+
+Usage:
+    python benchmarks/memory_footprint.py [--sizes 1KB,100KB,1MB,10MB] [--cases cloud,share]
+    python benchmarks/memory_footprint.py --check              # exit 1 on regression
+    python benchmarks/memory_footprint.py --update-baseline    # after an intended change
+"""
+
+import argparse
+import asyncio
+import base64
+import email.message
+import gc
+import importlib.util
+import io
+import json
+import os
+import random
+import select
+import statistics
+import subprocess
+import sys
+import tracemalloc
+import uuid
+
+import _backend  # noqa: F401  (puts backend/ on sys.path)
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+sys.path.insert(0, API_DIR)
+
+# The in-process memory backend, so retained memory includes the stored record
+os.environ.setdefault("CLOUD_STORAGE", "memory")
+os.environ.setdefault("CLOUD_MEMORY_STORE_MAX_BYTES", str(256 * 1024 * 1024))
+os.environ.setdefault("SHARE_STORE_MAX_BYTES", str(256 * 1024 * 1024))
+
+import httpx  # noqa: E402
+
+from _lib import serialization  # noqa: E402
+
+DEFAULT_SIZES = "1KB,10KB,100KB,1MB,10MB"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_baseline.json")
+# Room left in a cloud upload body for the JSON around the ciphertext
+CLOUD_ENVELOPE_BYTES = 1024
+EMBEDDING_DIMENSIONS = 384
+ASGI_CHUNK = 64 * 1024
+
+# Runs in a child process: polls the parent's RSS until stdin closes, then
+# prints the highest value seen. Being a separate process, it keeps sampling
+# while the parent holds the GIL.
+_RSS_SAMPLER = """
+import os, select, sys
+path = f"/proc/{sys.argv[1]}/statm"
+page = os.sysconf("SC_PAGE_SIZE")
+peak = 0
+print("ready", flush=True)
+while not select.select([sys.stdin], [], [], 0.0005)[0]:
+    with open(path) as f:
+        peak = max(peak, int(f.read().split()[1]) * page)
+print(peak, flush=True)
+"""
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for suffix, factor in (("MB", 1024 * 1024), ("KB", 1024), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def size_label(size):
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f}MB"
+    if size >= 1024:
+        return f"{size / 1024:.0f}KB"
+    return f"{size}B"
+
+
+def random_blob(size):
+    """Base64 text of `size` characters, like a client-side ciphertext."""
+    return base64.b64encode(os.urandom(size * 3 // 4 + 3)).decode("ascii")[:size]
+
+
+def hf_reply(size, rng):
+    """A Hugging Face feature-extraction reply of about `size` bytes."""
+    vector = json.dumps([rng.uniform(-0.2, 0.2) for _ in range(EMBEDDING_DIMENSIONS)])
+    count = max(1, size // (len(vector) + 1))
+    return ("[" + ",".join([vector] * count) + "]").encode("ascii"), count
+
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+class RssSampler:
+    """Peak RSS of this process while the block runs, or None off Linux."""
+
+    def __enter__(self):
+        self.peak = None
+        self.process = None
+        if current_rss() is None:
+            return self
+        self.process = subprocess.Popen([sys.executable, "-c", _RSS_SAMPLER, str(os.getpid())],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.process.stdout.readline()
+        return self
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            # One last reading, so a peak right at the end is not missed
+            select.select([], [], [], 0.002)
+            out, _ = self.process.communicate("")
+            self.peak = int(out.split()[-1])
+        return False
+
+
+class CountingSink:
+    """Response socket stand-in: counts bytes and keeps only the first few KB."""
+
+    def __init__(self, keep=64 * 1024):
+        self.bytes = 0
+        self.head = bytearray()
+        self.keep = keep
+
+    def write(self, data):
+        self.bytes += len(data)
+        if len(self.head) < self.keep:
+            self.head += data[:self.keep - len(self.head)]
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def load_function(name):
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), os.path.join(API_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def vercel_request(module, method, path, body=b"", headers=()):
+    """Serve one request with a function's handler class; returns (status, sink)."""
+    request = module.handler.__new__(module.handler)
+    request.rfile = io.BytesIO(body)
+    request.wfile = CountingSink()
+    request.command, request.path, request.request_version = method, path, "HTTP/1.1"
+    request.requestline = f"{method} {path} HTTP/1.1"
+    request.client_address = ("127.0.0.1", 0)
+    request.close_connection = True
+    request.log_message = lambda *args: None
+    request.headers = email.message.Message()
+    for key, value in (("Content-Type", "application/json"), ("Content-Length", str(len(body))), *headers):
+        request.headers[key] = value
+    getattr(request, f"do_{method}")()
+    return int(bytes(request.wfile.head[9:12])), request.wfile
+
+
+async def asgi_request(app, method, path, body=b"", headers=()):
+    """Serve one request through an ASGI app; returns (status, sink)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *((k.lower().encode(), v.encode()) for k, v in headers)],
+    }
+    offsets = iter(range(0, max(1, len(body)), ASGI_CHUNK))
+    finished = asyncio.Event()
+    sink = CountingSink()
+    status = []
+
+    async def receive():
+        offset = next(offsets, None)
+        if offset is None:
+            # The client stays connected until the response is complete
+            await finished.wait()
+            return {"type": "http.disconnect"}
+        chunk = body[offset:offset + ASGI_CHUNK]
+        return {"type": "http.request", "body": chunk, "more_body": offset + ASGI_CHUNK < len(body)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body":
+            sink.write(message.get("body", b""))
+            if not message.get("more_body"):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return status[0], sink
+
+
+class Case:
+    """One request type: prepare() builds its input, run() serves it, cleanup() undoes it."""
+
+    def __init__(self, name, prepare, run, cleanup=None, limit=None):
+        self.name = name
+        self.prepare = prepare
+        self.run = run
+        self.cleanup = cleanup or (lambda state: None)
+        self.limit = limit
+
+
+def vercel_cases(rng):
+    cloud = load_function("cloud")
+    embeddings = load_function("embeddings")
+    limit = cloud.MAX_BODY_BYTES - CLOUD_ENVELOPE_BYTES
+
+    def upload_body(user_id, size):
+        return json.dumps({
+            "userId": user_id,
+            "encryptedData": {"encrypted": random_blob(size), "salt": random_blob(24),
+                              "iv": random_blob(16), "algorithm": "AES-GCM"},
+            "entryCount": max(1, size // 2048),
+            "checksum": uuid.uuid4().hex,
+            "version": 1,
+        }).encode("utf-8")
+
+    def prepare_upload(size):
+        user_id = f"user_{uuid.uuid4().hex}"
+        return {"user_id": user_id, "body": upload_body(user_id, size), "payload": size}
+
+    def run_upload(state):
+        return vercel_request(cloud, "POST", "/api/cloud", state["body"])
+
+    def prepare_download(size):
+        state = prepare_upload(size)
+        status, _ = run_upload(state)
+        assert status == 200, status
+        state["body"] = b""
+        return state
+
+    def run_download(state):
+        return vercel_request(cloud, "GET", f"/api/cloud?userId={state['user_id']}")
+
+    def delete_user(state):
+        cloud.get_storage().delete(state["user_id"])
+
+    reply = {}
+
+    def prepare_embeddings(size):
+        reply["body"], count = hf_reply(size, rng)
+        texts = [f"theme {i}" for i in range(count)]
+        return {"body": json.dumps({"texts": texts}).encode("utf-8"), "payload": len(reply["body"])}
+
+    def run_embeddings(state):
+        return vercel_request(embeddings, "POST", "/api/embeddings", state["body"])
+
+    # Hugging Face is not called: fetch_embeddings returns the prepared reply
+    embeddings.fetch_embeddings = lambda payload, deadline, handler: reply["body"]
+    return [
+        Case("cloud upload", prepare_upload, run_upload, delete_user, limit),
+        Case("cloud download", prepare_download, run_download, delete_user, limit),
+        Case("embeddings (vercel)", prepare_embeddings, run_embeddings),
+    ]
+
+
+def backend_cases(rng, loop):
+    from app import main
+
+    reply = {}
+
+    async def hugging_face(request):
+        return httpx.Response(200, content=reply["body"], headers={"Content-Type": "application/json"})
+
+    main._http_client = httpx.AsyncClient(transport=httpx.MockTransport(hugging_face))
+
+    def call(method, path, body=b""):
+        return loop.run_until_complete(asgi_request(main.app, method, path, body))
+
+    def prepare_share(size):
+        body = json.dumps({"encrypted_data": random_blob(size), "iv": random_blob(16)}).encode("utf-8")
+        return {"body": body, "payload": size}
+
+    def run_share(state):
+        status, sink = call("POST", "/share", state["body"])
+        if status == 200:
+            state["share_id"] = json.loads(bytes(sink.head))["share_id"]
+        return status, sink
+
+    def prepare_share_get(size):
+        state = prepare_share(size)
+        status, _ = run_share(state)
+        assert status == 200, status
+        state["body"] = b""
+        return state
+
+    def run_share_get(state):
+        return call("GET", f"/share/{state['share_id']}")
+
+    def drop_share(state):
+        if "share_id" in state:
+            main.shared_links.pop(state["share_id"])
+
+    def prepare_embeddings(size):
+        reply["body"], count = hf_reply(size, rng)
+        texts = [f"theme {i}" for i in range(count)]
+        return {"body": json.dumps({"texts": texts}).encode("utf-8"), "payload": len(reply["body"])}
+
+    def run_embeddings(state):
+        return call("POST", "/embeddings", state["body"])
+
+    return [
+        Case("share create", prepare_share, run_share, drop_share),
+        Case("share get", prepare_share_get, run_share_get, drop_share),
+        Case("embeddings (backend)", prepare_embeddings, run_embeddings),
+    ]
+
+
+def measure_heap(case, size):
+    """(payload bytes, heap peak, retained heap) for one request."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        state = case.prepare(size)
+        gc.collect()
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        status, sink = case.run(state)
+        _, peak = tracemalloc.get_traced_memory()
+        if status != 200:
+            raise RuntimeError(f"{case.name} at {size_label(size)}: HTTP {status}: {bytes(sink.head[:300])!r}")
+        del sink
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+        retained -= base
+    finally:
+        tracemalloc.stop()
+    case.cleanup(state)
+    return state["payload"], peak - base, retained
+
+
+def measure_rss(case, size):
+    """RSS growth above the pre-request level, without tracemalloc running."""
+    state = case.prepare(size)
+    gc.collect()
+    before = current_rss()
+    with RssSampler() as sampler:
+        case.run(state)
+    case.cleanup(state)
+    if sampler.peak is None or before is None:
+        return None
+    return max(0, sampler.peak - before)
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def environment():
+    """What the heap numbers depend on besides the code: Python and the JSON backend."""
+    backend = serialization.BACKEND
+    module = sys.modules.get(backend)
+    version = getattr(module, "__version__", None)
+    return {
+        "python": f"{sys.version_info.major}.{sys.version_info.minor}",
+        "json_backend": f"{backend} {version}" if version else backend,
+    }
+
+
+def write_baseline(path, results, tolerance, slack_kb):
+    baseline = {
+        **environment(),
+        "tolerance": tolerance,
+        "slack_kb": slack_kb,
+        "ratios": {name: {str(size): round(row["ratio"], 3) for size, row in rows.items()}
+                   for name, rows in results.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def regressions(results, baseline, tolerance, slack_kb):
+    """Cases whose heap peak grew past the baseline ratio's allowance."""
+    failures = []
+    for name, rows in results.items():
+        for size, row in rows.items():
+            expected = baseline["ratios"].get(name, {}).get(str(size))
+            if expected is None:
+                continue
+            allowed = expected * (1 + tolerance) * row["payload"] + slack_kb * 1024
+            if row["peak"] > allowed:
+                failures.append(f"{name} at {size_label(size)}: peak/payload {row['ratio']:.2f}, "
+                                f"baseline {expected:.2f} (peak {row['peak'] / 1024:.0f}KB > "
+                                f"allowed {allowed / 1024:.0f}KB)")
+    return failures
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated payload sizes")
+    parser.add_argument("--cases", default="", help="only cases whose name contains one of these (comma-separated)")
+    parser.add_argument("--repeat", type=int, default=3, help="requests per case and size; the median is kept")
+    parser.add_argument("--no-rss", action="store_true", help="skip the RSS pass")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=None, help="allowed ratio growth (default: baseline's, else 0.15)")
+    parser.add_argument("--slack-kb", type=int, default=None, help="fixed per-request allowance (default: baseline's, else 256)")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any ratio regressed")
+    parser.add_argument("--update-baseline", action="store_true", help="write the measured ratios as the baseline")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    loop = asyncio.new_event_loop()
+    cases = vercel_cases(rng) + backend_cases(rng, loop)
+    if args.cases:
+        wanted = [word.strip().lower() for word in args.cases.split(",")]
+        cases = [case for case in cases if any(word in case.name for word in wanted)]
+
+    baseline = load_baseline(args.baseline)
+    tolerance = args.tolerance if args.tolerance is not None else (baseline or {}).get("tolerance", 0.15)
+    slack_kb = args.slack_kb if args.slack_kb is not None else (baseline or {}).get("slack_kb", 256)
+    if baseline:
+        for key, value in environment().items():
+            if baseline.get(key) != value:
+                print(f"Note: baseline {key} is {baseline.get(key)}, this run uses {value}; "
+                      "heap sizes can differ between them\n")
+
+    # First requests pay for lazy imports and caches; keep them out of the numbers
+    for case in cases:
+        measure_heap(case, 1024)
+
+    results = {}
+    print(f"{'case':<22}{'payload':>9}{'heap peak':>12}{'peak/payload':>14}{'baseline':>10}"
+          f"{'retained':>11}{'RSS peak':>11}")
+    for case in cases:
+        rows = results.setdefault(case.name, {})
+        for size in sizes:
+            if case.limit is not None and size > case.limit:
+                size = case.limit
+            samples = [measure_heap(case, size) for _ in range(args.repeat)]
+            payload = samples[0][0]
+            peak = statistics.median(s[1] for s in samples)
+            retained = statistics.median(s[2] for s in samples)
+            rss = None if args.no_rss else measure_rss(case, size)
+            rows[size] = {"payload": payload, "peak": peak, "ratio": peak / payload}
+            expected = (baseline or {}).get("ratios", {}).get(case.name, {}).get(str(size))
+            print(f"{case.name:<22}{size_label(payload):>9}{peak / 1024:>10.0f}KB{peak / payload:>13.2f}x"
+                  f"{f'{expected:.2f}x' if expected is not None else '-':>10}"
+                  f"{retained / 1024:>9.0f}KB{f'{rss / 1024:.0f}KB' if rss is not None else '-':>11}")
+    loop.close()
+
+    if args.update_baseline:
+        write_baseline(args.baseline, results, tolerance, slack_kb)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+        if args.check:
+            sys.exit(1)
+        return
+    failures = regressions(results, baseline, tolerance, slack_kb)
+    if failures:
+        print(f"\nMemory regressions (tolerance {tolerance:.0%} + {slack_kb}KB):")
+        for failure in failures:
+            print(f"  {failure}")
+        if args.check:
+            sys.exit(1)
+    else:
+        print(f"\nNo memory regressions (tolerance {tolerance:.0%} + {slack_kb}KB)")
+
+
+if __name__ == "__main__":
+    main_cli()
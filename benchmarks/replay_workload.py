@@ -0,0 +1,273 @@
+"""
+Say It Better - Synthetic traffic replay from a workload capture
+
+Reads shape-only records written with WORKLOAD_CAPTURE (a JSON-lines file,
+or function logs with "workload {...}" lines) and sends synthetic requests
+with the same distributions to any deployment:
+- arrival gaps are resampled from the captured inter-arrival times (open
+  loop: requests are sent on schedule whether or not earlier ones finished)
+- each request copies the shape of a randomly drawn captured request:
+  input length and tone, theme list sizes, payload bytes, entry counts and
+  the conditional/all-tones/draft flags
+- all text and payloads are generated filler, never real content
+
+Cloud uploads and downloads go to a pool of synthetic users created before
+the run. Endpoints the chosen layout does not serve are skipped (/share
+only exists on the backend, /api/cloud only on Vercel).
+
+Usage:
+    python benchmarks/replay_workload.py capture.jsonl --target http://localhost:8000 --layout backend
+    python benchmarks/replay_workload.py vercel.log --target https://example.vercel.app --duration 120
+    python benchmarks/replay_workload.py capture.jsonl --dry-run
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+sys.path.insert(0, API_DIR)
+
+from _lib.workload import ENDPOINTS, LOG_PREFIX  # noqa: E402
+
+import httpx  # noqa: E402
+
+LAYOUTS = {
+    "vercel": {"translate": "/api/translate", "analyze-themes": "/api/analyze-themes", "cloud": "/api/cloud"},
+    "backend": {"translate": "/translate", "analyze-themes": "/analyze-themes", "share": "/share"},
+}
+
+WORDS = (
+    "work tired sleep week family meeting deadline friend evening morning worried "
+    "busy calm talk plan energy focus time home weekend pressure help quiet day"
+).split()
+THEME_WORDS = (
+    "Work Stress", "Sleep Issues", "Family Tension", "Low Energy", "Social Isolation",
+    "Deadline Pressure", "Health Concerns", "Self Doubt", "Financial Worry", "Burnout",
+)
+
+# Synthetic cloud users created before the run
+USER_POOL_SIZE = 20
+
+
+def load_records(paths):
+    """Shape records from capture files or logs, sorted by arrival."""
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                start = line.find(LOG_PREFIX + "{")
+                text = line[start + len(LOG_PREFIX):] if start >= 0 else line
+                try:
+                    record = json.loads(text)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and record.get("endpoint") in ENDPOINTS and "t" in record:
+                    records.append(record)
+    records.sort(key=lambda r: r["t"])
+    return records
+
+
+def arrival_gaps(records, max_gap):
+    """Inter-arrival times, leaving out idle stretches longer than max_gap."""
+    gaps = [b["t"] - a["t"] for a, b in zip(records, records[1:])]
+    return [gap for gap in gaps if 0 <= gap <= max_gap] or [1.0]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def filler_text(chars, rng):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars].strip().ljust(max(10, chars), ".")
+
+
+def theme_labels(count, rng):
+    return [f"{rng.choice(THEME_WORDS)} {rng.randint(1, 4)}" if rng.random() < 0.3 else rng.choice(THEME_WORDS)
+            for _ in range(count)]
+
+
+def random_blob(size):
+    """Base64 text of about `size` characters, like a client-side ciphertext."""
+    return base64.b64encode(os.urandom(max(16, size * 3 // 4))).decode("ascii")[:max(16, size)]
+
+
+class Replayer:
+    def __init__(self, client, target, layout, rng):
+        self.client = client
+        self.target = target.rstrip("/")
+        self.paths = LAYOUTS[layout]
+        self.rng = rng
+        # user id -> latest revision
+        self.users = {}
+        # (text, variant_token) from all_tones replies, reused for variant requests
+        self.variants = deque(maxlen=50)
+        self.results = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def url(self, endpoint):
+        return self.target + self.paths[endpoint]
+
+    def cloud_body(self, user_id, record):
+        return {
+            "userId": user_id,
+            "encryptedData": {
+                "encrypted": random_blob(record.get("payload_bytes", 4096)),
+                "salt": random_blob(24), "iv": random_blob(16), "algorithm": "AES-GCM",
+            },
+            "entryCount": record.get("entries", 10),
+            "checksum": uuid.uuid4().hex,
+            "version": 1,
+        }
+
+    async def seed_users(self, records):
+        sizes = [r for r in records if r["endpoint"] == "cloud" and r.get("payload_bytes")] or [{}]
+        for _ in range(USER_POOL_SIZE):
+            user_id = f"user_{uuid.uuid4().hex}"
+            response = await self.client.post(self.url("cloud"), json=self.cloud_body(user_id, self.rng.choice(sizes)))
+            self.users[user_id] = response.json().get("revision", 0) if response.status_code == 200 else 0
+
+    def build(self, record):
+        """(method, url, kwargs) for a synthetic request shaped like record."""
+        endpoint, method = record["endpoint"], record.get("method", "POST")
+        rng = self.rng
+        if endpoint == "translate":
+            if record.get("variant") and self.variants:
+                text, token = rng.choice(self.variants)
+                body = {"raw_text": text, "variant_token": token, "tone": record.get("tone", "personal")}
+            else:
+                body = {"raw_text": filler_text(min(5000, record.get("chars", 400)), rng)}
+                tone = record.get("tone")
+                if tone in ("neutral", "personal", "clinical"):
+                    body["tone"] = tone
+                if record.get("all_tones"):
+                    body["all_tones"] = True
+                if record.get("draft"):
+                    body["draft"] = True
+            return "POST", self.url(endpoint), {"json": body}
+        if endpoint == "analyze-themes":
+            body = {"current_themes": theme_labels(record.get("themes", 3), rng),
+                    "past_themes": theme_labels(record.get("past_themes", 10), rng)}
+            return "POST", self.url(endpoint), {"json": body}
+        if endpoint == "share":
+            body = {"encrypted_data": random_blob(record.get("payload_bytes", 2048)), "iv": random_blob(16)}
+            return "POST", self.url(endpoint), {"json": body}
+        # cloud
+        user_id = rng.choice(list(self.users)) if self.users else f"user_{uuid.uuid4().hex}"
+        if method == "GET":
+            return "GET", self.url(endpoint), {"params": {"userId": user_id}}
+        if method == "DELETE":
+            # A throwaway user, so the pool keeps its data
+            return "DELETE", self.url(endpoint), {"params": {"userId": f"user_{uuid.uuid4().hex}"}}
+        headers = {"If-Match": str(self.users.get(user_id, 0))} if record.get("conditional") else {}
+        return "POST", self.url(endpoint), {"json": self.cloud_body(user_id, record), "headers": headers}
+
+    async def send(self, record):
+        method, url, kwargs = self.build(record)
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        key = f"{record['endpoint']} {method}"
+        self.results[key].append((time.perf_counter() - started) * 1000)
+        self.statuses[key][status] += 1
+        if response is None or status != 200:
+            return
+        if record["endpoint"] == "cloud" and method == "POST":
+            self.users[kwargs["json"]["userId"]] = response.json().get("revision", 0)
+        elif record["endpoint"] == "translate" and "json" in kwargs and kwargs["json"].get("all_tones"):
+            token = response.json().get("variant_token")
+            if token:
+                self.variants.append((kwargs["json"]["raw_text"], token))
+
+
+def describe(records, gaps):
+    mix = Counter(f"{r['endpoint']} {r.get('method', 'POST')}" for r in records)
+    print(f"{len(records)} captured requests, mean gap {sum(gaps) / len(gaps) * 1000:.0f}ms "
+          f"({len(gaps) / sum(gaps) if sum(gaps) else 0:.1f} req/s)\n")
+    print(f"{'endpoint':<22}{'share':>7}{'p50 ms':>9}{'p95 ms':>9}  shape")
+    for key, count in mix.most_common():
+        subset = [r for r in records if f"{r['endpoint']} {r.get('method', 'POST')}" == key]
+        ms = [r["ms"] for r in subset if "ms" in r]
+        sizes = [r.get("chars") or r.get("payload_bytes") or r.get("past_themes") or 0 for r in subset]
+        print(f"{key:<22}{count / len(records):>7.0%}{percentile(ms, 50):>9.0f}{percentile(ms, 95):>9.0f}"
+              f"  size p50={percentile(sizes, 50)} p95={percentile(sizes, 95)}")
+
+
+async def run(args):
+    records = load_records(args.captures)
+    if not records:
+        sys.exit("No workload records found")
+    gaps = arrival_gaps(records, args.max_gap)
+    describe(records, gaps)
+    if args.dry_run:
+        return
+
+    served = [r for r in records if r["endpoint"] in LAYOUTS[args.layout]]
+    skipped = len(records) - len(served)
+    if skipped:
+        print(f"\nSkipping {skipped} captured requests to endpoints the {args.layout} layout does not serve")
+    if not served:
+        return
+
+    rng = random.Random(args.seed)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=httpx.Limits(max_connections=args.max_connections)) as client:
+        replayer = Replayer(client, args.target, args.layout, rng)
+        if any(r["endpoint"] == "cloud" for r in served):
+            await replayer.seed_users(served)
+
+        tasks = []
+        started = time.monotonic()
+        next_at = started
+        while len(tasks) < args.requests and next_at - started < args.duration:
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            tasks.append(asyncio.create_task(replayer.send(rng.choice(served))))
+            next_at += rng.choice(gaps) / args.speed
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+
+    print(f"\nReplayed {len(tasks)} requests in {elapsed:.1f}s ({len(tasks) / elapsed:.1f} req/s)\n")
+    print(f"{'endpoint':<22}{'sent':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for key, samples in sorted(replayer.results.items()):
+        statuses = ", ".join(f"{status}: {count}" for status, count in replayer.statuses[key].most_common())
+        print(f"{key:<22}{len(samples):>6}{percentile(samples, 50):>9.0f}{percentile(samples, 95):>9.0f}"
+              f"{percentile(samples, 99):>9.0f}  {statuses}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="capture files or function logs")
+    parser.add_argument("--target", default="http://localhost:8000")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="backend")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to send for")
+    parser.add_argument("--requests", type=int, default=10_000, help="stop after this many requests")
+    parser.add_argument("--speed", type=float, default=1.0, help="arrival rate multiplier")
+    parser.add_argument("--max-gap", type=float, default=30, help="drop idle gaps longer than this (s)")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=90)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="only summarize the capture")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
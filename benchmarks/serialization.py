@@ -0,0 +1,107 @@
+"""
+Say It Better - JSON serialization benchmark
+
+Times the shared serialization module (api/_lib/serialization.py) with each
+available backend against the previous json.dumps(...).encode() path, for
+a typical /translate response and a 10MB /api/cloud download.
+
+Usage:
+    python benchmarks/serialization.py [--runs 200] [--cloud-mb 10]
+"""
+
+import argparse
+import base64
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+
+def translate_response():
+    return {
+        "summary": "I have been feeling overwhelmed at work because deadlines keep moving. "
+                   "I would like to talk about how to plan my week so it feels manageable.",
+        "themes": [
+            {"theme": "Work Stress", "description": "Pressure from shifting deadlines"},
+            {"theme": "Planning", "description": "Wanting a more predictable week"},
+            {"theme": "Fatigue", "description": "Feeling worn out by the end of the day"},
+        ],
+        "share_ready": "Lately my workload has felt overwhelming because deadlines change often. "
+                       "I'd appreciate help planning my week so it feels more manageable.",
+        "original_length": 412,
+        "translated_length": 142,
+    }
+
+
+def cloud_record(megabytes):
+    # Ciphertext is base64, like the real client payload
+    encrypted = base64.b64encode(os.urandom(megabytes * 1024 * 1024 * 3 // 4)).decode("ascii")
+    meta = {"entryCount": 1200, "checksum": "abc123", "version": 3,
+            "lastModified": "2026-01-01T00:00:00", "updatedAt": "2026-01-01T00:00:00"}
+    blob = {"encrypted": encrypted, "salt": "c2FsdA==", "iv": "aXY=", "algorithm": "AES-GCM"}
+    return meta, json.dumps(blob, ensure_ascii=False)
+
+
+def time_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def load_backend(name):
+    os.environ["JSON_BACKEND"] = name
+    from _lib import serialization
+    module = importlib.reload(serialization)
+    return module if module.BACKEND == name else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--cloud-runs", type=int, default=10)
+    parser.add_argument("--cloud-mb", type=int, default=10)
+    args = parser.parse_args()
+
+    translate = translate_response()
+    meta, blob = cloud_record(args.cloud_mb)
+
+    def old_translate():
+        return json.dumps(translate).encode()
+
+    def old_cloud():
+        data = json.loads(json.dumps(meta))
+        data["encryptedData"] = json.loads(blob)
+        return json.dumps(data).encode()
+
+    rows = [("stdlib (previous)", time_ms(old_translate, args.runs),
+             time_ms(old_cloud, args.cloud_runs))]
+
+    for name in ("json", "orjson", "msgspec"):
+        module = load_backend(name)
+        if module is None:
+            print(f"{name}: not installed, skipped")
+            continue
+
+        def parsed_cloud():
+            data = module.loads(module.dumps(meta))
+            data["encryptedData"] = module.loads(blob)
+            return module.dumps(data)
+
+        assert json.loads(parsed_cloud()) == json.loads(old_cloud())
+        rows.append((name, time_ms(lambda: module.dumps(translate), args.runs),
+                     time_ms(parsed_cloud, args.cloud_runs)))
+
+    print(f"\n{'backend':<20}{'translate us':>14}{f'cloud {args.cloud_mb}MB ms':>16}")
+    for name, translate_ms, cloud_ms in rows:
+        print(f"{name:<20}{translate_ms * 1000:>14.1f}{cloud_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Say It Better - Backend throughput vs worker processes
+
+Starts the production entry point (python -m app.server) with 1, 2, 4, ...
+workers and drives it from separate load-generator processes for a fixed
+time, then reports requests per second and latency for each worker count.
+The request mix needs no upstream: GET /health, and POST /analyze-themes
+with labels that the lexical prepass scores on its own, which is the
+CPU-bound part of a real request.
+
+Usage:
+    python benchmarks/server_scaling.py [--workers 1,2,4] [--seconds 10] [--clients 4] [--concurrency 32]
+
+The load generators run on the same machine and take CPU from the server,
+so numbers understate a dedicated server. Sizing an instance: run this on
+that instance type, then pick the worker count past which RPS stops
+growing, which is usually the core count. Real /translate traffic waits
+mostly on Groq, so its capacity is bounded by ADMISSION_MAX_LIMIT and the
+upstream rate limits more than by workers.
+
+Reference result (1 vCPU container shared with the load generators,
+loop=asyncio, http=h11, 2 clients x 32 concurrent requests, 10 s):
+
+     workers     rps   speedup   p50 ms   p99 ms
+           1     178     1.00x      252     1682
+           2     168     0.94x      228     2103
+
+On one core a second worker only adds scheduling overhead, and most of the
+CPU goes to the httpx load generators. Repeat the run on the target
+instance type before choosing WEB_CONCURRENCY.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+THEMES = {
+    "current_themes": ["Work Stress", "Sleep Issues", "Low Energy"],
+    "past_themes": ["work stress", "Sleep issues", "Family Tension", "Low energy", "Burnout"],
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(url, seconds, concurrency):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    async with httpx.AsyncClient(base_url=url, timeout=30,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker(n):
+            nonlocal errors
+            i = n
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    if i % 2:
+                        response = await client.get("/health")
+                    else:
+                        response = await client.post("/analyze-themes", json=THEMES)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(url, seconds, concurrency, results):
+    results.put(asyncio.run(drive(url, seconds, concurrency)))
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url + "/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def measure(workers, args):
+    port = args.port
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(port), "HOST": "127.0.0.1",
+           "KEEP_WARM": "0", "ADMISSION_CONTROL": "0", "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "benchmark"}
+    server = subprocess.Popen([sys.executable, "-m", "app.server"], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(url)
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client_process, args=(url, args.seconds, args.concurrency, results))
+                   for _ in range(args.clients)]
+        for client in clients:
+            client.start()
+        latencies, errors = [], 0
+        for _ in clients:
+            samples, failed = results.get()
+            latencies.extend(samples)
+            errors += failed
+        for client in clients:
+            client.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return len(latencies) / args.seconds, percentile(latencies, 50), percentile(latencies, 99), errors
+
+
+def main_cli():
+    cores = os.cpu_count() or 1
+    default_workers = ",".join(str(n) for n in (1, 2, 4, 8, 16) if n <= max(2, cores))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=default_workers, help="comma-separated worker counts")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=max(2, cores // 2), help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight per client")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    print(f"{cores} cores, {args.clients} clients x {args.concurrency} concurrent, {args.seconds:.0f}s per run\n")
+    print(f"{'workers':>8}{'rps':>8}{'speedup':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        rps, p50, p99, errors = measure(workers, args)
+        baseline = baseline or rps
+        print(f"{workers:>8}{rps:>8.0f}{rps / baseline:>9.2f}x{p50:>9.0f}{p99:>9.0f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main_cli()
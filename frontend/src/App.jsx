@@ -214,14 +214,18 @@ function App() {
     setResult(null)
 
     try {
-      const response = await fetch(`${API_BASE}/translate`, {
+      // With history, recurring themes come back in the same round trip
+      const pastThemes = history.flatMap(h => h.themes.map(t => t.theme))
+      const withThemes = history.length > 0
+      const response = await fetch(`${API_BASE}/${withThemes ? 'translate-with-themes' : 'translate'}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
           raw_text: rawText,
-          tone: tone
+          tone: tone,
+          ...(withThemes && { past_themes: pastThemes })
         })
       })
 
@@ -260,29 +264,8 @@ function App() {
         }
       }
 
-      // Analyze recurring themes if we have history
-      if (history.length > 0) {
-        try {
-          const pastThemes = history.flatMap(h => h.themes.map(t => t.theme))
-          const currentThemes = data.themes.map(t => t.theme)
-
-          const themeResponse = await fetch(`${API_BASE}/analyze-themes`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              current_themes: currentThemes,
-              past_themes: pastThemes
-            })
-          })
-
-          if (themeResponse.ok) {
-            const themeData = await themeResponse.json()
-            setRecurringThemes(themeData.recurring_themes || [])
-          }
-        } catch (themeErr) {
-          console.log('Theme analysis unavailable:', themeErr)
-          // Non-critical - don't show error to user
-        }
+      if (withThemes) {
+        setRecurringThemes(data.recurring_themes || [])
       }
 
     } catch (err) {
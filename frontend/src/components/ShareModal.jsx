@@ -3,6 +3,7 @@ import { useState, useMemo } from 'react'
 import { QRCodeSVG } from 'qrcode.react'
 import { jsPDF } from 'jspdf'
 import { generateKey, exportKey, encrypt } from '../services/crypto'
+import { postIdempotent } from '../services/idempotentFetch'
 
 // In development, uses localhost:8000. In production (Vercel), API is at /api
 const API_BASE = import.meta.env.VITE_API_BASE || '/api'
@@ -49,8 +50,7 @@ This is not therapy, diagnosis, or medical advice.`
       const { encrypted_data, iv } = await encrypt(payload, key)
 
       // 3. Upload encrypted blob to server (Server CANNOT read this)
-      const response = await fetch(`${API_BASE}/share`, {
-        method: 'POST',
+      const response = await postIdempotent(`${API_BASE}/share`, {
         headers: {
           'Content-Type': 'application/json'
         },
@@ -13,6 +13,7 @@
  */
 
 import { encryption } from './encryption.js'
+import { postIdempotent } from './idempotentFetch.js'
 
 class CloudStorageService {
   constructor() {
@@ -22,6 +23,11 @@ class CloudStorageService {
     this.username = null
     this.isAuthenticated = false
     this.syncInProgress = false
+    // Server revision of the last upload/download (null = unknown), sent as
+    // If-Match so an upload only succeeds if nobody else wrote in between
+    this.revision = null
+    // Fingerprint of the entries as of the last successful sync
+    this.syncedFingerprint = null
   }
 
   /**
@@ -60,6 +66,8 @@ class CloudStorageService {
 
     this.isEnabled = true
     this.isAuthenticated = true
+    this.revision = null
+    this.syncedFingerprint = null
 
     return {
       userId: this.userId,
@@ -90,8 +98,18 @@ class CloudStorageService {
     return 'user_' + hashHex.substring(0, 32)
   }
 
+  /**
+   * Fingerprint of an entry list that does not depend on its order
+   */
+  async _fingerprint(entries) {
+    const sorted = [...entries].sort((a, b) => String(a.id).localeCompare(String(b.id)))
+    return encryption.calculateChecksum(sorted)
+  }
+
   /**
    * Upload encrypted entries to cloud
+   * When the cloud revision is known the upload is conditional (If-Match);
+   * if another device uploaded first it fails with error.conflict = true.
    * @param {Array} entries - Array of entry objects
    * @param {string} passphrase - User's passphrase for encryption
    */
@@ -116,21 +134,36 @@ class CloudStorageService {
         version: 1
       }
 
+      const headers = {
+        'Content-Type': 'application/json'
+      }
+      if (this.revision !== null) {
+        headers['If-Match'] = `"${this.revision}"`
+      }
+
       // Upload to cloud
-      const response = await fetch(this.apiBaseUrl, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json'
-        },
+      const response = await postIdempotent(this.apiBaseUrl, {
+        headers,
         body: JSON.stringify(cloudPayload)
       })
 
+      if (response.status === 409) {
+        // Someone else uploaded since our last sync; the caller must merge
+        const conflict = await response.json().catch(() => ({}))
+        this.revision = null
+        const error = new Error(conflict.error || 'Version conflict')
+        error.conflict = true
+        error.current = conflict.current || null
+        throw error
+      }
+
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({ error: 'Upload failed' }))
         throw new Error(errorData.error || errorData.message || 'Cloud upload failed')
       }
 
       const result = await response.json()
+      this.revision = result.revision ?? null
 
       return {
         success: true,
@@ -165,6 +198,7 @@ class CloudStorageService {
       if (!response.ok) {
         if (response.status === 404) {
           // No cloud data yet
+          this.revision = 0
           return { success: true, entries: [], isNew: true }
         }
         const errorData = await response.json().catch(() => ({ error: 'Download failed' }))
@@ -172,6 +206,7 @@ class CloudStorageService {
       }
 
       const cloudData = await response.json()
+      this.revision = cloudData.revision ?? null
 
       // Validate encrypted data structure
       if (!cloudData.encryptedData || typeof cloudData.encryptedData !== 'object') {
@@ -261,41 +296,71 @@ class CloudStorageService {
 
   /**
    * Sync local entries with cloud (merge strategy)
+   *
+   * If only local entries changed since the last sync, they are uploaded
+   * directly with If-Match and nothing is downloaded. The cloud copy is
+   * only downloaded and merged when there is nothing to upload (to pick up
+   * other devices' changes), the revision is unknown, or the conditional
+   * upload lost a race; the merged upload is then retried a few times.
    * @param {Array} localEntries - Local entries from IndexedDB
    * @param {string} passphrase - User's passphrase
    */
-  async syncEntries(localEntries, passphrase) {
+  async syncEntries(localEntries, passphrase, maxAttempts = 3) {
     if (!this.isEnabled) {
       throw new Error('Cloud storage not initialized')
     }
 
     try {
-      // Download cloud entries
-      const cloudResult = await this.downloadEntries(passphrase)
+      const localFingerprint = await this._fingerprint(localEntries)
 
-      if (cloudResult.isNew) {
-        // No cloud data, upload local
-        if (localEntries.length > 0) {
+      if (this.revision !== null && localFingerprint !== this.syncedFingerprint) {
+        try {
           await this.uploadEntries(localEntries, passphrase)
+          this.syncedFingerprint = localFingerprint
+          return { entries: localEntries, action: 'uploaded', hasChanges: false }
+        } catch (error) {
+          if (!error.conflict) throw error
+          // Another device uploaded first: download and merge below
         }
-        return { entries: localEntries, action: 'uploaded', hasChanges: false }
       }
 
-      const cloudEntries = cloudResult.entries || []
+      for (let attempt = 1; ; attempt++) {
+        // Download cloud entries
+        const cloudResult = await this.downloadEntries(passphrase)
+
+        try {
+          if (cloudResult.isNew) {
+            // No cloud data, upload local
+            if (localEntries.length > 0) {
+              await this.uploadEntries(localEntries, passphrase)
+            }
+            this.syncedFingerprint = localFingerprint
+            return { entries: localEntries, action: 'uploaded', hasChanges: false }
+          }
 
-      // Merge entries (respects tombstones for proper delete propagation)
-      const mergeResult = this._mergeEntries(localEntries, cloudEntries)
+          const cloudEntries = cloudResult.entries || []
 
-      // Upload merged entries
-      await this.uploadEntries(mergeResult.entries, passphrase)
+          // Merge entries (respects tombstones for proper delete propagation)
+          const mergeResult = this._mergeEntries(localEntries, cloudEntries)
 
-      return {
-        entries: mergeResult.entries,
-        action: 'merged',
-        localCount: localEntries.length,
-        cloudCount: cloudEntries.length,
-        mergedCount: mergeResult.entries.length,
-        hasChanges: mergeResult.hasChanges
+          // Upload merged entries, unless the cloud already has exactly them
+          const mergedFingerprint = await this._fingerprint(mergeResult.entries)
+          if (mergedFingerprint !== await this._fingerprint(cloudEntries)) {
+            await this.uploadEntries(mergeResult.entries, passphrase)
+          }
+          this.syncedFingerprint = mergedFingerprint
+
+          return {
+            entries: mergeResult.entries,
+            action: 'merged',
+            localCount: localEntries.length,
+            cloudCount: cloudEntries.length,
+            mergedCount: mergeResult.entries.length,
+            hasChanges: mergeResult.hasChanges
+          }
+        } catch (error) {
+          if (!error.conflict || attempt >= maxAttempts) throw error
+        }
       }
     } catch (error) {
       console.error('Sync failed:', error)
@@ -455,6 +520,8 @@ class CloudStorageService {
     this.isAuthenticated = false
     this.userId = null
     this.username = null
+    this.revision = null
+    this.syncedFingerprint = null
   }
 
   /**
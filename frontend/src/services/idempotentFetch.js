@@ -0,0 +1,42 @@
+// POST with an Idempotency-Key, retried on network failures
+//
+// A retry reuses the same key, so if the first attempt did reach the server
+// (and only the response was lost) the server replays its original response
+// instead of storing the upload again. While that first attempt is still
+// running the server answers 429 with Retry-After, and the retry waits.
+
+const RETRY_DELAYS_MS = [500, 1500]
+const MAX_RETRY_AFTER_MS = 10000
+
+function retryAfterMs(response, fallback) {
+  const seconds = Number(response.headers.get('Retry-After'))
+  return Number.isFinite(seconds) && seconds >= 0
+    ? Math.min(seconds * 1000, MAX_RETRY_AFTER_MS)
+    : fallback
+}
+
+export async function postIdempotent(url, options = {}) {
+  const key = window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : Array.from(window.crypto.getRandomValues(new Uint8Array(16)), b => b.toString(16).padStart(2, '0')).join('')
+  const request = {
+    ...options,
+    method: 'POST',
+    headers: { ...options.headers, 'Idempotency-Key': key }
+  }
+
+  for (let attempt = 0; ; attempt++) {
+    let response
+    try {
+      response = await fetch(url, request)
+    } catch (error) {
+      // fetch only rejects on network errors; HTTP errors are returned
+      if (attempt >= RETRY_DELAYS_MS.length) throw error
+      await new Promise(resolve => setTimeout(resolve, RETRY_DELAYS_MS[attempt]))
+      continue
+    }
+    if (response.status !== 429 || attempt >= RETRY_DELAYS_MS.length) return response
+    // An earlier attempt with this key is still being processed
+    await new Promise(resolve => setTimeout(resolve, retryAfterMs(response, RETRY_DELAYS_MS[attempt])))
+  }
+}